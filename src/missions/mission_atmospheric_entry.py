@@ -11,12 +11,18 @@ import numpy as np
 from src.common import format
 from src.utility.figure_canvas import FigureCanvas
 from src.systems.capsule import Capsule
+from src.utility.job_scheduler import JobScheduler
 
-from tools.AtmosphericEntry import AtmosphericEntry
+from tools.AtmosphericEntry import AtmosphericEntry, EntryTrajectory
+from tools.Propagator import Propagator, TrajectoryChunk
 
 class MissionAtmosphericEntry(qtCore.QObject):
     """Manages the atmospheric entry mission"""
     
+    # --- MEMBERS 
+    
+    chunk_seconds = 20.0 # * Simulated time drawn at every update [ s ]
+    
     # --- PROPERTIES 
     
     # ? Entry Velocity [km / s]
@@ -87,6 +93,8 @@ class MissionAtmosphericEntry(qtCore.QObject):
         # ? Simulation Results
         
         self.result = dict() # * Simulation Result Dictionary
+        self.chunks = []     # * Trajectory chunks received so far
+        self.job    = 0      # * Running simulation job
         
         # ? Figure Canvas
         
@@ -155,23 +163,62 @@ class MissionAtmosphericEntry(qtCore.QObject):
         
         # ? Simulation
         
-        AtmosphericEntry.set_capsule_parameters(0, 300, 0, self.capsule.capsule_lift_coefficient, self.capsule.capsule_drag_coefficient, self.capsule.capsule_reference_surface)
+        capsule_parameters   = (0, 300, 0, self.capsule.capsule_lift_coefficient, self.capsule.capsule_drag_coefficient, self.capsule.capsule_reference_surface)
+        parachute_parameters = (self.use_parachute, self.capsule.parachute_drag_coefficient, self.capsule.parachute_reference_surface)
+        aerodynamics         = (self.capsule.capsule_nose_radius, self.capsule.capsule_body_radius, self.capsule.capsule_shield_angle, self.capsule.capsule_afterbody_angle, self.capsule.specific_heat_ratio)
         
-        AtmosphericEntry.set_parachute_parameters(self.use_parachute, self.capsule.parachute_drag_coefficient, self.capsule.parachute_reference_surface)
+        y_0 = np.array([self.entry_velocity, np.deg2rad(self.entry_flight_path_angle), self.entry_altitude, 0, self.capsule.capsule_mass])
         
-        AtmosphericEntry.set_capsule_aerodynamics(self.capsule.capsule_nose_radius, self.capsule.capsule_body_radius, self.capsule.capsule_shield_angle, self.capsule.capsule_afterbody_angle, self.capsule.specific_heat_ratio)
+        # ? Streaming propagation in background (the figures are updated after every chunk)
         
-        y_0 = np.array([self.entry_velocity, np.deg2rad(self.entry_flight_path_angle), self.entry_altitude, 0, self.capsule.capsule_mass])
+        JobScheduler().cancel(self.job)
         
-        result = AtmosphericEntry.simulate_atmospheric_entry(y_0, t_f=self.final_integration_time * 60)
+        self.chunks = []
+        self.result = dict()
         
-        self.result = result
+        self.init_figure()
         
-        # ? Plot
+        self.job = JobScheduler().submit(self.iter_atmospheric_entry,
+                                         args=(capsule_parameters, parachute_parameters, aerodynamics, y_0),
+                                         kwargs=dict(t_f=self.final_integration_time * 60, chunk_seconds=self.chunk_seconds),
+                                         exclusive=True,
+                                         on_partial=self.chunk_completed,
+                                         progress=lambda chunk: 1.0 if chunk.final else chunk.t[-1] / (self.final_integration_time * 60))
+    
+    @qtCore.Slot()
+    def stop_simulation(self) -> None:
+        """Stops the running simulation (the results computed so far are kept)
+        """
         
-        self.plot_figures()
+        JobScheduler().cancel(self.job)
+        
+        # ? Chunks received so far collected once
+        
+        if self.chunks and not self.chunks[-1].final: self.collect_chunks()
     
     # --- PRIVATE METHODS 
+    
+    def iter_atmospheric_entry(self, capsule_parameters : tuple, parachute_parameters : tuple, aerodynamics : tuple, y_0 : np.ndarray, **kwargs):
+        """Sets the capsule up and streams the atmospheric entry (executed by the job scheduler, the class state is set inside the serialized job)
+
+        Args:
+            capsule_parameters (tuple): Arguments of AtmosphericEntry.set_capsule_parameters
+            parachute_parameters (tuple): Arguments of AtmosphericEntry.set_parachute_parameters
+            aerodynamics (tuple): Arguments of AtmosphericEntry.set_capsule_aerodynamics
+            y_0 (np.ndarray): Initial state
+            **kwargs: Arguments of AtmosphericEntry.iter_atmospheric_entry
+
+        Yields:
+            TrajectoryChunk: Integration chunk
+        """
+        
+        AtmosphericEntry.set_capsule_parameters(*capsule_parameters)
+        
+        AtmosphericEntry.set_parachute_parameters(*parachute_parameters)
+        
+        AtmosphericEntry.set_capsule_aerodynamics(*aerodynamics)
+        
+        yield from AtmosphericEntry.iter_atmospheric_entry(y_0, **kwargs)
         
     def init_figure(self) -> None:
         """Initializes the figure canvas
@@ -223,6 +270,56 @@ class MissionAtmosphericEntry(qtCore.QObject):
         
         self.plot_figures()
     
+    def chunk_completed(self, chunk : TrajectoryChunk) -> None:
+        """Appends a chunk of the running entry simulation and updates the figures
+
+        Args:
+            chunk (TrajectoryChunk): Trajectory chunk
+        """
+        
+        self.chunks.append(chunk)
+        
+        # ? Only the new points are drawn while running, the whole result is collected once on the final chunk
+        
+        if chunk.final:     self.collect_chunks()
+        else:               self.plot_chunk(chunk)
+    
+    def collect_chunks(self) -> None:
+        """Collects the chunks received so far into the result and plots it
+        """
+        
+        result = Propagator.collect(self.chunks)
+        
+        self.result = dict(t=result.t, y=result.y, trajectory=EntryTrajectory(result.t, result.y, R_E=AtmosphericEntry.R_E))
+        
+        self.plot_figures()
+    
+    def plot_chunk(self, chunk : TrajectoryChunk) -> None:
+        """Appends the points of a chunk to the figures (derived quantities evaluated on the chunk only)
+
+        Args:
+            chunk (TrajectoryChunk): Trajectory chunk
+        """
+        
+        trajectory = EntryTrajectory(chunk.t, chunk.y, R_E=AtmosphericEntry.R_E)
+        
+        V, gamma, r, x = chunk.y[:4]
+        
+        t = chunk.t / 60
+        
+        for figure, x_data, y_data in [(self.figure_velocity, t, V),
+                                       (self.figure_acceleration, t, trajectory.acceleration / AtmosphericEntry.g_E),
+                                       (self.figure_trajectory, x, r - AtmosphericEntry.R_E),
+                                       (self.figure_flight_path_angle, t, np.rad2deg(gamma)),
+                                       (self.figure_convective_heat_flux, t, trajectory.heat_flux[0]),
+                                       (self.figure_radiative_heat_flux, t, trajectory.heat_flux[1]),
+                                       (self.figure_altitude, V, r - AtmosphericEntry.R_E)]:
+            
+            figure.axes.plot(x_data, y_data, color=FigureCanvas.default_color)
+            figure.axes.relim()
+            figure.axes.autoscale_view()
+            figure.redraw_canvas(glow_effect=False)
+    
     def plot_figures(self) -> None:
         """Plots the figures with the results of the simulation
         """
@@ -236,11 +333,11 @@ class MissionAtmosphericEntry(qtCore.QObject):
         m       = self.result['y'][4, :]
         t       = self.result['t']
         
-        C       = (1.7415 * 1e-4 * 1 / np.sqrt(self.capsule.capsule_nose_radius))
-        q_t_c   = np.array([C * np.sqrt(1.225 * np.exp(-(r[i] - AtmosphericEntry.R_E) / AtmosphericEntry.H)) * (V[i] * 1e3)**3 for i in range(0, len(t))])
-        q_c_dot = np.array([AtmosphericEntry.stagnation_point_heat_tranfer_rate(r[i], V[i])[0] for i in range(0, len(t))])
-        q_r_dot = np.array([AtmosphericEntry.stagnation_point_heat_tranfer_rate(r[i], V[i])[1] for i in range(0, len(t))])
-        a       = np.array([(V[i] - V[i - 1]) / (t[i] - t[i - 1]) for i in range(1, len(t))])
+        q_c_dot = self.result['trajectory'].heat_flux[0]
+        q_r_dot = self.result['trajectory'].heat_flux[1]
+        Q       = self.result['trajectory'].heat_load
+        peak    = self.result['trajectory'].peak_heating
+        a       = self.result['trajectory'].acceleration
         
         t = t / 60
         
@@ -255,7 +352,7 @@ class MissionAtmosphericEntry(qtCore.QObject):
         
         self.figure_acceleration.reset_canvas()
         self.figure_acceleration.format_canvas('Time [ $min$ ]', 'Acceleration [ $g$ ]', -120, '$a_{max} = ' + f'{(max(abs(a)) / AtmosphericEntry.g_E):.3f}\;\;g$')
-        self.figure_acceleration.axes.plot(t[1:], a / AtmosphericEntry.g_E, color=FigureCanvas.default_color)
+        self.figure_acceleration.axes.plot(t, a / AtmosphericEntry.g_E, color=FigureCanvas.default_color)
         self.figure_acceleration.redraw_canvas()
         
         # ? Trajectory
@@ -275,15 +372,15 @@ class MissionAtmosphericEntry(qtCore.QObject):
         # ? Convective Heat Flux
         
         self.figure_convective_heat_flux.reset_canvas()
-        self.figure_convective_heat_flux.format_canvas('Time [ $min$ ]', 'S.P. Convective Heat Flux [ $W\;/\;cm^2$ ]', -250, '$\dot{q}_{max}^{conv} = ' + f'{max(q_c_dot * 1e-4):.3f}\;\;W\;/\;cm^2$')
-        self.figure_convective_heat_flux.axes.plot(t, q_c_dot * 1e-4, color=FigureCanvas.default_color)
+        self.figure_convective_heat_flux.format_canvas('Time [ $min$ ]', 'S.P. Convective Heat Flux [ $W\;/\;cm^2$ ]', -250, '$\dot{q}_{max}^{conv} = ' + f'{peak["q_c_max"]:.3f}\;\;W\;/\;cm^2$   $Q^{{conv}} = {Q[0]:.3f}\;\;J\;/\;cm^2$')
+        self.figure_convective_heat_flux.axes.plot(t, q_c_dot, color=FigureCanvas.default_color)
         self.figure_convective_heat_flux.redraw_canvas()
         
         # ? Radiative Heat Flux
         
         self.figure_radiative_heat_flux.reset_canvas()
-        self.figure_radiative_heat_flux.format_canvas('Time [ $min$ ]', 'S.P. Radiative Heat Flux [ $W\;/\;cm^2$ ]', -250, '$\dot{q}_{max}^{rad} = ' + f'{max(q_r_dot * 1e-4):.3f}\;\;W\;/\;cm^2$')
-        self.figure_radiative_heat_flux.axes.plot(t, q_r_dot * 1e-4, color=FigureCanvas.default_color)
+        self.figure_radiative_heat_flux.format_canvas('Time [ $min$ ]', 'S.P. Radiative Heat Flux [ $W\;/\;cm^2$ ]', -250, '$\dot{q}_{max}^{rad} = ' + f'{peak["q_r_max"]:.3f}\;\;W\;/\;cm^2$   $Q^{{rad}} = {Q[1]:.3f}\;\;J\;/\;cm^2$')
+        self.figure_radiative_heat_flux.axes.plot(t, q_r_dot, color=FigureCanvas.default_color)
         self.figure_radiative_heat_flux.redraw_canvas()
         
         # ? Altitude
@@ -16,6 +16,7 @@ from src.common import format
 from src.utility.figure_canvas import FigureCanvas
 from src.systems.spacecraft import Spacecraft
 from src.utility.pork_chop_plot import PorkChopPlot
+from src.utility.job_scheduler import JobScheduler
 
 from tools.AstronomicalData import AstronomicalData, CelestialBody, Planet, index_from_planet, planet_from_index, celestial_body_from_planet
 from tools.TwoBodyProblem import TwoBodyProblem
@@ -186,6 +187,7 @@ class MissionInterplanetaryTransfer(qtCore.QObject):
         
         self.result_simulation      = dict()    # * Simulation Result for Interplanetary Leg
         self.result_pork_chop_plot  = dict()    # * Simulation Result for Pork Chop Plot
+        self.job                    = 0         # * Running simulation job
     
     def set_update_with_canvas(self, engine : qtQml.QQmlApplicationEngine) -> None:
         """Connects all the QML figures with the backend model
@@ -306,16 +308,40 @@ class MissionInterplanetaryTransfer(qtCore.QObject):
         
         if self._arr_periapsis_height == 0: r_p_A = 0
         
-        # ? Optimal transfer calculation
+        # ? Optimal transfer calculation and integration in background (serialized, the solvers share the celestial body class state)
         
-        maneuver_1, maneuver_2, lambert_oe, theta_2 = InterplanetaryTrajectories.optimal_transfer(depPlanet,
-                                                                                                  arrPlanet,
-                                                                                                  depDate,
-                                                                                                  arrDate,
-                                                                                                  r_p_D,
-                                                                                                  r_p_A,
-                                                                                                  T,
-                                                                                                  self.spacecraft.initial_mass)
+        JobScheduler().cancel(self.job)
+        
+        self.job = JobScheduler().submit(self.calculate_transfer,
+                                         args=(depPlanet,
+                                               arrPlanet,
+                                               depDate,
+                                               arrDate,
+                                               r_p_D,
+                                               r_p_A,
+                                               T,
+                                               self.spacecraft.initial_mass),
+                                         exclusive=True,
+                                         on_result=self.simulation_completed)
+    
+    def calculate_transfer(self, depPlanet : CelestialBody, arrPlanet : CelestialBody, depDate : datetime, arrDate : datetime, r_p_D : float, r_p_A : float, T : float, m : float) -> dict:
+        """Calculates and integrates the optimal transfer (executed by the job scheduler)
+
+        Args:
+            depPlanet (CelestialBody): Departure planet
+            arrPlanet (CelestialBody): Arrival planet
+            depDate (datetime): Departure date
+            arrDate (datetime): Arrival date
+            r_p_D (float): Periapsis radius of the departure hyperbola [km]
+            r_p_A (float): Periapsis radius of the arrival orbit [km]
+            T (float): Period of the arrival orbit [s]
+            m (float): Spacecraft mass [kg]
+
+        Returns:
+            dict: Integration result
+        """
+        
+        maneuver_1, maneuver_2, lambert_oe, theta_2 = InterplanetaryTrajectories.optimal_transfer(depPlanet, arrPlanet, depDate, arrDate, r_p_D, r_p_A, T, m)
 
         # ? Integration
         
@@ -323,7 +349,14 @@ class MissionInterplanetaryTransfer(qtCore.QObject):
         TwoBodyProblem.set_celestial_body(CelestialBody.SUN)
         Time.set_celestial_body(CelestialBody.SUN)
         
-        result = self.integrate_maneuver(lambert_oe, lambert_oe.theta, theta_2)
+        return self.integrate_maneuver(lambert_oe, lambert_oe.theta, theta_2)
+    
+    def simulation_completed(self, result : dict) -> None:
+        """Stores the simulation result and plots it (called in the GUI thread)
+
+        Args:
+            result (dict): Integration result
+        """
         
         self.result_simulation = result
         
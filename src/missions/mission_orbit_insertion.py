@@ -12,6 +12,9 @@ import mplcyberpunk
 from src.common import format
 from src.utility.figure_canvas import FigureCanvas
 from src.systems.stage import Stage
+from src.utility.job_scheduler import JobScheduler
+
+import tools.launch_mechanics as lm
 
 from tools.launch_mechanics import Launcher
 
@@ -418,6 +421,7 @@ class MissionOrbitInsertion(qtCore.QObject):
         # ? Simulation Results
         
         self.result = dict() # * Simulation Result Dictionary
+        self.job    = 0      # * Running simulation job
         
         # ? Figure Canvas
         
@@ -537,119 +541,99 @@ class MissionOrbitInsertion(qtCore.QObject):
     
     @qtCore.Slot()
     def simulate(self) -> None:
-        """Simulates the orbit insertion mission
+        """Simulates the orbit insertion mission (in background)
+        """
+        
+        JobScheduler().cancel(self.job)
+        
+        # * The stages and the settings are copied (the QML controls can edit them while the job runs)
+    
+        stages = [self._stage_1.snapshot() if self._use_stage_1 else None,
+                  self._stage_2.snapshot() if self._use_stage_2 else None,
+                  self._stage_3.snapshot() if self._use_stage_3 else None]
+        
+        self.job = JobScheduler().submit(self.integrate_stages,
+                                         args=(stages,
+                                               self._payload.snapshot(),
+                                               float(self._pitchover_flight_path_angle),
+                                               float(self._pitchover_height),
+                                               float(self._final_integration_time)),
+                                         exclusive=True,
+                                         on_result=self.simulation_completed)
+    
+    def integrate_stages(self, stages : list, payload : lm.Stage, gamma_0 : float, h_t : float, t_max : float) -> dict:
+        """Integrates the launch of every stage and of the payload (executed by the job scheduler)
+
+        Args:
+            stages (list): Stages 1, 2 and 3 (None for an unused stage)
+            payload (lm.Stage): Payload
+            gamma_0 (float): Pitchover flight path angle [rad]
+            h_t (float): Pitchover height [m]
+            t_max (float): Final integration time [s]
+
+        Returns:
+            dict: Simulation result
         """
         
         # ? Simulation
         
         # * Used only for initialization
         
-        result  = dict(y=np.zeros(shape=(7,1)), t=np.zeros(shape=(1)))
-        a       = np.zeros(shape=(1))
-        t_a     = np.zeros(shape=(1))
+        result      = dict(y=np.zeros(shape=(7,1)), t=np.zeros(shape=(1)))
+        trajectory  = None
         
         # * Integration Parameters
         
-        y_0 = np.array([0, self._pitchover_flight_path_angle, 0, 0, 0, 0, 0])
-        h_t = self.pitchover_height
-        t_0 = 0
-        t_f = self.final_integration_time
+        y_0     = np.array([0, gamma_0, 0, 0, 0, 0, 0])
+        t_0     = 0
+        t_burn  = 0
         
-        # * Stage 1
+        # * Stages 1, 2, 3 and Payload (coasting until the final integration time)
         
-        if self._use_stage_1:
+        for stage in stages + [payload]:
             
-            Launcher.stage = self._stage_1
+            if stage is None: continue
             
-            t_f = min(self.final_integration_time, self._stage_1.t_burn)
+            Launcher.stage = stage
             
-            if t_f > t_0:
+            if stage is payload:    t_f = t_max
+            else:                   t_f = min(t_max, t_burn + stage.t_burn)
             
-                result_1 = Launcher.simulate_launch(y_0, h_t=h_t, t_0=t_0, t_f=t_f)
-                
-                result['y'] = np.append(result['y'], result_1['y'], axis=1)
-                result['t'] = np.append(result['t'], result_1['t'])
-                a           = np.append(a, np.array([(result_1['y'][0, i] - result_1['y'][0, i - 1]) / (result_1['t'][i] - result_1['t'][i - 1]) for i in range(1, len(result_1['t']))]))
-                t_a         = np.append(t_a, result_1['t'][1:])
-                
-                y_0 = result_1['y'][:, -1]
-                h_t = 0
-                t_0 = t_f
-                
-                y_0[2] -= Launcher.R_E
-        
-        # * Stage 2
-        
-        if self._use_stage_2:
-        
-            Launcher.stage = self._stage_2
-            
-            t_f = min(self.final_integration_time, self._stage_1.t_burn * self._use_stage_1 + self._stage_2.t_burn)
+            t_burn += stage.t_burn
             
             if t_f > t_0:
-                
-                result_2 = Launcher.simulate_launch(y_0, h_t=h_t, t_0=t_0, t_f=t_f)
-                
-                result['y'] = np.append(result['y'], result_2['y'], axis=1)
-                result['t'] = np.append(result['t'], result_2['t'])
-                a           = np.append(a, np.array([(result_2['y'][0, i] - result_2['y'][0, i - 1]) / (result_2['t'][i] - result_2['t'][i - 1]) for i in range(1, len(result_2['t']))]))
-                t_a         = np.append(t_a, result_2['t'][1:])
-                
-                y_0 = result_2['y'][:, -1]
-                h_t = 0
-                t_0 = t_f
-                
-                y_0[2] -= Launcher.R_E
-            
-        # * Stage 3
-        
-        if self._use_stage_3:
-            
-            Launcher.stage = self._stage_3
-            
-            t_f = min(self.final_integration_time, self._stage_1.t_burn * self._use_stage_1 + self._stage_2.t_burn * self._use_stage_2 + self._stage_3.t_burn)
             
-            if t_f > t_0:
-                
-                result_3 = Launcher.simulate_launch(y_0, h_t=h_t, t_0=t_0, t_f=t_f)
+                result_k = Launcher.simulate_launch(y_0, h_t=h_t, t_0=t_0, t_f=t_f)
                 
-                result['y'] = np.append(result['y'], result_3['y'], axis=1)
-                result['t'] = np.append(result['t'], result_3['t'])
-                a           = np.append(a, np.array([(result_3['y'][0, i] - result_3['y'][0, i - 1]) / (result_3['t'][i] - result_3['t'][i - 1]) for i in range(1, len(result_3['t']))]))
-                t_a         = np.append(t_a, result_3['t'][1:])
+                result['y'] = np.append(result['y'], result_k['y'], axis=1)
+                result['t'] = np.append(result['t'], result_k['t'])
+                trajectory  = result_k['trajectory'] if trajectory is None else trajectory.append(result_k['trajectory'])
                 
-                y_0 = result_3['y'][:, -1]
+                y_0 = result_k['y'][:, -1].copy()
                 h_t = 0
                 t_0 = t_f
                 
                 y_0[2] -= Launcher.R_E
-                
-        # * Payload
-            
-        t_f = self.final_integration_time
-        
-        if t_f > t_0:
-            
-            Launcher.stage = self._payload
-            
-            result_bo = Launcher.simulate_launch(y_0, h_t=h_t, t_0=t_0, t_f=t_f)
-            
-            result['y'] = np.append(result['y'], result_bo['y'], axis=1)
-            result['t'] = np.append(result['t'], result_bo['t'])
-            a           = np.append(a, np.array([(result_bo['y'][0, i] - result_bo['y'][0, i - 1]) / (result_bo['t'][i] - result_bo['t'][i - 1]) for i in range(1, len(result_bo['t']))]))
-            t_a         = np.append(t_a, result_bo['t'][1:])
         
         # * Removes the first element
         
         result['y'] = np.delete(result['y'], 0, axis=1)
         result['t'] = np.delete(result['t'], 0)
-        a           = np.delete(a, 0)
-        t_a         = np.delete(t_a, 0)
         
-        self.result = result
+        result['trajectory']    = trajectory
+        result['a']             = trajectory.acceleration if trajectory is not None else np.zeros(shape=(0))
+        result['t_a']           = trajectory.t if trajectory is not None else np.zeros(shape=(0))
         
-        self.result['a']    = a
-        self.result['t_a']  = t_a
+        return result
+    
+    def simulation_completed(self, result : dict) -> None:
+        """Stores the simulation result and plots it (called in the GUI thread)
+
+        Args:
+            result (dict): Simulation result
+        """
+        
+        self.result = result
         
         # ? Plot
         
@@ -4,6 +4,8 @@ __author__      = "Alessio Negri"
 __license__     = "LGPL v3"
 __maintainer__  = "Alessio Negri"
 
+import os
+import tempfile
 import PySide6.QtCore as qtCore
 import PySide6.QtQml as qtQml
 import numpy as np
@@ -14,14 +16,24 @@ from datetime import datetime
 from src.common import format
 from src.utility.figure_canvas import FigureCanvas
 from src.systems.spacecraft import Spacecraft
+from src.utility.job_scheduler import JobScheduler
 
 from tools.AstronomicalData import CelestialBody
 from tools.OrbitalPerturbations import OrbitalPerturbations
 from tools.OrbitDetermination import OrbitDetermination
+from tools.Propagator import TrajectoryChunk
+from tools.TrajectoryArchive import TrajectoryArchive
 
 class MissionOrbitPropagation(qtCore.QObject):
     """Manages the orbit propagation mission"""
     
+    # --- MEMBERS 
+    
+    n_chunks        = 50                                                                # * Number of chunks drawn during the simulation
+    max_points      = 20_000                                                            # * Maximum number of points plotted from the archive
+    archive_path    = os.path.join(tempfile.gettempdir(), 'orbit_propagation.traj')     # * Archive of the last propagation [ t [days], a, e, h, i, Omega, omega ]
+    archive_keys    = ['a', 'e', 'h', 'i', 'Omega', 'omega']                            # * Derived quantities stored in the archive
+    
     # --- PROPERTIES 
     
     # ? Angular Momentum [km^2 / s]
@@ -166,7 +178,10 @@ class MissionOrbitPropagation(qtCore.QObject):
         
         # ? Simulation Results
         
-        self.result = dict() # * Simulation Result Dictionary
+        self.result     = dict() # * Simulation Result Dictionary
+        self.archive    = None   # * Trajectory archive being written (the chunks are not kept in memory)
+        self.first      = None   # * Derived quantities of the first chunk
+        self.job        = 0      # * Running simulation job
         
         # ? Figure Canvas
         
@@ -230,10 +245,6 @@ class MissionOrbitPropagation(qtCore.QObject):
         
         # ? Simulation
         
-        OrbitalPerturbations.set_celestial_body(CelestialBody.EARTH)
-        
-        OrbitDetermination.set_celestial_body(CelestialBody.EARTH)
-        
         y_0 = np.array([self.angular_momentum, self.eccentricity, self.true_anomaly, self.right_ascension_ascending_node, self.inclination, self.periapsis_anomaly])
         
         start_date  = datetime.strptime(self.start_date, '%Y-%m-%d %H:%M:%S')
@@ -245,25 +256,73 @@ class MissionOrbitPropagation(qtCore.QObject):
         B       = self.spacecraft.drag_coefficient * self.spacecraft.reference_surface / self.spacecraft.initial_mass
         B_SRP   = self.spacecraft.radiation_pressure_coefficient * self.spacecraft.absorbing_surface / self.spacecraft.initial_mass
         
-        result = OrbitalPerturbations.simulate_gauss_variational_equations(y_0,
-                                                                           drag=self.drag,
-                                                                           gravitational=self.gravitational,
-                                                                           SRP=self.solar_radiation_pressure,
-                                                                           B=B,
-                                                                           B_SRP=B_SRP,
-                                                                           MOON=self.third_body and self.third_body_choice == 0,
-                                                                           SUN=self.third_body and self.third_body_choice == 1,
-                                                                           JD_0=JD_0 * 86400,
-                                                                           JD_f=JD_f * 86400)
+        # ? Streaming propagation in background (the figures are updated after every chunk)
         
-        self.result = result
+        JobScheduler().cancel(self.job)
         
-        # ? Plot
+        if self.archive is not None: self.archive.close()
         
-        self.plot_figures()
+        self.archive    = TrajectoryArchive.create(self.archive_path, len(self.archive_keys), dict(y_0=y_0.tolist(),
+                                                                                                   drag=self.drag,
+                                                                                                   gravitational=self.gravitational,
+                                                                                                   SRP=self.solar_radiation_pressure,
+                                                                                                   B=B,
+                                                                                                   B_SRP=B_SRP,
+                                                                                                   third_body=self.third_body,
+                                                                                                   third_body_choice=self.third_body_choice,
+                                                                                                   start_date=self.start_date,
+                                                                                                   end_date=self.end_date))
+        self.first      = None
+        self.result     = dict()
+        
+        self.init_figure()
+        
+        self.job = JobScheduler().submit(self.iter_gauss_variational_equations,
+                                         args=(y_0,),
+                                         kwargs=dict(drag=self.drag,
+                                                     gravitational=self.gravitational,
+                                                     SRP=self.solar_radiation_pressure,
+                                                     B=B,
+                                                     B_SRP=B_SRP,
+                                                     MOON=self.third_body and self.third_body_choice == 0,
+                                                     SUN=self.third_body and self.third_body_choice == 1,
+                                                     JD_0=JD_0 * 86400,
+                                                     JD_f=JD_f * 86400,
+                                                     chunk_seconds=max((JD_f - JD_0) * 86400 / self.n_chunks, 1.0)),
+                                         exclusive=True,
+                                         on_partial=self.chunk_completed,
+                                         progress=lambda chunk: (chunk.t[-1] / 86400 - JD_0) / max(JD_f - JD_0, 1e-9))
+    
+    @qtCore.Slot()
+    def stop_simulation(self) -> None:
+        """Stops the running simulation (the results computed so far are kept)
+        """
+        
+        JobScheduler().cancel(self.job)
+        
+        # ? Points archived so far plotted once
+        
+        if self.archive is not None: self.collect_archive()
     
     # --- PRIVATE METHODS 
     
+    def iter_gauss_variational_equations(self, y_0 : np.ndarray, **kwargs):
+        """Sets the celestial body up and streams the perturbed propagation (executed by the job scheduler, the class state is set inside the serialized job)
+
+        Args:
+            y_0 (np.ndarray): Initial orbital elements
+            **kwargs: Arguments of OrbitalPerturbations.iter_gauss_variational_equations
+
+        Yields:
+            TrajectoryChunk: Integration chunk
+        """
+        
+        OrbitalPerturbations.set_celestial_body(CelestialBody.EARTH)
+        
+        OrbitDetermination.set_celestial_body(CelestialBody.EARTH)
+        
+        yield from OrbitalPerturbations.iter_gauss_variational_equations(y_0, **kwargs)
+    
     def init_figure(self) -> None:
         """Initializes the figure canvas
         """
@@ -308,6 +367,67 @@ class MissionOrbitPropagation(qtCore.QObject):
         
         self.plot_figures()
     
+    def chunk_completed(self, chunk : TrajectoryChunk) -> None:
+        """Archives a chunk of the running propagation and updates the figures
+
+        Args:
+            chunk (TrajectoryChunk): Trajectory chunk
+        """
+        
+        # >>> The first point of each chunk is the last point of the previous one
+        
+        start = 0 if self.first is None else 1
+        
+        if self.first is None: self.first = chunk.derived
+        
+        self.archive.append(chunk.derived['t'][start:], np.array([chunk.derived[key][start:] for key in self.archive_keys]))
+        
+        # ? Only the new points are drawn while running, the whole result is read back from the archive on the final chunk
+        
+        if chunk.final:     self.collect_archive()
+        else:               self.plot_chunk(chunk)
+    
+    def collect_archive(self) -> None:
+        """Closes the archive and plots a decimated view of it
+        """
+        
+        self.archive.close()
+        
+        self.archive = None
+        
+        # ? Copied out of the memory map (the file is overwritten by the next simulation)
+        
+        archive = TrajectoryArchive.open(self.archive_path)
+        
+        if len(archive) == 0: return
+        
+        t, y = archive.decimate(self.max_points)
+        
+        self.result = dict(t=np.array(t), **{ key : np.array(y[k]) for k, key in enumerate(self.archive_keys) })
+        
+        self.plot_figures()
+    
+    def plot_chunk(self, chunk : TrajectoryChunk) -> None:
+        """Appends the points of a chunk to the figures
+
+        Args:
+            chunk (TrajectoryChunk): Trajectory chunk
+        """
+        
+        first = self.first
+        
+        for figure, key in [(self.figure_semi_major_axis, 'a'),
+                            (self.figure_eccentricity, 'e'),
+                            (self.figure_angular_momentum, 'h'),
+                            (self.figure_inclination, 'i'),
+                            (self.figure_raan, 'Omega'),
+                            (self.figure_periapsis_anomaly, 'omega')]:
+            
+            figure.axes.plot(chunk.derived['t'], chunk.derived[key] - first[key][0], color=FigureCanvas.default_color)
+            figure.axes.relim()
+            figure.axes.autoscale_view()
+            figure.redraw_canvas(glow_effect=False)
+    
     def plot_figures(self) -> None:
         """Plots the figures with the results of the simulation
         """
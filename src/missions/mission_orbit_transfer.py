@@ -15,6 +15,7 @@ from src.utility.figure_canvas import FigureCanvas
 from src.systems.spacecraft import Spacecraft
 from src.utility.orbit import Orbit, StateType
 from src.utility.maneuver import Maneuver, ManeuverType
+from src.utility.job_scheduler import JobScheduler
 
 from tools.AstronomicalData import AstronomicalData, CelestialBody, index_from_celestial_body
 from tools.TwoBodyProblem import TwoBodyProblem, OrbitalParameters
@@ -119,6 +120,7 @@ class MissionOrbitTransfer(qtCore.QObject):
         self.result_arr = np.array([0])    # * Simulation Result for Arrival Orbit
         self.result_tra = np.array([0])    # * Simulation Result for Transfer Orbit
         self.result_fin = np.array([0])    # * Simulation Result for Final Orbit
+        self.job        = 0                # * Running simulation job
     
     # --- PUBLIC SLOTS 
     
@@ -332,66 +334,111 @@ class MissionOrbitTransfer(qtCore.QObject):
     
     @qtCore.Slot()
     def simulate(self) -> None:
-        """Simulates the orbit transfer
+        """Simulates the orbit transfer (in background)
+        """
+        
+        JobScheduler().cancel(self.job)
+        
+        # ? The inputs are read here, the job returns all its results (applied by transfer_completed in the GUI thread)
+    
+        self.job = JobScheduler().submit(self.integrate_transfer,
+                                         args=(self._dep_orbit.get_celestial_body(), self.spacecraft._specific_impulse, self.spacecraft._initial_mass, list(self.maneuvers)),
+                                         exclusive=True,
+                                         on_result=self.transfer_completed)
+    
+    def integrate_transfer(self, celestial_body : CelestialBody, I_sp : float, m_0 : float, maneuvers : list) -> dict:
+        """Integrates the departure, transfer and final orbits (executed by the job scheduler)
+
+        Args:
+            celestial_body (CelestialBody): Celestial body of the departure orbit
+            I_sp (float): Specific impulse [s]
+            m_0 (float): Initial spacecraft mass [kg]
+            maneuvers (list): Maneuvers
+
+        Returns:
+            dict: { dep, arr, tra, fin: trajectories, oe: final orbital elements, parameters: final orbital parameters, maneuvers, budgets: [delta_velocity, delta_time, delta_mass] of each maneuver }
         """
         
         # ? Setup classes
         
-        ThreeDimensionalOrbit.set_celestial_body(self._dep_orbit.get_celestial_body())
+        ThreeDimensionalOrbit.set_celestial_body(celestial_body)
         
-        Time.set_celestial_body(self._dep_orbit.get_celestial_body())
+        Time.set_celestial_body(celestial_body)
         
-        TwoBodyProblem.set_celestial_body(self._dep_orbit.get_celestial_body())
+        TwoBodyProblem.set_celestial_body(celestial_body)
         
-        OrbitalManeuvers.set_celestial_body(self._dep_orbit.get_celestial_body())
-        OrbitalManeuvers.set_specific_impulse(self.spacecraft._specific_impulse)
+        OrbitalManeuvers.set_celestial_body(celestial_body)
+        OrbitalManeuvers.set_specific_impulse(I_sp)
         
         # ? Integrate departure/arrival orbits
         
         dep = TwoBodyProblem.simulate_relative_motion(np.hstack(self._dep_orbit.get_cartesian_parameters()))
         arr = TwoBodyProblem.simulate_relative_motion(np.hstack(self._arr_orbit.get_cartesian_parameters()))
         
-        self.result_dep = dep['y']
-        self.result_arr = arr['y']
-        
         # ? Init transfer orbital elements and parameters
         
-        self.tra_orbital_elements.h     = self._dep_orbit._specific_angular_momentum
-        self.tra_orbital_elements.e     = self._dep_orbit._eccentricity
-        self.tra_orbital_elements.i     = self._dep_orbit._inclination
-        self.tra_orbital_elements.Omega = self._dep_orbit._right_ascension_ascending_node
-        self.tra_orbital_elements.omega = self._dep_orbit._periapsis_anomaly
-        self.tra_orbital_elements.theta = self._dep_orbit._true_anomaly
-        self.tra_orbital_elements.a     = self._dep_orbit._semi_major_axis
+        oe = OrbitalElements(self._dep_orbit._specific_angular_momentum,
+                             self._dep_orbit._eccentricity,
+                             self._dep_orbit._inclination,
+                             self._dep_orbit._right_ascension_ascending_node,
+                             self._dep_orbit._periapsis_anomaly,
+                             self._dep_orbit._true_anomaly,
+                             self._dep_orbit._semi_major_axis)
         
-        self.tra_orbital_parameters.r_p = self._dep_orbit._periapsis_radius
-        self.tra_orbital_parameters.r_a = self._dep_orbit._apoapsis_radius
+        parameters = OrbitalParameters(r_p=self._dep_orbit._periapsis_radius, r_a=self._dep_orbit._apoapsis_radius)
         
-        self.spacecraft.reset()
+        m = m_0
         
         # ? Integrate transfer orbit segments
         
         tra = dict(y=np.zeros(shape=(6,1))) # * Used only for initialization
         
-        for idx, maneuver in enumerate(self.maneuvers):
+        budgets = []
             
-            temp = self.evaluate_maneuver(maneuver, first=idx==0)
+        for idx, maneuver in enumerate(maneuvers):
+            
+            temp, budget = self.evaluate_maneuver(maneuver, oe, parameters, m, first=idx==0)
             
             tra['y'] = np.append(tra['y'], temp['y'], axis=1)
         
-        tra['y'] = np.delete(tra['y'], 0, axis=1) # * Removes the first element
+            if m >= budget[2]: m -= budget[2]
+            
+            budgets.append(budget)
         
-        self.result_tra = tra['y']
+        tra['y'] = np.delete(tra['y'], 0, axis=1) # * Removes the first element
         
         # ? Final position and orbit
         
-        r, v = ThreeDimensionalOrbit.pf_2_gef(self.tra_orbital_elements)
+        r, v = ThreeDimensionalOrbit.pf_2_gef(oe)
         
         fin = TwoBodyProblem.simulate_relative_motion(np.hstack([r, v]))
         
-        self.result_fin = fin['y']
+        return dict(dep=dep['y'], arr=arr['y'], tra=tra['y'], fin=fin['y'], oe=oe, parameters=parameters, maneuvers=maneuvers, budgets=budgets)
+    
+    def transfer_completed(self, result : dict) -> None:
+        """Stores the transfer results and the maneuver budgets and plots them (called in the GUI thread)
+
+        Args:
+            result (dict): Result of integrate_transfer
+        """
         
-        # ? Plot
+        self.result_dep = result['dep']
+        self.result_arr = result['arr']
+        self.result_tra = result['tra']
+        self.result_fin = result['fin']
+        
+        self.tra_orbital_elements   = result['oe']
+        self.tra_orbital_parameters = result['parameters']
+        
+        self.spacecraft.reset()
+        
+        for maneuver, (delta_velocity, delta_time, delta_mass) in zip(result['maneuvers'], result['budgets']):
+            
+            maneuver.delta_velocity = delta_velocity
+            maneuver.delta_time     = delta_time
+            maneuver.delta_mass     = delta_mass
+            
+            self.spacecraft.update_mass(delta_mass)
         
         self.plot_transfer_orbit()
     
@@ -626,18 +673,22 @@ class MissionOrbitTransfer(qtCore.QObject):
         
         self.tra_figure_orbit.redraw_canvas()
     
-    def evaluate_maneuver(self, maneuver : Maneuver, first : bool = False) -> dict:
+    def evaluate_maneuver(self, maneuver : Maneuver, oe : OrbitalElements, parameters : OrbitalParameters, m : float, first : bool = False) -> list:
         """Evaluates and integrates the maneuver from the list
 
         Args:
             maneuver (Maneuver): Maneuver
+            oe (OrbitalElements): Transfer orbital elements (updated to the orbit after the maneuver)
+            parameters (OrbitalParameters): Transfer orbital parameters (updated to the orbit after the maneuver)
+            m (float): Spacecraft mass before the maneuver [kg]
             first (bool, optional): True for the first maneuver. Defaults to False.
 
         Returns:
-            dict: Integration result
+            list: [Integration result, [delta_velocity, delta_time, delta_mass]]
         """
         
         result  = dict(y=np.zeros(shape=(6,1)))
+        budget  = [0.0, 0.0, 0.0]
         dt      = 0.0
         
         match maneuver.type:
@@ -651,21 +702,21 @@ class MissionOrbitTransfer(qtCore.QObject):
                 
                 # ? Maneuver
                 
-                maneuver_result = OrbitalManeuvers.hohmann_transfer(self.tra_orbital_parameters.r_p,
-                                                                    self.tra_orbital_parameters.r_a,
+                maneuver_result = OrbitalManeuvers.hohmann_transfer(parameters.r_p,
+                                                                    parameters.r_a,
                                                                     self._arr_orbit._periapsis_radius,
                                                                     self._arr_orbit._apoapsis_radius,
                                                                     maneuver.option,
-                                                                    self.spacecraft.mass)
+                                                                    m)
                 
-                maneuver_result.oe.i     = self.tra_orbital_elements.i
-                maneuver_result.oe.Omega = self.tra_orbital_elements.Omega
-                maneuver_result.oe.omega = self.tra_orbital_elements.omega
+                maneuver_result.oe.i     = oe.i
+                maneuver_result.oe.Omega = oe.Omega
+                maneuver_result.oe.omega = oe.omega
                 maneuver_result.oe.theta = theta_0
                 
                 # ? Integrate from current point to maneuver starting point
                 
-                temp_1 = self.integrate_maneuver(self.tra_orbital_elements, self.tra_orbital_elements.theta, theta_0)
+                temp_1 = self.integrate_maneuver(oe, oe.theta, theta_0)
                     
                 dt += temp_1['dt']
                 
@@ -679,21 +730,17 @@ class MissionOrbitTransfer(qtCore.QObject):
                 
                 # ? Update transfer orbit
                 
-                self.tra_orbital_elements.h     = self._arr_orbit._specific_angular_momentum
-                self.tra_orbital_elements.e     = self._arr_orbit._eccentricity
-                self.tra_orbital_elements.a     = self._arr_orbit._semi_major_axis
-                self.tra_orbital_elements.theta = theta_f
+                oe.h     = self._arr_orbit._specific_angular_momentum
+                oe.e     = self._arr_orbit._eccentricity
+                oe.a     = self._arr_orbit._semi_major_axis
+                oe.theta = theta_f
                 
-                self.tra_orbital_parameters.r_p = self._arr_orbit._periapsis_radius
-                self.tra_orbital_parameters.r_a = self._arr_orbit._apoapsis_radius
+                parameters.r_p = self._arr_orbit._periapsis_radius
+                parameters.r_a = self._arr_orbit._apoapsis_radius
                 
                 # ? Budget
                 
-                maneuver.delta_velocity = maneuver_result.dv
-                maneuver.delta_time     = dt / 3600
-                maneuver.delta_mass     = maneuver_result.dm
-                
-                self.spacecraft.update_mass(maneuver_result.dm)
+                budget = [maneuver_result.dv, dt / 3600, maneuver_result.dm]
                 
             case ManeuverType.BI_ELLIPTIC_HOHMANN:
                 
@@ -706,27 +753,27 @@ class MissionOrbitTransfer(qtCore.QObject):
                 
                 # ? Maneuver
                 
-                maneuver_result_1, maneuver_result_2 = OrbitalManeuvers.bi_elliptic_hohmann_transfer(self.tra_orbital_parameters.r_p,
-                                                                                                     self.tra_orbital_parameters.r_a,
+                maneuver_result_1, maneuver_result_2 = OrbitalManeuvers.bi_elliptic_hohmann_transfer(parameters.r_p,
+                                                                                                     parameters.r_a,
                                                                                                      self._arr_orbit._periapsis_radius,
                                                                                                      self._arr_orbit._apoapsis_radius,
                                                                                                      maneuver.option_value,
                                                                                                      maneuver.option,
-                                                                                                     self.spacecraft.mass)
+                                                                                                     m)
                 
-                maneuver_result_1.oe.i       = self.tra_orbital_elements.i
-                maneuver_result_1.oe.Omega   = self.tra_orbital_elements.Omega
-                maneuver_result_1.oe.omega   = self.tra_orbital_elements.omega
+                maneuver_result_1.oe.i       = oe.i
+                maneuver_result_1.oe.Omega   = oe.Omega
+                maneuver_result_1.oe.omega   = oe.omega
                 maneuver_result_1.oe.theta   = theta_0_1
                 
-                maneuver_result_2.oe.i       = self.tra_orbital_elements.i
-                maneuver_result_2.oe.Omega   = self.tra_orbital_elements.Omega
-                maneuver_result_2.oe.omega   = self.tra_orbital_elements.omega
+                maneuver_result_2.oe.i       = oe.i
+                maneuver_result_2.oe.Omega   = oe.Omega
+                maneuver_result_2.oe.omega   = oe.omega
                 maneuver_result_2.oe.theta   = theta_0_2
                 
                 # ? Integrate from current point to maneuver starting point (1st arc)
                 
-                temp_1 = self.integrate_maneuver(self.tra_orbital_elements, self.tra_orbital_elements.theta, theta_0_1)
+                temp_1 = self.integrate_maneuver(oe, oe.theta, theta_0_1)
                     
                 dt += temp_1['dt']
                 
@@ -747,92 +794,80 @@ class MissionOrbitTransfer(qtCore.QObject):
                 
                 # ? Update transfer orbit
                 
-                self.tra_orbital_elements.h     = self._arr_orbit._specific_angular_momentum
-                self.tra_orbital_elements.e     = self._arr_orbit._eccentricity
-                self.tra_orbital_elements.a     = self._arr_orbit._semi_major_axis
-                self.tra_orbital_elements.theta = theta_f_2
+                oe.h     = self._arr_orbit._specific_angular_momentum
+                oe.e     = self._arr_orbit._eccentricity
+                oe.a     = self._arr_orbit._semi_major_axis
+                oe.theta = theta_f_2
                 
-                self.tra_orbital_parameters.r_p = self._arr_orbit._periapsis_radius
-                self.tra_orbital_parameters.r_a = self._arr_orbit._apoapsis_radius
+                parameters.r_p = self._arr_orbit._periapsis_radius
+                parameters.r_a = self._arr_orbit._apoapsis_radius
                 
                 # ? Budget
                 
-                maneuver.delta_velocity = maneuver_result_1.dv + maneuver_result_2.dv
-                maneuver.delta_time     = dt / 3600
-                maneuver.delta_mass     = maneuver_result_1.dm + maneuver_result_2.dm
-                
-                self.spacecraft.update_mass(maneuver_result_1.dm + maneuver_result_2.dm)
+                budget = [maneuver_result_1.dv + maneuver_result_2.dv, dt / 3600, maneuver_result_1.dm + maneuver_result_2.dm]
             
             case ManeuverType.PLANE_CHANGE:
                 
                 # ? Maneuver
                 
-                maneuver_result = OrbitalManeuvers.plane_change_maneuver_2(self.tra_orbital_parameters.r_p,
-                                                                           self.tra_orbital_parameters.r_a,
-                                                                           self.tra_orbital_elements.Omega,
-                                                                           self.tra_orbital_elements.omega,
-                                                                           self.tra_orbital_elements.i,
+                maneuver_result = OrbitalManeuvers.plane_change_maneuver_2(parameters.r_p,
+                                                                           parameters.r_a,
+                                                                           oe.Omega,
+                                                                           oe.omega,
+                                                                           oe.i,
                                                                            self._arr_orbit._right_ascension_ascending_node,
                                                                            self._arr_orbit._inclination,
-                                                                           self.spacecraft.mass)
+                                                                           m)
                 
-                maneuver_result.oe.h = self.tra_orbital_elements.h
-                maneuver_result.oe.e = self.tra_orbital_elements.e
-                maneuver_result.oe.a = self.tra_orbital_elements.a
+                maneuver_result.oe.h = oe.h
+                maneuver_result.oe.e = oe.e
+                maneuver_result.oe.a = oe.a
                 
                 # ? Integrate from current point to maneuver point
                 
-                result = self.integrate_maneuver(self.tra_orbital_elements, self.tra_orbital_elements.theta, maneuver_result.oe.theta)
+                result = self.integrate_maneuver(oe, oe.theta, maneuver_result.oe.theta)
                     
                 dt += result['dt']
                 
                 # ? Update transfer orbit
                 
-                self.tra_orbital_elements.i     = maneuver_result.oe.i
-                self.tra_orbital_elements.Omega = maneuver_result.oe.Omega
-                self.tra_orbital_elements.omega = maneuver_result.oe.omega
-                self.tra_orbital_elements.theta = maneuver_result.oe.theta
+                oe.i     = maneuver_result.oe.i
+                oe.Omega = maneuver_result.oe.Omega
+                oe.omega = maneuver_result.oe.omega
+                oe.theta = maneuver_result.oe.theta
                 
                 # ? Budget
                 
-                maneuver.delta_velocity = maneuver_result.dv
-                maneuver.delta_time     = dt / 3600 + maneuver_result.dt / 3600 # * The maneuver time is 0
-                maneuver.delta_mass     = maneuver_result.dm
-                
-                self.spacecraft.update_mass(maneuver_result.dm)
+                budget = [maneuver_result.dv, dt / 3600 + maneuver_result.dt / 3600, maneuver_result.dm] # * The maneuver time is 0
             
             case ManeuverType.APSE_LINE_ROTATION:
                 
                 # ? Maneuver
                 
-                maneuver_result = OrbitalManeuvers.apse_line_rotation_from_eta(self.tra_orbital_parameters.r_p,
-                                                                               self.tra_orbital_parameters.r_a,
-                                                                               self.tra_orbital_parameters.r_p,
-                                                                               self.tra_orbital_parameters.r_a,
-                                                                               self._arr_orbit._periapsis_anomaly - self.tra_orbital_elements.omega,
+                maneuver_result = OrbitalManeuvers.apse_line_rotation_from_eta(parameters.r_p,
+                                                                               parameters.r_a,
+                                                                               parameters.r_p,
+                                                                               parameters.r_a,
+                                                                               self._arr_orbit._periapsis_anomaly - oe.omega,
                                                                                secondIntersectionPoint=maneuver.option==1,
-                                                                               m=self.spacecraft.mass)
+                                                                               m=m)
                 
                 # ? Integrate from current point to maneuver point
                 
-                result = self.integrate_maneuver(self.tra_orbital_elements, self.tra_orbital_elements.theta, maneuver_result.oe.theta)
+                result = self.integrate_maneuver(oe, oe.theta, maneuver_result.oe.theta)
                     
                 dt += result['dt']
                 
                 # ? Update transfer orbit
                 
-                self.tra_orbital_elements.omega = self._arr_orbit._periapsis_anomaly
-                self.tra_orbital_elements.theta = maneuver_result.oe.theta
+                oe.omega = self._arr_orbit._periapsis_anomaly
+                oe.theta = maneuver_result.oe.theta
                 
-                # * Budget
+                # ? Budget
                 
-                maneuver.delta_velocity = maneuver_result.dv
-                maneuver.delta_time     = dt / 3600 + maneuver_result.dt / 3600 # * The maneuver time is 0
-                maneuver.delta_mass     = maneuver_result.dm
+                budget = [maneuver_result.dv, dt / 3600 + maneuver_result.dt / 3600, maneuver_result.dm] # * The maneuver time is 0
                 
-                self.spacecraft.update_mass(maneuver_result.dm)
-        
-        return result
+        return [result, budget]
     
     def integrate_maneuver(self, oe : OrbitalElements, theta_0 : float, theta_f : float) -> dict:
         """Integrates the trajectory from the intial True Anomaly to the final True Anomaly of the given Orbital Elements
@@ -151,7 +151,7 @@ class Capsule(qtCore.QObject):
         
         AtmosphericEntry.set_capsule_aerodynamics(self._capsule_nose_radius, self._capsule_body_radius, self._capsule_shield_angle, self._capsule_afterbody_angle, self._specific_heat_ratio)
         
-        self._capsule_zero_lift_drag_coefficient, self._capsule_lift_coefficient, self._capsule_drag_coefficient = AtmosphericEntry.calculate_aerodynamics_coefficients(0)
+        self._capsule_zero_lift_drag_coefficient, self._capsule_lift_coefficient, self._capsule_drag_coefficient = AtmosphericEntry.aero.coefficients(0.0)
     
     # --- PUBLIC SLOTS 
     
@@ -160,4 +160,4 @@ class Capsule(qtCore.QObject):
         """Updates the aerodynamics coefficients based on the new value of the angle of attack
         """
         
-        self._capsule_zero_lift_drag_coefficient, self._capsule_lift_coefficient, self._capsule_drag_coefficient = AtmosphericEntry.calculate_aerodynamics_coefficients(self._capsule_angle_of_attack)
\ No newline at end of file
+        self._capsule_zero_lift_drag_coefficient, self._capsule_lift_coefficient, self._capsule_drag_coefficient = AtmosphericEntry.aero.coefficients(self._capsule_angle_of_attack)
\ No newline at end of file
@@ -0,0 +1,341 @@
+""" job_scheduler.py: Shared background job scheduler for the mission simulations """
+
+__author__      = "Alessio Negri"
+__license__     = "LGPL v3"
+__maintainer__  = "Alessio Negri"
+
+import inspect
+import logging
+import itertools
+import traceback
+import PySide6.QtCore as qtCore
+
+from concurrent.futures import ProcessPoolExecutor, wait
+
+from src.common import singleton
+
+class JobSignals(qtCore.QObject):
+    """Signals emitted by a job from the worker thread"""
+    
+    # --- SIGNALS 
+    
+    # ? Signal emitted when the progress of the job has changed (job id, progress, text).
+    progress = qtCore.Signal(int, float, str)
+    
+    # ? Signal emitted for every partial result of a streaming job (job id, partial result).
+    partial = qtCore.Signal(int, object)
+    
+    # ? Signal emitted when the job has finished (job id, result).
+    finished = qtCore.Signal(int, object)
+    
+    # ? Signal emitted when the job has raised an exception (job id, traceback).
+    failed = qtCore.Signal(int, str)
+    
+    # ? Signal emitted when the job has been cancelled (job id).
+    cancelled = qtCore.Signal(int)
+
+class Job(qtCore.QRunnable):
+    """Background job executed by the thread pool (optionally forwarded to the process pool)"""
+    
+    # --- METHODS 
+    
+    def __init__(self, job_id : int, fun, args : tuple, kwargs : dict, executor : ProcessPoolExecutor = None, progress = None) -> None:
+        """Constructor
+
+        Args:
+            job_id (int): Job identifier
+            fun (Callable): Function to execute (a generator function streams its partial results)
+            args (tuple): Positional arguments
+            kwargs (dict): Keyword arguments
+            executor (ProcessPoolExecutor, optional): Process pool for CPU-bound work. Defaults to None (thread).
+            progress (Callable, optional): Function (partial result) -> progress [0, 1]. Defaults to None.
+        """
+        
+        super().__init__()
+        
+        self.setAutoDelete(False)
+        
+        self.job_id     = job_id    # * Job identifier
+        self.fun        = fun       # * Function
+        self.args       = args      # * Positional arguments
+        self.kwargs     = kwargs    # * Keyword arguments
+        self.executor   = executor  # * Process pool (None for thread execution)
+        self.progress   = progress  # * Progress of a partial result
+        self.stop       = False     # * Cancellation request
+        self.signals    = JobSignals()
+    
+    def run(self) -> None:
+        """QRunnable run method
+        """
+        
+        try:
+            
+            if self.stop: return self.signals.cancelled.emit(self.job_id)
+            
+            self.signals.progress.emit(self.job_id, 0, 'Start')
+            
+            # >>> 1. Process pool (the thread waits and polls the cancellation request)
+            
+            if self.executor is not None:
+                
+                future = self.executor.submit(self.fun, *self.args, **self.kwargs)
+                
+                while not wait([future], timeout=0.05).done:
+                    
+                    if self.stop:
+                        
+                        # ? Only a pending task is removed, a running one completes in its process and its result is discarded
+                        
+                        future.cancel()
+                        
+                        return self.signals.cancelled.emit(self.job_id)
+                
+                result = future.result()
+            
+            # >>> 2. Thread pool
+            
+            else:
+                
+                result = self.fun(*self.args, **self.kwargs)
+                
+                # ? Streaming job: partial results are delivered one by one
+                
+                if inspect.isgenerator(result):
+                    
+                    stream, result = result, None
+                    
+                    for item in stream:
+                        
+                        self.signals.partial.emit(self.job_id, item)
+                        
+                        if self.progress is not None: self.signals.progress.emit(self.job_id, self.progress(item), 'Processing...')
+                        
+                        if self.stop:
+                            
+                            stream.close()
+                            
+                            return self.signals.cancelled.emit(self.job_id)
+            
+            if self.stop: return self.signals.cancelled.emit(self.job_id)
+            
+            self.signals.progress.emit(self.job_id, 1, 'Finished')
+            self.signals.finished.emit(self.job_id, result)
+        
+        except Exception:
+            
+            self.signals.failed.emit(self.job_id, traceback.format_exc())
+
+@singleton
+class JobScheduler(qtCore.QObject):
+    """Runs the mission simulations off the GUI thread and delivers the results back to it"""
+    
+    # --- SIGNALS 
+    
+    # ? Signal emitted when a job has been submitted (job id).
+    job_started = qtCore.Signal(int)
+    
+    # ? Signal emitted when the progress of a job has changed (job id, progress, text).
+    job_progress = qtCore.Signal(int, float, str)
+    
+    # ? Signal emitted when a job has terminated, whatever the outcome (job id).
+    job_finished = qtCore.Signal(int)
+    
+    # ? Signal emitted when a job has raised an exception (job id, traceback).
+    job_failed = qtCore.Signal(int, str)
+    
+    # --- MEMBERS 
+    
+    max_jobs = max(2, qtCore.QThread.idealThreadCount() // 2) # * Maximum number of concurrent jobs
+    
+    # --- METHODS 
+    
+    def __init__(self) -> None:
+        """Constructor
+        """
+        
+        super().__init__()
+        
+        self.pool = qtCore.QThreadPool(self)
+        
+        self.pool.setMaxThreadCount(self.max_jobs)
+        
+        # ? Jobs reading or writing shared class state (e.g. set_celestial_body) run one at a time
+        
+        self.exclusive_pool = qtCore.QThreadPool(self)
+        
+        self.exclusive_pool.setMaxThreadCount(1)
+        
+        self.executor   = None                  # * Process pool (created on the first CPU-bound job)
+        self.jobs       = dict()                # * Running jobs { job id : (job, callbacks) }
+        self.ids        = itertools.count(1)    # * Job identifier generator
+        
+        if qtCore.QCoreApplication.instance() is not None: qtCore.QCoreApplication.instance().aboutToQuit.connect(self.shutdown)
+    
+    def submit(self,
+               fun,
+               args : tuple = (),
+               kwargs : dict = None,
+               process : bool = False,
+               exclusive : bool = False,
+               on_result = None,
+               on_partial = None,
+               on_error = None,
+               on_cancel = None,
+               progress = None) -> int:
+        """Submits a job (jobs exceeding the concurrency limit are queued)
+
+        Args:
+            fun (Callable): Function to execute (a generator function streams its partial results)
+            args (tuple, optional): Positional arguments. Defaults to ().
+            kwargs (dict, optional): Keyword arguments. Defaults to None.
+            process (bool, optional): True to run a CPU-bound picklable function in the process pool. Defaults to False.
+                                      The worker processes are spawned without the class state set by the GUI, so the function must receive all its state explicitly
+                                      (and the application entry point needs a __main__ guard with multiprocessing.freeze_support()).
+                                      A running process job cannot be interrupted: cancelling it only discards its result.
+            exclusive (bool, optional): True for jobs using shared class state (serialized on a single thread). Defaults to False.
+            on_result (Callable, optional): Called in the GUI thread with the result (the job must not update the mission objects itself). Defaults to None.
+            on_partial (Callable, optional): Called in the GUI thread with every partial result. Defaults to None.
+            on_error (Callable, optional): Called in the GUI thread with the traceback. Defaults to None (logged).
+            on_cancel (Callable, optional): Called in the GUI thread when the job has been cancelled. Defaults to None.
+            progress (Callable, optional): Function (partial result) -> progress [0, 1]. Defaults to None.
+
+        Returns:
+            int: Job identifier
+        """
+        
+        if process and self.executor is None: self.executor = ProcessPoolExecutor(max_workers=self.max_jobs)
+        
+        job = Job(next(self.ids), fun, tuple(args), dict(kwargs or dict()), self.executor if process else None, progress)
+        
+        job.signals.progress.connect(self.job_progress)
+        job.signals.partial.connect(self.on_partial)
+        job.signals.finished.connect(self.on_finished)
+        job.signals.failed.connect(self.on_failed)
+        job.signals.cancelled.connect(self.on_cancelled)
+        
+        self.jobs[job.job_id] = (job, dict(result=on_result, partial=on_partial, error=on_error, cancel=on_cancel))
+        
+        (self.exclusive_pool if exclusive else self.pool).start(job)
+        
+        self.job_started.emit(job.job_id)
+        
+        return job.job_id
+    
+    def cancel(self, job_id : int) -> bool:
+        """Requests the cancellation of a job (streaming jobs stop after the current partial result, the result of the others is discarded)
+
+        Args:
+            job_id (int): Job identifier
+
+        Returns:
+            bool: True if the job was still running
+        """
+        
+        if job_id not in self.jobs: return False
+        
+        job = self.jobs[job_id][0]
+        
+        job.stop = True
+        
+        # ? Queued job: removed from the pool before starting
+        
+        if self.pool.tryTake(job) or self.exclusive_pool.tryTake(job): self.on_cancelled(job_id)
+        
+        return True
+    
+    def cancel_all(self) -> None:
+        """Cancels all the running jobs
+        """
+        
+        for job_id in list(self.jobs): self.cancel(job_id)
+    
+    def is_running(self, job_id : int) -> bool:
+        """Checks if a job is still running (or queued)
+
+        Args:
+            job_id (int): Job identifier
+
+        Returns:
+            bool: True if running
+        """
+        
+        return job_id in self.jobs
+    
+    @qtCore.Slot()
+    def shutdown(self) -> None:
+        """Cancels all the jobs and releases the thread and process pools
+        """
+        
+        self.cancel_all()
+        
+        self.pool.waitForDone()
+        self.exclusive_pool.waitForDone()
+        
+        if self.executor is not None: self.executor.shutdown(wait=False, cancel_futures=True)
+        
+        self.executor = None
+    
+    # --- PRIVATE SLOTS 
+    
+    @qtCore.Slot(int, object)
+    def on_partial(self, job_id : int, partial : object) -> None:
+        """Delivers a partial result to the GUI thread
+
+        Args:
+            job_id (int): Job identifier
+            partial (object): Partial result
+        """
+        
+        if job_id in self.jobs and not self.jobs[job_id][0].stop and self.jobs[job_id][1]['partial'] is not None: self.jobs[job_id][1]['partial'](partial)
+    
+    @qtCore.Slot(int, object)
+    def on_finished(self, job_id : int, result : object) -> None:
+        """Delivers the result to the GUI thread
+
+        Args:
+            job_id (int): Job identifier
+            result (object): Result
+        """
+        
+        if job_id not in self.jobs: return
+        
+        job, callbacks = self.jobs.pop(job_id)
+        
+        if callbacks['result'] is not None: callbacks['result'](result)
+        
+        self.job_finished.emit(job_id)
+    
+    @qtCore.Slot(int, str)
+    def on_failed(self, job_id : int, error : str) -> None:
+        """Delivers the exception traceback to the GUI thread
+
+        Args:
+            job_id (int): Job identifier
+            error (str): Traceback
+        """
+        
+        if job_id not in self.jobs: return
+        
+        job, callbacks = self.jobs.pop(job_id)
+        
+        if callbacks['error'] is not None:  callbacks['error'](error)
+        else:                               logging.getLogger(__name__).error('Job %d failed\n%s', job_id, error)
+        
+        self.job_failed.emit(job_id, error)
+        self.job_finished.emit(job_id)
+    
+    @qtCore.Slot(int)
+    def on_cancelled(self, job_id : int) -> None:
+        """Notifies the cancellation to the GUI thread
+
+        Args:
+            job_id (int): Job identifier
+        """
+        
+        if job_id not in self.jobs: return
+        
+        job, callbacks = self.jobs.pop(job_id)
+        
+        if callbacks['cancel'] is not None: callbacks['cancel']()
+        
+        self.job_finished.emit(job_id)
@@ -13,6 +13,8 @@ from tools.Common import daterange, daterange_length
 from tools.AstronomicalData import CelestialBody
 from tools.InterplanetaryTrajectories import InterplanetaryTrajectories
 from tools.OrbitDetermination import OrbitDetermination
+from tools.ResultCache import ResultCache
+from tools.PorkChopAtlas import PorkChopAtlas
 
 class PorkChopPlot(core.QThread):
     """Evaluates the pork chop plot"""
@@ -48,6 +50,7 @@ class PorkChopPlot(core.QThread):
         self.arrival_window     = [datetime(2031, 1, 1, 0, 0, 0), datetime(2032, 6, 1, 0, 0, 0)]    # * Arrival window
         self.step               = 10                                                                # * Simulation step     [ s ]
         self.stop               = False                                                             # * Stop simuation
+        self.previous           = None                                                              # * Last complete grid (reused by the next calculation)
     
     def run(self) -> None:
         """QThread run method
@@ -65,6 +68,27 @@ class PorkChopPlot(core.QThread):
         
         awBeg, awEnd = self.arrival_window
         
+        # >>> Cached grid (same planets, windows and step)
+        
+        key = ResultCache.key('pork_chop_plot', self.departure_planet, self.arrival_planet, self.launch_window, self.arrival_window, self.step)
+        
+        hit, grid = ResultCache.default.get(key)
+        
+        # ? Precomputed atlas (memory-mapped, only the tiles covering the windows are read)
+        
+        if not hit: grid = PorkChopAtlas.lookup(self.departure_planet, self.arrival_planet, self.launch_window, self.arrival_window, self.step)
+        
+        if grid is not None:
+            
+            self.dv_1, self.dv_2, self.T_F, self.X, self.Y = grid
+            
+            self.store_grid()
+            
+            self.status_changed.emit(1, 'Finished')
+            self.finished.emit()
+            
+            return
+        
         # >>> 2. Prepare structures
         
         self.dv_1   = np.zeros(shape=(daterange_length(awBeg, awEnd, self.step), daterange_length(lwBeg, lwEnd, self.step)), dtype=float)
@@ -72,6 +96,10 @@ class PorkChopPlot(core.QThread):
         self.T_F    = np.zeros(shape=(daterange_length(awBeg, awEnd, self.step), daterange_length(lwBeg, lwEnd, self.step)), dtype=float)
         self.X      = np.empty(shape=(daterange_length(awBeg, awEnd, self.step), daterange_length(lwBeg, lwEnd, self.step)), dtype='datetime64[s]')
         self.Y      = np.empty(shape=(daterange_length(awBeg, awEnd, self.step), daterange_length(lwBeg, lwEnd, self.step)), dtype='datetime64[s]')
+        
+        # ? Cells shared with the previous grid (same planets and dates) are copied, only the new strips are calculated
+        
+        computed = self.reuse_grid()
 
         # >>> 3. Cycle of time windows
 
@@ -93,25 +121,27 @@ class PorkChopPlot(core.QThread):
             
             for awIndex, awDate in enumerate(daterange(awBeg, awEnd, self.step)):
         
-                # >>> a. Extract ephemeris
+                if not computed[awIndex, lwIndex]:
                 
-                R_1, V_1 = InterplanetaryTrajectories.ephemeris(self.departure_planet, lwDate)
-                R_2, V_2 = InterplanetaryTrajectories.ephemeris(self.arrival_planet, awDate)
+                    # >>> a. Extract ephemeris
                 
-                dt = (awDate - lwDate).total_seconds()
+                    R_1, V_1 = InterplanetaryTrajectories.ephemeris(self.departure_planet, lwDate)
+                    R_2, V_2 = InterplanetaryTrajectories.ephemeris(self.arrival_planet, awDate)
                 
-                self.T_F[awIndex, lwIndex] = dt / 3600 / 24
+                    dt = (awDate - lwDate).total_seconds()
                 
-                # >>> b. Lambert problem
+                    self.T_F[awIndex, lwIndex] = dt / 3600 / 24
                 
-                OrbitDetermination.set_celestial_body(CelestialBody.SUN)
+                    # >>> b. Lambert problem
                 
-                V_D_v, V_A_v, oe, theta_2 = OrbitDetermination.solve_lambert_problem(R_1, R_2, dt)
+                    OrbitDetermination.set_celestial_body(CelestialBody.SUN)
                 
-                # >>> c. Hyperbolic excess velocities
+                    V_D_v, V_A_v, oe, theta_2 = OrbitDetermination.solve_lambert_problem(R_1, R_2, dt)
                 
-                self.dv_1[awIndex, lwIndex] = np.linalg.norm(V_D_v - V_1) if np.linalg.norm(V_D_v - V_1) < 50 else 50
-                self.dv_2[awIndex, lwIndex] = np.linalg.norm(V_A_v - V_2) if np.linalg.norm(V_A_v - V_2) < 50 else 50
+                    # >>> c. Hyperbolic excess velocities
+                    
+                    self.dv_1[awIndex, lwIndex] = np.linalg.norm(V_D_v - V_1) if np.linalg.norm(V_D_v - V_1) < 50 else 50
+                    self.dv_2[awIndex, lwIndex] = np.linalg.norm(V_A_v - V_2) if np.linalg.norm(V_A_v - V_2) < 50 else 50
                 
                 # >>> d. Times
                 
@@ -129,5 +159,59 @@ class PorkChopPlot(core.QThread):
                     
                     return
         
+        ResultCache.default.put(key, [self.dv_1, self.dv_2, self.T_F, self.X, self.Y])
+        
+        self.store_grid()
+        
         self.status_changed.emit(1, 'Finished')
-        self.finished.emit()
\ No newline at end of file
+        self.finished.emit()
+    
+    def reuse_grid(self) -> np.ndarray:
+        """Copies the cells of the previous grid having the same planets, launch date and arrival date
+
+        Returns:
+            np.ndarray: Mask of the copied cells [n_arrival, n_launch]
+        """
+        
+        computed = np.zeros(shape=self.dv_1.shape, dtype=bool)
+        
+        if self.previous is None or self.previous['planets'] != (self.departure_planet, self.arrival_planet): return computed
+        
+        # >>> 1. Index of every date in the previous grid
+        
+        lwPrevious = { date : index for index, date in enumerate(self.previous['launch_dates']) }
+        awPrevious = { date : index for index, date in enumerate(self.previous['arrival_dates']) }
+        
+        lwDates = list(daterange(*self.launch_window, self.step))
+        awDates = list(daterange(*self.arrival_window, self.step))
+        
+        # >>> 2. Overlapping rows and columns
+        
+        lwIndexes = [index for index, date in enumerate(lwDates) if date in lwPrevious]
+        awIndexes = [index for index, date in enumerate(awDates) if date in awPrevious]
+        
+        if len(lwIndexes) == 0 or len(awIndexes) == 0: return computed
+        
+        new = np.ix_(awIndexes, lwIndexes)
+        old = np.ix_([awPrevious[awDates[index]] for index in awIndexes], [lwPrevious[lwDates[index]] for index in lwIndexes])
+        
+        # >>> 3. Copy
+        
+        self.dv_1[new]  = self.previous['dv_1'][old]
+        self.dv_2[new]  = self.previous['dv_2'][old]
+        self.T_F[new]   = self.previous['T_F'][old]
+        
+        computed[new] = True
+        
+        return computed
+    
+    def store_grid(self) -> None:
+        """Keeps the current (complete) grid for the next calculation
+        """
+        
+        self.previous = dict(planets=(self.departure_planet, self.arrival_planet),
+                             launch_dates=list(daterange(*self.launch_window, self.step)),
+                             arrival_dates=list(daterange(*self.arrival_window, self.step)),
+                             dv_1=self.dv_1.copy(),
+                             dv_2=self.dv_2.copy(),
+                             T_F=self.T_F.copy())
\ No newline at end of file
@@ -14,9 +14,139 @@ import numpy as np
 import matplotlib.pyplot as plt
 import scipy.integrate as ode
 
+from functools import cached_property
+from scipy.optimize import minimize_scalar, brentq
+from concurrent.futures import ProcessPoolExecutor
+
 sys.path.append(os.path.dirname(__file__))
 
 from AstronomicalData import AstronomicalData, CelestialBody
+from Trajectory import FlightTrajectory
+from Propagator import Propagator
+from ResultCache import ResultCache
+
+# --- AERODYNAMIC DATABASE CLASS 
+
+class AerodynamicDatabase:
+    """Newtonian aerodynamic coefficients of the capsule tabulated on an angle of attack (and optionally Mach) grid"""
+    
+    # --- METHODS 
+    
+    def __init__(self, phi_1 : float, gamma : float, alpha : np.ndarray = None, mach : np.ndarray = None) -> None:
+        """Builds the tables for the given capsule geometry
+
+        Args:
+            phi_1 (float): Angle between capsule and shield radius [rad]
+            gamma (float): Air specific heat ratio []
+            alpha (np.ndarray, optional): Uniform angle of attack grid [rad]. Defaults to None (-90 deg to 90 deg every 0.125 deg).
+            mach (np.ndarray, optional): Increasing Mach grid. Defaults to None (hypersonic limit only).
+        """
+        
+        if alpha is None: alpha = np.linspace(-np.pi / 2, np.pi / 2, 1441)
+        
+        self.phi_1  = phi_1                                                     # * Angle between capsule and shield radius [ rad ]
+        self.gamma  = gamma                                                     # * Air specific heat ratio                 [ ]
+        self.alpha  = np.asarray(alpha, dtype=float)                            # * Angle of attack grid (uniform)          [ rad ]
+        self.mach   = None if mach is None else np.asarray(mach, dtype=float)   # * Mach grid                               [ ]
+        
+        # >>> Density ratio (strong shock limit or normal shock at each Mach number)
+        
+        if self.mach is None:
+            
+            epsilon = (gamma - 1) / (gamma + 1)
+        
+        else:
+            
+            epsilon = (((gamma - 1) * self.mach**2 + 2) / ((gamma + 1) * self.mach**2))[:, np.newaxis]
+        
+        # >>> Tables [n_alpha] or [n_mach, n_alpha]
+        
+        self.C_D_0, self.C_L, self.C_D = [np.broadcast_to(table, np.broadcast_shapes(np.shape(epsilon), self.alpha.shape)).copy() for table in self.newtonian(self.alpha, phi_1, gamma, epsilon)]
+    
+    @classmethod
+    def newtonian(cls, alpha : np.ndarray, phi_1 : float, gamma : float, epsilon : np.ndarray) -> list:
+        """Newtonian approximation for hypersonic aerodynamics (array inputs are broadcast)
+
+        Args:
+            alpha (np.ndarray): Angle of attack [rad]
+            phi_1 (float): Angle between capsule and shield radius [rad]
+            gamma (float): Air specific heat ratio []
+            epsilon (np.ndarray): Density ratio across the shock []
+
+        Returns:
+            list: [ Zero-Lift Drag Coefficient, Lift Coefficient, Drag Coefficient ]
+        """
+        
+        # >>> Zero-lift drag coefficient + capsule afterbody correction
+        
+        C_D_0 = (1 - 0.5 * epsilon) * (1 + np.cos(phi_1)**2) - 0.05 / gamma
+        
+        # >>> Lift and drag coefficients
+        
+        C_L = (C_D_0 * np.cos(alpha)**2 + 0.5 * (1 - 0.5 * epsilon) * np.sin(phi_1)**2 * (3 * np.sin(alpha)**2 - 2)) * np.sin(alpha)
+        C_D = (C_D_0 * np.cos(alpha)**2 + 1.5 * (1 - 0.5 * epsilon) * np.sin(phi_1)**2 * np.sin(alpha)**2) * np.cos(alpha)
+        
+        return [ C_D_0, C_L, C_D ]
+    
+    def coefficients(self, alpha : np.ndarray, mach : np.ndarray = None) -> list:
+        """Interpolates the tables (alpha and mach may be arrays)
+
+        Args:
+            alpha (np.ndarray): Angle of attack [rad]
+            mach (np.ndarray, optional): Mach number. Defaults to None (highest Mach of the grid).
+
+        Returns:
+            list: [ Zero-Lift Drag Coefficient, Lift Coefficient, Drag Coefficient ]
+        """
+        
+        if self.mach is None or mach is None:
+            
+            C_D_0, C_L, C_D = (self.C_D_0, self.C_L, self.C_D) if self.mach is None else (self.C_D_0[-1], self.C_L[-1], self.C_D[-1])
+            
+            return [np.interp(alpha, self.alpha, C_D_0), np.interp(alpha, self.alpha, C_L), np.interp(alpha, self.alpha, C_D)]
+        
+        # >>> Bilinear interpolation (indexes on the uniform alpha grid, search on the Mach grid)
+        
+        alpha, mach = np.broadcast_arrays(np.asarray(alpha, dtype=float), np.asarray(mach, dtype=float))
+        
+        x = np.clip((alpha - self.alpha[0]) / (self.alpha[1] - self.alpha[0]), 0, len(self.alpha) - 1)
+        
+        i = np.minimum(x.astype(int), len(self.alpha) - 2)
+        
+        j = np.clip(np.searchsorted(self.mach, mach) - 1, 0, len(self.mach) - 2)
+        
+        u = x - i
+        
+        w = np.clip((mach - self.mach[j]) / (self.mach[j + 1] - self.mach[j]), 0, 1)
+        
+        bilinear = lambda T: (1 - w) * ((1 - u) * T[j, i] + u * T[j, i + 1]) + w * ((1 - u) * T[j + 1, i] + u * T[j + 1, i + 1])
+        
+        return [bilinear(self.C_D_0), bilinear(self.C_L), bilinear(self.C_D)]
+    
+    def plot(self, mach : float = None) -> None:
+        """Plots the coefficients over the whole angle of attack grid
+
+        Args:
+            mach (float, optional): Mach number. Defaults to None (highest Mach of the grid).
+        """
+        
+        C_D_0, C_L, C_D = self.coefficients(self.alpha, None if mach is None else np.full(self.alpha.shape, mach))
+        
+        fig, axes = plt.subplots(1, 2, constrained_layout=True)
+        
+        axes[0].set_xlabel("Angle of attack [°]")
+        axes[0].set_ylabel("$C_L$, $C_D$")
+        axes[0].grid()
+        axes[0].plot(np.rad2deg(self.alpha), C_L, label='$C_L$')
+        axes[0].plot(np.rad2deg(self.alpha), C_D, label='$C_D$')
+        axes[0].legend()
+        
+        axes[1].set_xlabel("Angle of attack [°]")
+        axes[1].set_ylabel("$L / D$")
+        axes[1].grid()
+        axes[1].plot(np.rad2deg(self.alpha), C_L / C_D)
+
+# --- ATMOSPHERIC ENTRY CLASS 
 
 class AtmosphericEntry:
     """Implements the atmospheric entry equations"""
@@ -45,6 +175,13 @@ class AtmosphericEntry:
     
     use_parachute = False                                                   # * Check for parachute usage
     
+    radiative_bands = np.array([[-np.inf, 7.62, 372.6, 8.5, 1.6],           # * Radiative heating bands [ V_min, V_max, k_1, k_2, k_3 ] [ km / s, ... ]
+                                [7.62, 9.0, 25.34, 12.5, 1.78]])            #   (no radiative heating above 9 km / s)
+    
+    aero            = AerodynamicDatabase(phi_1, gamma)                     # * Capsule aerodynamic database (rebuilt by set_capsule_aerodynamics)
+    alpha_schedule  = None                                                  # * Angle of attack schedule [ [t], [alpha] ] [ s, rad ] (None to use C_L and C_D)
+    sigma_schedule  = None                                                  # * Bank angle schedule [ [t], [sigma] ]      [ s, rad ] (None for no bank)
+    
     # --- INTERNAL MEMBERS 
     
     _parachute_deployed     = False                                         # * Check when the parachute is deployed
@@ -113,9 +250,17 @@ class AtmosphericEntry:
         
         rho = 1.5 * np.exp(-(r - cls.R_E) / cls.H) # * [kg / m^3]
         
-        L = 0.5 * rho * (V * 1e3)**2 * cls.C_L * cls.S * 1e-3 # * [kg * km / s^2]
+        # ? Modulated entry: coefficients interpolated on the aerodynamic database, lift projected on the vertical plane
+        
+        C_L, C_D = cls.C_L, cls.C_D
+        
+        if cls.alpha_schedule is not None: C_D_0, C_L, C_D = cls.aero.coefficients(np.interp(t, *cls.alpha_schedule))
         
-        D = 0.5 * rho * (V * 1e3)**2 * cls.C_D * cls.S * 1e-3 # * [kg * km / s^2]
+        if cls.sigma_schedule is not None: C_L = C_L * np.cos(np.interp(t, *cls.sigma_schedule))
+        
+        L = 0.5 * rho * (V * 1e3)**2 * C_L * cls.S * 1e-3 # * [kg * km / s^2]
+        
+        D = 0.5 * rho * (V * 1e3)**2 * C_D * cls.S * 1e-3 # * [kg * km / s^2]
         
         D_P = 0.5 * rho * (V * 1e3)**2 * cls.C_D_P * cls.S_P * 1e-3 # * [kg * km / s^2]
         
@@ -158,6 +303,7 @@ class AtmosphericEntry:
     # ! SECTION 6.4 - 6.5
     
     @classmethod
+    @ResultCache.cached(settings=dict(method='RK45', rtol=1e-8, atol=1e-8, dense_output=True, peaks='band edges', heat_load='J / cm^2'))
     def simulate_atmospheric_entry(cls, y_0 : np.ndarray, t_0 : float = 0.0, t_f : float = 0.0, show : bool = False) -> dict:
         
         """Integrates the Ordinary Differential Equations for the Atmospheric Entry
@@ -169,10 +315,12 @@ class AtmosphericEntry:
             show (bool, optional): True for plotting the parameters. Defaults to False.
             
         Returns:
-            dict: { t: time, y: state, dt: t - t_0 }
+            dict: { t: time, y: state, dt: t - t_0, trajectory: EntryTrajectory, heat_load: [ Convection, Radiation ] [J / cm^2], peak_heating: EntryTrajectory.peak_heating }
         """
         
         if t_f < t_0: raise Exception('Invalid integration time: t_0 > t_f!')
+        
+        y_0 = np.array(y_0, dtype=float) # * Copy (the caller's state is left unchanged on cache hits and misses alike)
             
         # >>> 1. Integrate ODE 
     
@@ -186,22 +334,23 @@ class AtmosphericEntry:
         cls._parachute_deployed_t_0 = 0
         cls._parachute_opening_time = 0
         
-        integrationResult = ode.solve_ivp(fun=cls.entry_eom, t_span=[t_0, t_f], y0=y_0, method='RK45', rtol=1e-8, atol=1e-8, events=terminal_condition)
+        integrationResult = ode.solve_ivp(fun=cls.entry_eom, t_span=[t_0, t_f], y0=y_0, method='RK45', rtol=1e-8, atol=1e-8, events=terminal_condition, dense_output=True)
         
         if not integrationResult['success']: raise Exception(integrationResult['message'])
         
         # >>> 2. Result 
         
-        V       = integrationResult['y'][0, :]
-        gamma   = integrationResult['y'][1, :]
-        r       = integrationResult['y'][2, :]
-        x       = integrationResult['y'][3, :]
-        m       = integrationResult['y'][4, :]
-        t       = integrationResult['t']
+        trajectory = EntryTrajectory.from_solve_ivp(integrationResult, cls.R_E)
         
-        C       = (1.7415 * 1e-4 * 1 / np.sqrt(cls.R_N))
-        q_t_c   = np.array([C * np.sqrt(1.225 * np.exp(-(r[i] - cls.R_E) / cls.H)) * (V[i] * 1e3)**3 for i in range(0, len(t))])
-        a       = np.array([(V[i] - V[i - 1]) / (t[i] - t[i - 1]) for i in range(1, len(t))])
+        V       = trajectory.velocity
+        gamma   = trajectory.flight_path_angle
+        r       = trajectory.y[2]
+        x       = trajectory.downrange
+        m       = trajectory.y[4]
+        t       = trajectory.t
+        
+        q_t_c   = trajectory.heat_flux[0] * 1e4
+        a       = trajectory.acceleration
         
         # >>> 3. Plot 
         
@@ -239,10 +388,223 @@ class AtmosphericEntry:
             axes[1,2].set_xlabel("Time [$s$]")
             axes[1,2].set_ylabel("$dV/dt\;\;(g_E)$")
             axes[1,2].grid()
-            axes[1,2].plot(t[1:] / 60, a / cls.g_E)
+            axes[1,2].plot(t / 60, a / cls.g_E)
         
-        return dict(t=t, y=integrationResult['y'], dt=np.abs(t[-1] - t[0]))
+        return dict(t=t, y=integrationResult['y'], dt=np.abs(t[-1] - t[0]), trajectory=trajectory, heat_load=trajectory.heat_load, peak_heating=trajectory.peak_heating)
+
+    @classmethod
+    def iter_atmospheric_entry(cls, y_0 : np.ndarray, t_0 : float = 0.0, t_f : float = 0.0, chunk_seconds : float = 10.0):
+        """Streaming version of simulate_atmospheric_entry (the caller can draw every chunk and stop iterating to abort)
+
+        Args:
+            y_0 (np.ndarray): Initial state [5,1] -> (V, gamma, z, x, m)
+            t_0 (float, optional): Initial time. Defaults to 0.0.
+            t_f (float, optional): Final time. Defaults to 0.0.
+            chunk_seconds (float, optional): Simulated time covered by each chunk [s]. Defaults to 10.0.
 
+        Yields:
+            TrajectoryChunk: Chunk with derived { altitude [km], q_c_dot [W / cm^2], q_r_dot [W / cm^2] }
+        """
+        
+        if t_f < t_0: raise Exception('Invalid integration time: t_0 > t_f!')
+        
+        def terminal_condition(t : float, X : np.ndarray) -> bool: return X[2] - cls.R_E
+        
+        terminal_condition.terminal = True
+        
+        def derived(t : np.ndarray, X : np.ndarray) -> dict:
+            
+            q_c_dot, q_r_dot = cls.stagnation_point_heat_tranfer_rate(X[2], X[0])
+            
+            return dict(altitude=X[2] - cls.R_E, q_c_dot=q_c_dot, q_r_dot=q_r_dot)
+        
+        y_0 = np.array(y_0, dtype=float)
+        
+        y_0[2] += cls.R_E
+        
+        cls._parachute_deployed     = False
+        cls._parachute_deployed_t_0 = 0
+        cls._parachute_opening_time = 0
+        
+        yield from Propagator.iter_propagate(cls.entry_eom, y_0, [t_0, t_f], chunk_seconds, method='RK45', events=[terminal_condition], derived=derived, rtol=1e-8, atol=1e-8)
+    
+    @classmethod
+    def ensemble_eom(cls, t : float, X : np.ndarray) -> np.ndarray:
+        """Atmospheric entry equations of motion of an ensemble of capsules (parachute excluded)
+
+        Args:
+            t (float): Time
+            X (np.ndarray): States [5,N] -> (V, gamma, r, x, m)
+
+        Returns:
+            np.ndarray: Derivatives of the states [5,N]
+        """
+        
+        V, gamma, r, x, m = X
+        
+        rho = 1.5 * np.exp(-(r - cls.R_E) / cls.H) # * [kg / m^3]
+        
+        C_L, C_D = cls.C_L, cls.C_D
+        
+        if cls.alpha_schedule is not None: C_D_0, C_L, C_D = cls.aero.coefficients(np.interp(t, *cls.alpha_schedule))
+        
+        if cls.sigma_schedule is not None: C_L = C_L * np.cos(np.interp(t, *cls.sigma_schedule))
+        
+        q = 0.5 * rho * (V * 1e3)**2 * cls.S * 1e-3 # * Dynamic pressure times surface [kg * km / s^2]
+        
+        cos_gamma = np.cos(gamma)
+        
+        return np.array([(cls.F * 1e-3 * np.cos(cls.csi) - q * C_D) / m - cls.k / r**2 * np.sin(gamma),
+                         (cls.F * 1e-3 * np.sin(cls.csi) + q * C_L) / (m * V) - cls.k / (r**2 * V) * cos_gamma + V / r * cos_gamma,
+                         V * np.sin(gamma),
+                         cls.R_E * V / r * cos_gamma,
+                         np.full_like(V, - cls.F * 1e-3 / (cls.g_E * cls.I_sp))])
+    
+    @classmethod
+    def corridor_block(cls, V_e : np.ndarray, gamma_e : np.ndarray, z_e : float, m_0 : float, t_f : float, dt : float, members : dict = None) -> np.ndarray:
+        """Integrates an ensemble of entries with a fixed step Runge-Kutta 4 scheme tracking the peak loads
+
+        Args:
+            V_e (np.ndarray): Entry velocities [N] [km/s]
+            gamma_e (np.ndarray): Entry flight path angles [N] [rad]
+            z_e (float): Entry altitude [km]
+            m_0 (float): Initial mass [kg]
+            t_f (float): Final time [s]
+            dt (float): Integration step [s]
+            members (dict, optional): Class members to set first (worker processes). Defaults to None.
+
+        Returns:
+            np.ndarray: [ peak deceleration [g_E], peak convective flux [W / cm^2], peak radiative flux [W / cm^2], outcome, final time [s] ] [5,N]
+        """
+        
+        for name, value in (members or {}).items(): setattr(cls, name, value)
+        
+        N = len(V_e)
+        
+        X = np.array([V_e, gamma_e, np.full(N, cls.R_E + z_e), np.zeros(N), np.full(N, m_0)], dtype=float)
+        
+        result = np.zeros((5, N))
+        
+        result[4] = t_f
+        
+        active = np.arange(N) # * Indexes of the capsules still flying
+        
+        edges = np.unique(cls.radiative_bands[:, :2][np.isfinite(cls.radiative_bands[:, :2])]) # * Radiative band edges [km/s]
+        
+        t = 0.0
+        
+        while len(active) and t < t_f:
+            
+            h = min(dt, t_f - t)
+            
+            # >>> 1. Runge-Kutta 4 step (k_1 also gives the loads of the current state)
+            
+            k_1 = cls.ensemble_eom(t, X)
+            k_2 = cls.ensemble_eom(t + h / 2, X + h / 2 * k_1)
+            k_3 = cls.ensemble_eom(t + h / 2, X + h / 2 * k_2)
+            k_4 = cls.ensemble_eom(t + h, X + h * k_3)
+            
+            q_c_dot, q_r_dot = cls.stagnation_point_heat_tranfer_rate(X[2], X[0])
+            
+            result[0, active] = np.maximum(result[0, active], np.abs(k_1[0]) / cls.g_E)
+            result[1, active] = np.maximum(result[1, active], q_c_dot)
+            result[2, active] = np.maximum(result[2, active], q_r_dot)
+            
+            X_0 = X
+            
+            X = X + h / 6 * (k_1 + 2 * k_2 + 2 * k_3 + k_4)
+            
+            t += h
+            
+            # ? The radiative flux jumps at the velocity band edges (the peak is usually there): both sides evaluated at the crossing
+            
+            for edge in edges:
+                
+                crossing = (X_0[0] - edge) * (X[0] - edge) < 0
+                
+                if not np.any(crossing): continue
+                
+                s   = (X_0[0, crossing] - edge) / (X_0[0, crossing] - X[0, crossing])
+                r   = X_0[2, crossing] + s * (X[2, crossing] - X_0[2, crossing])
+                
+                for V in [np.nextafter(edge, -np.inf), np.nextafter(edge, np.inf)]:
+                    
+                    result[2, active[crossing]] = np.maximum(result[2, active[crossing]], cls.stagnation_point_heat_tranfer_rate(r, np.full_like(r, V))[1])
+            
+            # >>> 2. Outcome: impact (1) or skip-out above the entry altitude (2)
+            
+            impact  = X[2] <= cls.R_E
+            skip    = (X[2] > cls.R_E + z_e) & (X[1] > 0)
+            done    = impact | skip
+            
+            if np.any(done):
+                
+                result[3, active[impact]]   = 1
+                result[3, active[skip]]     = 2
+                result[4, active[done]]     = t
+                
+                active  = active[~done]
+                X       = X[:, ~done]
+        
+        return result
+    
+    @classmethod
+    @ResultCache.cached(settings=dict(method='RK4', peaks='band edges'))
+    def entry_corridor(cls, V_e : np.ndarray, gamma_e : np.ndarray, z_e : float, m_0 : float, t_f : float = 3000.0, dt : float = 0.5, workers : int = 1, show : bool = False) -> dict:
+        """Maps the entry corridor sweeping a grid of entry velocities and flight path angles
+
+        Args:
+            V_e (np.ndarray): Entry velocities [km/s]
+            gamma_e (np.ndarray): Entry flight path angles [rad]
+            z_e (float): Entry altitude [km]
+            m_0 (float): Initial mass [kg]
+            t_f (float, optional): Final time [s]. Defaults to 3000.
+            dt (float, optional): Integration step [s]. Defaults to 0.5.
+            workers (int, optional): Number of processes (the class state is passed explicitly, the caller needs a __main__ guard on spawn platforms). Defaults to 1 (serial).
+            show (bool, optional): True for plotting the corridor. Defaults to False.
+
+        Returns:
+            dict: { V_e, gamma_e, a_max [g_E], q_c_max [W / cm^2], q_r_max [W / cm^2], outcome (0 captured, 1 impact, 2 skip-out), t_end [s] } as [len(gamma_e), len(V_e)] arrays
+        """
+        
+        V_e, gamma_e = np.meshgrid(np.asarray(V_e, dtype=float), np.asarray(gamma_e, dtype=float))
+        
+        # >>> 1. Ensemble split in blocks (one per process)
+        
+        blocks = [block for block in np.array_split(np.arange(V_e.size), min(V_e.size, workers or os.cpu_count() or 1)) if len(block)]
+        
+        if len(blocks) == 1:
+            
+            results = [cls.corridor_block(V_e.ravel(), gamma_e.ravel(), z_e, m_0, t_f, dt)]
+        
+        else:
+            
+            members = { name : getattr(cls, name) for name in ResultCache.class_members(cls) }
+            
+            with ProcessPoolExecutor(max_workers=len(blocks)) as executor:
+                
+                results = list(executor.map(cls.corridor_block, [V_e.ravel()[block] for block in blocks], [gamma_e.ravel()[block] for block in blocks], *[[argument] * len(blocks) for argument in [z_e, m_0, t_f, dt, members]]))
+        
+        a_max, q_c_max, q_r_max, outcome, t_end = [values.reshape(V_e.shape) for values in np.concatenate(results, axis=1)]
+        
+        # >>> 2. Plot
+        
+        if show:
+            
+            fig, axes = plt.subplots(1, 3, constrained_layout=True)
+            
+            fig.suptitle(f"ENTRY CORRIDOR: $z_e = {z_e}\\;\\;km$   $m = {m_0}\\;\\;kg$   $R_N = {cls.R_N}\\;\\;m$")
+            
+            for ax, values, label in zip(axes, [a_max, q_c_max, q_r_max], ['$a_{max}$ [$g_E$]', '$q_{c,max}$ [$W / cm^2$]', '$q_{r,max}$ [$W / cm^2$]']):
+                
+                ax.set_xlabel("$V_e$ [$km / s$]")
+                ax.set_ylabel("$\\gamma_e$ [°]")
+                ax.set_title(label)
+                fig.colorbar(ax.contourf(V_e, np.rad2deg(gamma_e), np.where(outcome == 2, np.nan, values), levels=20), ax=ax)
+                ax.contour(V_e, np.rad2deg(gamma_e), outcome, levels=[0.5, 1.5], colors='k')
+        
+        return dict(V_e=V_e, gamma_e=gamma_e, a_max=a_max, q_c_max=q_c_max, q_r_max=q_r_max, outcome=outcome.astype(int), t_end=t_end)
+    
     # ! SECTION 8.3
     
     @classmethod
@@ -263,12 +625,26 @@ class AtmosphericEntry:
         cls.phic_c  = phi_c
         cls.gamma   = gamma
         
+        if cls.aero.phi_1 != phi_1 or cls.aero.gamma != gamma: cls.aero = AerodynamicDatabase(phi_1, gamma)
+    
+    @classmethod
+    def set_entry_schedule(cls, alpha_schedule : np.ndarray = None, sigma_schedule : np.ndarray = None) -> None:
+        """Sets the angle of attack and bank angle schedules (linearly interpolated in time)
+
+        Args:
+            alpha_schedule (np.ndarray, optional): [ [t], [alpha] ] [s, rad]. Defaults to None (constant C_L and C_D).
+            sigma_schedule (np.ndarray, optional): [ [t], [sigma] ] [s, rad]. Defaults to None (no bank).
+        """
+        
+        cls.alpha_schedule = None if alpha_schedule is None else np.asarray(alpha_schedule, dtype=float)
+        cls.sigma_schedule = None if sigma_schedule is None else np.asarray(sigma_schedule, dtype=float)
+    
     @classmethod
     def calculate_aerodynamics_coefficients(cls, alpha : float) -> list:
         """Calculates the Aerodynamics coefficients
 
         Args:
-            alpha (float): Angle of attack
+            alpha (float): Angle of attack (may be an array)
 
         Returns:
             list: [ Zero-Lift Drag Coefficient, Lift Coefficient, Drag Coefficient ]
@@ -280,16 +656,7 @@ class AtmosphericEntry:
         
         epsilon = (cls.gamma - 1) / (cls.gamma + 1)
         
-        # >>> Zero-lift drag coefficient + capsule afterbody correction
-        
-        C_D_0 = (1 - 0.5 * epsilon) * (1 + np.cos(cls.phi_1)**2) - 0.05 / cls.gamma
-        
-        # >>> Lift and drag coefficients
-        
-        C_L = (C_D_0 * np.cos(alpha)**2 + 0.5 * (1 - 0.5 * epsilon) * np.sin(cls.phi_1)**2 * (3 * np.sin(alpha)**2 - 2)) * np.sin(alpha)
-        C_D = (C_D_0 * np.cos(alpha)**2 + 1.5 * (1 - 0.5 * epsilon) * np.sin(cls.phi_1)**2 * np.sin(alpha)**2) * np.cos(alpha)
-        
-        return [ C_D_0, C_L, C_D ]
+        return AerodynamicDatabase.newtonian(alpha, cls.phi_1, cls.gamma, epsilon)
     
     # ! SECTION 9.1
     
@@ -298,11 +665,11 @@ class AtmosphericEntry:
         """Calculates the Stagnation Point heat transfer rates
 
         Args:
-            r (float): Position [km]
-            V (float): velocity [km/s]
+            r (float): Position [km] (may be an array)
+            V (float): velocity [km/s] (may be an array)
 
         Returns:
-            list: [ Convection, Radiation ]
+            list: [ Convection, Radiation ] [ W / cm^2 ]
         """
         
         # >>> Convective - Sutton and Graves approximation (1971)
@@ -315,31 +682,117 @@ class AtmosphericEntry:
         
         # >>> Radiative - Johnson, Starkey, and Lewis approximation (2007)
         
-        k_1 = 0
-        k_2 = 0
-        k_3 = 0
+        # ? Coefficients selected by velocity band (masked, V and r may be arrays)
         
-        if V < 7.62:
+        V = np.asarray(V, dtype=float)
             
-            k_1 = 372.6
-            k_2 = 8.5
-            k_3 = 1.6
+        k_1 = np.zeros_like(V)
+        k_2 = np.zeros_like(V)
+        k_3 = np.zeros_like(V)
         
-        elif 7.62 < V < 9:
+        for V_min, V_max, *k in cls.radiative_bands:
             
-            k_1 = 25.34
-            k_2 = 12.5
-            k_3 = 1.78
+            band = (V_min < V) & (V < V_max)
+            
+            k_1[band], k_2[band], k_3[band] = k
         
         q_r_dot = cls.R_N * k_1 * (3.28084e-4 * V * 1e3)**k_2 * (rho / 1.225)**k_3
         
         return [ q_c_dot, q_r_dot ]
 
+# --- TRAJECTORY CLASS 
+
+class EntryTrajectory(FlightTrajectory):
+    """Atmospheric entry trajectory with the derived heating quantities"""
+    
+    # --- METHODS 
+    
+    @cached_property
+    def heat_flux(self) -> np.ndarray:
+        """Stagnation point heat transfer rates on the evaluation grid
+
+        Returns:
+            np.ndarray: [ Convection, Radiation ] [2, N] [ W / cm^2 ]
+        """
+        
+        return np.array(AtmosphericEntry.stagnation_point_heat_tranfer_rate(self.y[2], self.y[0])).reshape(2, -1)
+    
+    @cached_property
+    def heat_load(self) -> np.ndarray:
+        """Stagnation point heat loads (trapezoidal integration of the heat transfer rates)
+
+        Returns:
+            np.ndarray: [ Convection, Radiation ] [ J / cm^2 ]
+        """
+        
+        if len(self.t) < 2: return np.zeros(2)
+        
+        return ode.trapezoid(self.heat_flux, self.t, axis=1)
+    
+    @cached_property
+    def peak_heating(self) -> dict:
+        """Peaks of the stagnation point heat transfer rates (refined on the dense trajectory around the largest sample and at the radiative band edges)
+
+        Returns:
+            dict: { q_c_max [W / cm^2], t_q_c_max [s], q_r_max [W / cm^2], t_q_r_max [s] }
+        """
+        
+        peaks = []
+        
+        for j, q in enumerate(self.heat_flux):
+            
+            i = int(np.argmax(q))
+            
+            peak = [float(q[i]), float(self.t[i])]
+            
+            if 0 < i < len(q) - 1 and q[i] > 0:
+                
+                # ? Bounded search between the neighbours of the largest sample
+                
+                rate = lambda t: -AtmosphericEntry.stagnation_point_heat_tranfer_rate(self(t)[2], self(t)[0])[j]
+                
+                result = minimize_scalar(rate, bounds=(self.t[i - 1], self.t[i + 1]), method='bounded', options=dict(xatol=1e-6))
+                
+                if -result.fun > peak[0]: peak = [float(-result.fun), float(result.x)]
+                    
+            if j == 1:
+                    
+                # ? The radiative flux jumps at the velocity band edges (the peak is usually there): both sides evaluated at the crossing
+            
+                for edge in np.unique(AtmosphericEntry.radiative_bands[:, :2][np.isfinite(AtmosphericEntry.radiative_bands[:, :2])]):
+                    
+                    for k in np.flatnonzero((self.y[0, :-1] - edge) * (self.y[0, 1:] - edge) < 0):
+                        
+                        t = brentq(lambda t: self(t)[0] - edge, self.t[k], self.t[k + 1], xtol=1e-9)
+                        
+                        for V in [np.nextafter(edge, -np.inf), np.nextafter(edge, np.inf)]:
+                            
+                            q_r = float(AtmosphericEntry.stagnation_point_heat_tranfer_rate(self(t)[2], V)[1])
+                            
+                            if q_r > peak[0]: peak = [q_r, float(t)]
+            
+            peaks += peak
+        
+        return dict(zip(['q_c_max', 't_q_c_max', 'q_r_max', 't_q_r_max'], peaks))
+
 if __name__ == '__main__':
     
     print('EXAMPLE 6.1\n')
     AtmosphericEntry.set_capsule_parameters(0, 300, 0, 0, 1.096, 0.341)
+    result = AtmosphericEntry.simulate_atmospheric_entry(np.array([12.6161, np.deg2rad(-9), 120, 0, 26.27]), t_f=3000, show=True)
+    print(f"Heat load: {result['heat_load']} J/cm^2   Peak heating: {result['peak_heating']}")
+    print('-' * 40, '\n')
+    
+    print('AERODYNAMIC DATABASE\n')
+    AtmosphericEntry.aero.plot()
+    AtmosphericEntry.set_entry_schedule(alpha_schedule=[[0, 200, 400], np.deg2rad([-20, -20, 0])])
     AtmosphericEntry.simulate_atmospheric_entry(np.array([12.6161, np.deg2rad(-9), 120, 0, 26.27]), t_f=3000, show=True)
     print('-' * 40, '\n')
     
+    print('ENTRY CORRIDOR\n')
+    AtmosphericEntry.set_entry_schedule()
+    corridor = AtmosphericEntry.entry_corridor(np.linspace(7, 13, 100), np.deg2rad(np.linspace(-2, -15, 100)), 120, 26.27, show=True)
+    print(f"Impact: {np.sum(corridor['outcome'] == 1)}   Skip-out: {np.sum(corridor['outcome'] == 2)}   Captured: {np.sum(corridor['outcome'] == 0)}")
+    print('-' * 40, '\n')
+    
     plt.show()
\ No newline at end of file
@@ -13,11 +13,13 @@ import matplotlib.pyplot as plt
 
 from dataclasses import dataclass
 from scipy.optimize import newton
-from scipy.integrate import solve_ivp
+from scipy.integrate import solve_ivp, DOP853
+from contourpy import contour_generator
 
 sys.path.append(os.path.dirname(__file__))
 
 from AstronomicalData import AstronomicalData, CelestialBody
+from ResultCache import ResultCache
 
 # --- STRUCT 
 
@@ -50,13 +52,18 @@ class CircularRestrictedThreeBodyProblem():
     r_12    = AstronomicalData.semi_major_axis(CelestialBody.MOON)
     R_E_1   = AstronomicalData.equatiorial_radius(CelestialBody.EARTH)
     
+    # --- INTERNAL MEMBERS 
+    
+    _symmetry = dict(lyapunov=[[0, 4], [1, 3]], halo=[[0, 2, 4], [1, 3, 5]]) # * Free initial components and constraints at the half period of the symmetric orbits
+    
     # --- METHODS 
         
     # ! SECTION 2.12
     
     @classmethod
+    @ResultCache.cached()
     def calculate_orbital_parameters(cls, show : bool = False) -> ParametersCrtbp:
-        """Calculates the orbital parameters
+        """Calculates the orbital parameters (cached by the bodies data, computed once)
 
         Args:
             show (bool, optional): Shows the console print. Defaults to False.
@@ -97,11 +104,7 @@ class CircularRestrictedThreeBodyProblem():
         
         # ? Lagrange points
         
-        f = lambda csi, pi_2: (1 - pi_2) / np.abs(csi + pi_2)**3 * (csi + pi_2) + pi_2 / np.abs(csi + pi_2 - 1)**3 * (csi + pi_2 - 1) - csi
-        
-        csi_1 = newton(f, 0.8369, args=(parameters.pi_2, ))
-        csi_2 = newton(f, 1.156, args=(parameters.pi_2, ))
-        csi_3 = newton(f, -1.005, args=(parameters.pi_2, ))
+        csi_1, csi_2, csi_3 = cls.collinear_points(parameters.pi_2)
         
         parameters.L_1 = np.array([csi_1 * cls.r_12, 0, 0])
         parameters.L_2 = np.array([csi_2 * cls.r_12, 0, 0])
@@ -130,6 +133,25 @@ class CircularRestrictedThreeBodyProblem():
         
         return parameters
     
+    @classmethod
+    def collinear_points(cls, pi_2 : float) -> np.ndarray:
+        """Calculates the dimensionless abscissae of the collinear Lagrange points
+
+        Args:
+            pi_2 (float): Dimensionless mass ratio 2
+
+        Returns:
+            np.ndarray: [csi_1, csi_2, csi_3] (units of r_12 from the barycenter)
+        """
+        
+        f = lambda csi, pi_2: (1 - pi_2) / np.abs(csi + pi_2)**3 * (csi + pi_2) + pi_2 / np.abs(csi + pi_2 - 1)**3 * (csi + pi_2 - 1) - csi
+        
+        # ? Initial guesses from the Hill sphere radius
+        
+        gamma = (pi_2 / 3)**(1 / 3)
+        
+        return np.array([newton(f, 1 - pi_2 - gamma, args=(pi_2, )), newton(f, 1 - pi_2 + gamma, args=(pi_2, )), newton(f, - 1 - 5 / 12 * pi_2, args=(pi_2, ))])
+    
     @classmethod
     def crtbp_eom(cls, t : float, X : np.ndarray, parameters : ParametersCrtbp) -> np.ndarray:
         """Equations of the Circular Restricted Three Body Problem dynamics
@@ -243,6 +265,444 @@ class CircularRestrictedThreeBodyProblem():
         
         return dict(t=integrationResult['t'], y=integrationResult['y'])
 
+    # ! PERIODIC ORBITS (dimensionless units: r_12, 1 / Omega, barycentric rotating frame)
+    
+    @classmethod
+    def jacobi_constant(cls, X : np.ndarray, pi_2 : float) -> np.ndarray:
+        """Calculates the Jacobi constant C = 2 U - v^2
+
+        Args:
+            X (np.ndarray): Dimensionless states [...,6]
+            pi_2 (float): Dimensionless mass ratio 2
+
+        Returns:
+            np.ndarray: Jacobi constant [...]
+        """
+        
+        x, y, z, v_x, v_y, v_z = np.moveaxis(np.asarray(X), -1, 0)
+        
+        r_1 = np.sqrt((x + pi_2)**2 + y**2 + z**2)
+        r_2 = np.sqrt((x - 1 + pi_2)**2 + y**2 + z**2)
+        
+        return x**2 + y**2 + 2 * (1 - pi_2) / r_1 + 2 * pi_2 / r_2 - (v_x**2 + v_y**2 + v_z**2)
+    
+    @classmethod
+    def variational_eom(cls, t : float, X : np.ndarray, pi_2 : float, out : np.ndarray = None) -> np.ndarray:
+        """Dimensionless equations of the CRTBP dynamics with the variational equations of the State Transition Matrix (dPhi/dt = A Phi)
+
+        Args:
+            t (float): Time
+            X (np.ndarray): State [...,6] or state with State Transition Matrix (row-major) [...,42]
+            pi_2 (float): Dimensionless mass ratio 2
+            out (np.ndarray, optional): Preallocated derivative written in place. Defaults to None.
+
+        Returns:
+            np.ndarray: Derivative of state
+        """
+        
+        dX_dt = np.empty_like(X) if out is None else out
+        
+        x, y, z = X[..., 0], X[..., 1], X[..., 2]
+        
+        d_1 = x + pi_2
+        d_2 = x - 1 + pi_2
+        
+        r_1 = d_1**2 + y**2 + z**2
+        r_2 = d_2**2 + y**2 + z**2
+        
+        a_1 = (1 - pi_2) / (r_1 * np.sqrt(r_1))
+        a_2 = pi_2 / (r_2 * np.sqrt(r_2))
+        
+        a = a_1 + a_2
+        
+        # >>> State
+        
+        dX_dt[..., 0:3] = X[..., 3:6]
+        dX_dt[..., 3]   = + 2 * X[..., 4] + x - a_1 * d_1 - a_2 * d_2
+        dX_dt[..., 4]   = - 2 * X[..., 3] + y - a * y
+        dX_dt[..., 5]   = - a * z
+        
+        if X.shape[-1] == 6: return dX_dt
+        
+        # >>> State Transition Matrix (A = [[0, I], [U, 2 W]] with U the Hessian of the potential)
+        
+        b_1 = 3 * a_1 / r_1
+        b_2 = 3 * a_2 / r_2
+        
+        b = b_1 + b_2
+        
+        U_xy = (b_1 * d_1 + b_2 * d_2) * y
+        U_xz = (b_1 * d_1 + b_2 * d_2) * z
+        U_yz = b * y * z
+        
+        U = np.stack([np.stack([1 - a + b_1 * d_1**2 + b_2 * d_2**2, U_xy, U_xz], axis=-1),
+                      np.stack([U_xy, 1 - a + b * y**2, U_yz], axis=-1),
+                      np.stack([U_xz, U_yz, - a + b * z**2], axis=-1)], axis=-2)
+        
+        Phi     = X[..., 6:].reshape(X.shape[:-1] + (6, 6))
+        dPhi_dt = dX_dt[..., 6:].reshape(X.shape[:-1] + (6, 6))
+        
+        dPhi_dt[..., 0:3, :] = Phi[..., 3:6, :]
+        
+        np.matmul(U, Phi[..., 0:3, :], out=dPhi_dt[..., 3:6, :])
+        
+        dPhi_dt[..., 3, :] += 2 * Phi[..., 4, :]
+        dPhi_dt[..., 4, :] -= 2 * Phi[..., 3, :]
+        
+        return dX_dt
+    
+    @classmethod
+    def propagate_stm(cls, X_0 : np.ndarray, t : np.ndarray, pi_2 : float, steps : int = 100) -> list:
+        """Propagates states and State Transition Matrices with the fixed step Dormand-Prince 8 scheme (every member on its own time span)
+
+        Args:
+            X_0 (np.ndarray): Dimensionless initial states [...,6]
+            t (np.ndarray): Dimensionless final times [...]
+            pi_2 (float): Dimensionless mass ratio 2
+            steps (int, optional): Number of steps. Defaults to 100.
+
+        Returns:
+            list: [states [...,6], State Transition Matrices [...,6,6], state derivatives [...,6]] at the final times
+        """
+        
+        A, B = DOP853.A, DOP853.B
+        
+        # ? Time normalized to [0, 1] (dX/ds = t f(X)), so the members share the step sequence
+        
+        t = np.asarray(t, dtype=float)[..., np.newaxis]
+        
+        Y = np.empty(shape=np.shape(X_0)[:-1] + (42, ))
+        
+        Y[..., :6] = X_0
+        Y[..., 6:] = np.eye(6).ravel()
+        
+        K = np.empty(shape=(DOP853.n_stages, ) + Y.shape)
+        
+        h = 1.0 / steps
+        
+        for k in range(steps):
+            
+            for i in range(DOP853.n_stages):
+                
+                cls.variational_eom(0.0, Y + h * np.tensordot(A[i, :i], K[:i], axes=1) if i else Y, pi_2, out=K[i])
+                
+                K[i] *= t
+            
+            Y += h * np.tensordot(B, K, axes=1)
+        
+        return [Y[..., :6], Y[..., 6:].reshape(Y.shape[:-1] + (6, 6)), cls.variational_eom(0.0, Y[..., :6], pi_2)]
+    
+    @classmethod
+    def lyapunov_initial_guess(cls, pi_2 : float, point : int = 1, amplitude : float = 1e-3) -> list:
+        """Planar Lyapunov orbit about a collinear Lagrange point from the linearized dynamics
+
+        Args:
+            pi_2 (float): Dimensionless mass ratio 2
+            point (int, optional): Lagrange point (1, 2 or 3). Defaults to 1.
+            amplitude (float, optional): Dimensionless amplitude along x. Defaults to 1e-3.
+
+        Returns:
+            list: [initial state [6], period]
+        """
+        
+        if point not in [1, 2, 3]: raise Exception('Invalid collinear Lagrange point')
+        
+        csi = cls.collinear_points(pi_2)[point - 1]
+        
+        # >>> 1. Hessian of the potential at the point (U_xx = 1 + 2 c_2, U_yy = 1 - c_2)
+        
+        c_2 = (1 - pi_2) / np.abs(csi + pi_2)**3 + pi_2 / np.abs(csi - 1 + pi_2)**3
+        
+        U_xx, U_yy = 1 + 2 * c_2, 1 - c_2
+        
+        # >>> 2. In-plane oscillation frequency (center eigenvalue)
+        
+        beta = 4 - U_xx - U_yy
+        
+        omega = np.sqrt((beta + np.sqrt(beta**2 - 4 * U_xx * U_yy)) / 2)
+        
+        # >>> 3. Perpendicular crossing of the x-axis
+        
+        X_0 = np.array([csi + amplitude, 0, 0, 0, - (omega**2 + U_xx) * amplitude / 2, 0])
+        
+        return [X_0, 2 * np.pi / omega]
+    
+    @classmethod
+    def correct_periodic_orbit(cls, X_0 : np.ndarray, T : np.ndarray, pi_2 : float, family : str = 'lyapunov', fixed : int = 0, tol : float = 1e-10, max_iter : int = 10, steps : int = 100, max_steps : int = 6400) -> list:
+        """Single shooting differential correction of symmetric periodic orbits (perpendicular crossings of the xz-plane)\n
+
+        The free variables are the non-fixed initial components and the half period, the constraints y = v_x (= v_z) = 0 at the half period.
+        The integration steps double until the drift of the Jacobi constant of the converged orbits is within the tolerance
+
+        Args:
+            X_0 (np.ndarray): Dimensionless initial guesses [6] (or a batch [N,6]) -> (x, 0, z, 0, v_y, 0)
+            T (np.ndarray): Period guesses [] (or [N])
+            pi_2 (float): Dimensionless mass ratio 2
+            family (str, optional): 'lyapunov' (planar) or 'halo' (spatial). Defaults to 'lyapunov'.
+            fixed (int, optional): Fixed initial component (0 for x, 2 for z). Defaults to 0.
+            tol (float, optional): Tolerance on the constraints. Defaults to 1e-10.
+            max_iter (int, optional): Maximum number of iterations. Defaults to 10.
+            steps (int, optional): Initial integration steps per half period. Defaults to 100.
+            max_steps (int, optional): Maximum integration steps per half period. Defaults to 6400.
+
+        Returns:
+            list: [initial states, periods, converged flags, integration steps]
+        """
+        
+        if family not in cls._symmetry: raise Exception('Invalid periodic orbit family')
+        
+        free, constraints = cls._symmetry[family]
+        
+        free = [i for i in free if i != fixed]
+        
+        X_0 = np.array(X_0, dtype=float)
+        T   = np.array(T, dtype=float)
+        
+        iteration = 0
+        
+        while True:
+            
+            # >>> 1. Constraints at the half period
+            
+            X_f, Phi, dX_dt = cls.propagate_stm(X_0, T / 2, pi_2, steps)
+            
+            g = X_f[..., constraints]
+            
+            error = np.max(np.abs(g), axis=-1)
+            
+            # ? Integration accuracy (the Jacobi constant is conserved)
+            
+            drift = np.abs(cls.jacobi_constant(X_f, pi_2) - cls.jacobi_constant(X_0, pi_2))
+            
+            converged = (error < tol) & (drift <= tol)
+            
+            if np.all(converged) or iteration == max_iter: break
+            
+            if np.all(error < tol):
+                
+                if 2 * steps > max_steps: break
+                
+                steps = 2 * steps
+                
+                continue
+            
+            iteration += 1
+            
+            # >>> 2. Newton update (Jacobian: STM columns of the free variables, state derivative for the half period)
+            
+            D = np.concatenate((Phi[..., constraints, :][..., free], dX_dt[..., constraints, np.newaxis]), axis=-1)
+            
+            valid = np.all(np.isfinite(D), axis=(-2, -1)) & np.isfinite(error)
+            
+            D = np.where(valid[..., np.newaxis, np.newaxis], D, np.eye(len(constraints)))
+            g = np.where((valid & (error >= tol))[..., np.newaxis], g, 0)
+            
+            dz = - np.squeeze(np.linalg.pinv(D) @ g[..., np.newaxis], axis=-1)
+            
+            X_0[..., free] += dz[..., :-1]
+            
+            T += 2 * dz[..., -1]
+        
+        return [X_0, T, converged, steps]
+    
+    @classmethod
+    @ResultCache.cached(settings=dict(method='DOP853 fixed step'))
+    def continue_family(cls, X_0 : np.ndarray, T : float, pi_2 : float, family : str = 'lyapunov', parameter : int = 0, step : float = 1e-3, n : int = 100, batch : int = 32, tol : float = 1e-10, steps : int = 100, show : bool = False) -> dict:
+        """Natural parameter continuation of a family of symmetric periodic orbits\n
+
+        The orbits are corrected in batches: the guesses of a batch are extrapolated (quadratic fit) from the last converged orbits,
+        the batch size halves when a member fails and doubles again after a success
+
+        Args:
+            X_0 (np.ndarray): Dimensionless initial guess of the first orbit [6]
+            T (float): Period guess of the first orbit
+            pi_2 (float): Dimensionless mass ratio 2
+            family (str, optional): 'lyapunov' (planar) or 'halo' (spatial). Defaults to 'lyapunov'.
+            parameter (int, optional): Initial component used as natural parameter (0 for x, 2 for z). Defaults to 0.
+            step (float, optional): Parameter step. Defaults to 1e-3.
+            n (int, optional): Number of orbits. Defaults to 100.
+            batch (int, optional): Maximum batch size. Defaults to 32.
+            tol (float, optional): Tolerance on the constraints. Defaults to 1e-10.
+            steps (int, optional): Initial integration steps per half period (doubled along the family when needed). Defaults to 100.
+            show (bool, optional): True for plotting the family. Defaults to False.
+
+        Returns:
+            dict: { X_0: initial states [n,6], T: periods [n], C: Jacobi constants [n], parameter: natural parameter [n] }
+        """
+        
+        free = [i for i in cls._symmetry[family][0] if i != parameter]
+        
+        # >>> 1. First orbit
+        
+        X, T, converged, steps = cls.correct_periodic_orbit(X_0, T, pi_2, family, parameter, tol, steps=steps)
+        
+        if not converged: raise Exception('The first orbit of the family did not converge')
+        
+        states, periods = [X], [T]
+        
+        size = 1
+        
+        # >>> 2. Batches of orbits
+        
+        while len(states) < n:
+            
+            size = min(size, batch, n - len(states))
+            
+            p = np.array([x[parameter] for x in states[-3:]])
+            Z = np.array([np.append(x[free], t) for x, t in zip(states[-3:], periods[-3:])])
+            
+            p_next = states[-1][parameter] + step * np.arange(1, size + 1)
+            
+            # ? Quadratic (or lower) extrapolation of the free variables and of the period
+            
+            coefficients = np.polynomial.polynomial.polyfit(p, Z, len(p) - 1)
+            
+            Z_next = np.polynomial.polynomial.polyval(p_next, coefficients).T
+            
+            X_guess = np.tile(states[-1], (size, 1))
+            
+            X_guess[:, parameter], X_guess[:, free] = p_next, Z_next[:, :-1]
+            
+            X_next, T_next, converged, steps = cls.correct_periodic_orbit(X_guess, Z_next[:, -1], pi_2, family, parameter, tol, steps=steps)
+            
+            # ? Members accepted up to the first failure (or collapse on the trivial solution T = 0)
+            
+            accepted = np.argmin(np.append(converged & (np.abs(T_next - Z_next[:, -1]) < 0.1 * np.abs(Z_next[:, -1])), False))
+            
+            states  += list(X_next[:accepted])
+            periods += list(T_next[:accepted])
+            
+            if accepted == size: size *= 2
+            
+            elif size > 1: size //= 2
+            
+            else: break
+        
+        X_0, T = np.array(states), np.array(periods)
+        
+        C = cls.jacobi_constant(X_0, pi_2)
+        
+        # >>> 3. Plot
+        
+        if show:
+            
+            plt.figure(figsize=(10, 8))
+            
+            ax = plt.axes(projection='3d')
+            
+            colors = plt.cm.viridis(np.linspace(0, 1, len(T)))
+            
+            for i in range(0, len(T), max(1, len(T) // 20)):
+                
+                orbit = solve_ivp(fun=cls.variational_eom, t_span=[0, T[i]], y0=X_0[i], method='DOP853', args=(pi_2, ), rtol=1e-10, atol=1e-10, dense_output=True)
+                
+                x, y, z = orbit.sol(np.linspace(0, T[i], 500))[:3]
+                
+                ax.plot(x, y, z, color=colors[i])
+            
+            ax.scatter(1 - pi_2, 0, 0, c='m')
+            
+            ax.set_title(f'{family.capitalize()} Family')
+            ax.set_xlabel('$x$ [-]')
+            ax.set_ylabel('$y$ [-]')
+            ax.set_zlabel('$z$ [-]')
+            
+            plt.show()
+        
+        return dict(X_0=X_0, T=T, C=C, parameter=X_0[:, parameter])
+
+    # ! ZERO-VELOCITY SURFACES
+    
+    @classmethod
+    @ResultCache.cached(members=[])
+    def jacobi_field(cls, pi_2 : float, x : np.ndarray, y : np.ndarray, z : np.ndarray = 0.0, chunk : int = 256) -> np.ndarray:
+        """Evaluates the Jacobi constant at rest C = 2 U (zero-velocity value) on a 2D or 3D grid (cached by mass ratio and grid)\n
+
+        The grid is filled by blocks of rows in single precision, so the temporaries never exceed chunk x len(x) values
+
+        Args:
+            pi_2 (float): Dimensionless mass ratio 2
+            x (np.ndarray): Dimensionless abscissae [n_x]
+            y (np.ndarray): Dimensionless ordinates [n_y]
+            z (np.ndarray, optional): Dimensionless height (scalar for a plane, array for a 3D grid) [n_z]. Defaults to 0.0.
+            chunk (int, optional): Rows evaluated at once. Defaults to 256.
+
+        Returns:
+            np.ndarray: Jacobi constant [n_y,n_x] (or [n_z,n_y,n_x])
+        """
+        
+        x, y, z = np.asarray(x, dtype=float), np.asarray(y, dtype=float), np.asarray(z, dtype=float)
+        
+        C = np.empty(shape=z.shape + (len(y), len(x)), dtype=np.float32)
+        
+        d_1 = (x + pi_2)**2
+        d_2 = (x - 1 + pi_2)**2
+        
+        for k in np.ndindex(z.shape):
+            
+            for i in range(0, len(y), chunk):
+                
+                h = (y[i:i + chunk, np.newaxis]**2 + z[k]**2)
+                
+                C[k + (slice(i, i + chunk), )] = x**2 + y[i:i + chunk, np.newaxis]**2 + 2 * (1 - pi_2) / np.sqrt(d_1 + h) + 2 * pi_2 / np.sqrt(d_2 + h)
+        
+        return C
+    
+    @classmethod
+    def zero_velocity_curves(cls, pi_2 : float, C : list, x_lim : tuple = (-1.5, 1.5), y_lim : tuple = (-1.5, 1.5), n : int = 1000, z : float = 0.0, show : bool = False) -> dict:
+        """Extracts the zero-velocity curves (C = 2 U) at the given Jacobi constants on a plane z = const
+
+        Args:
+            pi_2 (float): Dimensionless mass ratio 2
+            C (list): Jacobi constants
+            x_lim (tuple, optional): Dimensionless abscissa limits. Defaults to (-1.5, 1.5).
+            y_lim (tuple, optional): Dimensionless ordinate limits. Defaults to (-1.5, 1.5).
+            n (int, optional): Grid points per axis. Defaults to 1000.
+            z (float, optional): Dimensionless height of the plane. Defaults to 0.0.
+            show (bool, optional): True for plotting the curves and the forbidden regions. Defaults to False.
+
+        Returns:
+            dict: { C: list of curves [x, y] (ready for axes.plot(x, y)) }
+        """
+        
+        x = np.linspace(x_lim[0], x_lim[1], n)
+        y = np.linspace(y_lim[0], y_lim[1], n)
+        
+        field = cls.jacobi_field(pi_2, x, y, z)
+        
+        # ? Field clipped near the primaries (singular), far above every level of interest
+        
+        generator = contour_generator(x, y, np.minimum(field, 2 * np.max(C) + 1), line_type='Separate')
+        
+        curves = { c : [[line[:, 0], line[:, 1]] for line in generator.lines(c)] for c in C }
+        
+        if show:
+            
+            plt.figure(figsize=(10, 8))
+            
+            colors = plt.cm.viridis(np.linspace(0, 1, len(C)))
+            
+            for c, color in zip(C, colors):
+                
+                plt.contourf(x, y, field, levels=[0, c], colors=[color], alpha=0.15)
+                
+                for line_x, line_y in curves[c]: plt.plot(line_x, line_y, color=color)
+                
+                plt.plot([], [], color=color, label=f'$C$ = {c:.4f}')
+            
+            plt.scatter([- pi_2, 1 - pi_2], [0, 0], c='k')
+            
+            plt.title('Zero-Velocity Curves')
+            plt.xlabel('$x$ [-]')
+            plt.ylabel('$y$ [-]')
+            
+            plt.axis('equal')
+            plt.grid()
+            plt.legend()
+            plt.show()
+        
+        return curves
+
 if __name__  == '__main__':
     
     print('EXAMPLE 2.16\n')
@@ -260,4 +720,20 @@ if __name__  == '__main__':
     y0 = np.array([x, y, 0, vx, vy, vz])
     
     CircularRestrictedThreeBodyProblem.simulate_crtbp(y0, 0, 100 * 24 * 3600, show=True)
-    print('-' * 40, '\n')
\ No newline at end of file
+    print('-' * 40, '\n')
+    print('PERIODIC ORBIT FAMILIES\n')
+    pi_2 = CircularRestrictedThreeBodyProblem.calculate_orbital_parameters().pi_2
+    X_0, T = CircularRestrictedThreeBodyProblem.lyapunov_initial_guess(pi_2, 1, 1e-3)
+    lyapunov = CircularRestrictedThreeBodyProblem.continue_family(X_0, T, pi_2, 'lyapunov', parameter=0, step=2e-4, n=300, show=True)
+    print(f'L1 Lyapunov: {len(lyapunov["T"])} orbits, T = {lyapunov["T"][0]:.4f} ... {lyapunov["T"][-1]:.4f}, C = {lyapunov["C"][0]:.4f} ... {lyapunov["C"][-1]:.4f}')
+    halo = CircularRestrictedThreeBodyProblem.continue_family(np.array([0.8234, 0, 0.0224, 0, 0.1343, 0]), 2.743, pi_2, 'halo', parameter=2, step=1e-3, n=150, show=True)
+    print(f'L1 Halo:     {len(halo["T"])} orbits, T = {halo["T"][0]:.4f} ... {halo["T"][-1]:.4f}, C = {halo["C"][0]:.4f} ... {halo["C"][-1]:.4f}')
+    print('-' * 40, '\n')
+
+    print('ZERO-VELOCITY CURVES\n')
+    L = np.array([[csi, 0, 0, 0, 0, 0] for csi in CircularRestrictedThreeBodyProblem.collinear_points(pi_2)])
+    C_L = CircularRestrictedThreeBodyProblem.jacobi_constant(L, pi_2)
+    print(f'C(L1) = {C_L[0]:.5f}, C(L2) = {C_L[1]:.5f}, C(L3) = {C_L[2]:.5f}')
+    curves = CircularRestrictedThreeBodyProblem.zero_velocity_curves(pi_2, [C_L[0] + 0.01, C_L[0] - 0.01, C_L[1] - 0.01, 3.0], show=True)
+    print({ round(C, 4) : len(lines) for C, lines in curves.items() })
+    print('-' * 40, '\n')
@@ -0,0 +1,310 @@
+""" Eclipse.py: Implements the eclipse (umbra / penumbra) conical shadow model """
+
+__author__      = "Alessio Negri"
+__license__     = "LGPL v3"
+__maintainer__  = "Alessio Negri"
+__book__        = "Orbital Mechanics for Engineering Students"
+__chapter__     = "12 - Orbital Perturbations"
+
+import os
+import sys
+import numpy as np
+
+from enum import IntEnum
+from dataclasses import dataclass
+
+sys.path.append(os.path.dirname(__file__))
+
+from AstronomicalData import AstronomicalData, CelestialBody
+
+# --- ENUM 
+
+class ShadowType(IntEnum):
+    """Type of shadow region"""
+    
+    PENUMBRA    = 0
+    UMBRA       = 1
+
+# --- STRUCT 
+
+@dataclass
+class EclipseEvent:
+    """Eclipse interval"""
+    
+    shadow  : ShadowType    = ShadowType.PENUMBRA   # * Shadow region
+    t_entry : float         = 0.0                   # * Entry time      [ s ]
+    t_exit  : float         = 0.0                   # * Exit time       [ s ]
+    
+    @property
+    def duration(self) -> float: return self.t_exit - self.t_entry
+
+# --- CLASS 
+
+class Eclipse:
+    """Implements the conical shadow model of the central body, its event functions and the eclipse tables"""
+    
+    # --- ASTRONOMICAL CONSTANTS 
+    
+    R_E     = AstronomicalData.equatiorial_radius(CelestialBody.EARTH)
+    R_S     = AstronomicalData.R_0
+    
+    # --- METHODS 
+    
+    @classmethod
+    def set_celestial_body(cls, celestialBody : CelestialBody) -> None:
+        """Sets the current celectial body (occulting body)
+
+        Args:
+            celestialBody (CelestialBody): Celestial body
+        """
+        
+        cls.R_E = AstronomicalData.equatiorial_radius(celestialBody)
+    
+    # ! ALGORITHM 12.2 (vectorized)
+    @classmethod
+    def sun_position(cls, JD : np.ndarray) -> list:
+        """Calculates the position of the Sun with respect to the Earth based on the Astronomical Almanac for one or many Julian days
+
+        Args:
+            JD (np.ndarray): Julian day(s) [N]
+
+        Returns:
+            list: [r_sun GEF [N,3] (or [3]), lambda [rad], epsilon [rad]]
+        """
+        
+        JD = np.asarray(JD, dtype=float)
+        
+        # >>> 1. Number of days since J2000
+        
+        n = JD - 2_451_545.0
+        
+        # >>> 2. Mean anomaly, mean solar longitude, longitude, obliquity
+        
+        M   = np.deg2rad(np.mod(357.529 + 0.98560023 * n, 360))
+        L   = np.mod(280.459 + 0.98564736 * n, 360)
+        lam = np.deg2rad(np.mod(L + 1.915 * np.sin(M) + 0.0200 * np.sin(2 * M), 360))
+        eps = np.deg2rad(np.mod(23.439 - 3.56e-7 * n, 360))
+        
+        # >>> 3. Earth-Sun unit direction vector and distance
+        
+        u = np.stack([np.cos(lam), np.sin(lam) * np.cos(eps), np.sin(lam) * np.sin(eps)], axis=-1)
+        
+        r_S = (1.00014 - 0.01671 * np.cos(M) - 0.000140 * np.cos(2 * M)) * AstronomicalData.AU
+        
+        # >>> 4. Sun Geocentric position vector
+        
+        return [r_S[..., np.newaxis] * u, lam, eps]
+    
+    @classmethod
+    def shadow_geometry(cls, r_sat : np.ndarray, r_sun : np.ndarray) -> list:
+        """Calculates the apparent radii of the Sun and of the central body, and their angular separation, as seen from the satellite
+
+        Args:
+            r_sat (np.ndarray): Satellite position vector [3] or [N,3]
+            r_sun (np.ndarray): Sun position vector [3] or [N,3]
+
+        Returns:
+            list: [a (Sun apparent radius), b (body apparent radius), c (angular separation)] [rad]
+        """
+        
+        r_sat = np.asarray(r_sat, dtype=float)
+        r_sun = np.asarray(r_sun, dtype=float)
+        
+        # >>> 1. Satellite-Sun vector and magnitudes
+        
+        d = r_sun - r_sat
+        
+        _d_     = np.linalg.norm(d, axis=-1)
+        _r_sat_ = np.linalg.norm(r_sat, axis=-1)
+        
+        # >>> 2. Apparent radii
+        
+        a = np.arcsin(np.clip(cls.R_S / _d_, -1, 1))
+        b = np.arcsin(np.clip(cls.R_E / _r_sat_, -1, 1))
+        
+        # >>> 3. Angular separation between the body centre and the Sun centre
+        
+        c = np.arccos(np.clip(-np.sum(r_sat * d, axis=-1) / (_r_sat_ * _d_), -1, 1))
+        
+        return [a, b, c]
+    
+    @classmethod
+    def shadow_function(cls, r_sat : np.ndarray, r_sun : np.ndarray) -> np.ndarray:
+        """Evaluates the continuous shadow function (fraction of the solar disk visible from the satellite)
+
+        Args:
+            r_sat (np.ndarray): Satellite position vector [3] or [N,3]
+            r_sun (np.ndarray): Sun position vector [3] or [N,3]
+
+        Returns:
+            np.ndarray: Shadow function value (0 -> umbra, 0 < nu < 1 -> penumbra, 1 -> in light)
+        """
+        
+        a, b, c = cls.shadow_geometry(r_sat, r_sun)
+        
+        a, b, c = np.broadcast_arrays(a, b, c)
+        
+        nu = np.ones_like(c)
+        
+        # >>> 1. Umbra
+        
+        nu[c <= b - a] = 0.0
+        
+        # >>> 2. Annular eclipse (body apparent radius smaller than the Sun one)
+        
+        mask = c <= a - b
+        
+        nu[mask] = 1 - b[mask]**2 / a[mask]**2
+        
+        # >>> 3. Penumbra (partial overlap of the two disks)
+        
+        mask = (c < a + b) & (c > np.abs(a - b))
+        
+        if np.any(mask):
+            
+            a_, b_, c_ = a[mask], b[mask], c[mask]
+            
+            x = (c_**2 + a_**2 - b_**2) / (2 * c_)
+            y = np.sqrt(np.maximum(a_**2 - x**2, 0))
+            
+            A = a_**2 * np.arccos(np.clip(x / a_, -1, 1)) + b_**2 * np.arccos(np.clip((c_ - x) / b_, -1, 1)) - c_ * y
+            
+            nu[mask] = 1 - A / (np.pi * a_**2)
+        
+        return nu if nu.ndim > 0 else float(nu)
+    
+    @classmethod
+    def penumbra_function(cls, r_sat : np.ndarray, r_sun : np.ndarray) -> np.ndarray:
+        """Penumbra boundary function (negative inside the penumbra cone)
+
+        Args:
+            r_sat (np.ndarray): Satellite position vector [3] or [N,3]
+            r_sun (np.ndarray): Sun position vector [3] or [N,3]
+
+        Returns:
+            np.ndarray: c - (a + b) [rad]
+        """
+        
+        a, b, c = cls.shadow_geometry(r_sat, r_sun)
+        
+        return c - (a + b)
+    
+    @classmethod
+    def umbra_function(cls, r_sat : np.ndarray, r_sun : np.ndarray) -> np.ndarray:
+        """Umbra boundary function (negative inside the umbra cone)
+
+        Args:
+            r_sat (np.ndarray): Satellite position vector [3] or [N,3]
+            r_sun (np.ndarray): Sun position vector [3] or [N,3]
+
+        Returns:
+            np.ndarray: c - (b - a) [rad]
+        """
+        
+        a, b, c = cls.shadow_geometry(r_sat, r_sun)
+        
+        return c - (b - a)
+    
+    @classmethod
+    def events(cls, position) -> list:
+        """Builds the integrator events of the penumbra and umbra boundaries
+
+        Args:
+            position (Callable): Function (t, X) -> [r_sat, r_sun] giving the satellite and Sun position vectors
+
+        Returns:
+            list: [penumbra entry, penumbra exit, umbra entry, umbra exit] events accepting (t, X, *args)
+        """
+        
+        def event(boundary, direction : int):
+            
+            def fun(t : float, X : np.ndarray, *args) -> float: return float(boundary(*position(t, X)))
+            
+            fun.terminal    = False
+            fun.direction   = direction
+            
+            return fun
+        
+        return [event(cls.penumbra_function, -1),
+                event(cls.penumbra_function, +1),
+                event(cls.umbra_function, -1),
+                event(cls.umbra_function, +1)]
+    
+    @classmethod
+    def eclipse_table(cls, t_events : list, t_0 : float, t_f : float, initial : list = None) -> list:
+        """Pairs the entry / exit times of the integrator events into eclipse intervals
+
+        Args:
+            t_events (list): Event times [penumbra entry, penumbra exit, umbra entry, umbra exit]
+            t_0 (float): Initial time
+            t_f (float): Final time
+            initial (list, optional): [in penumbra, in umbra] at the initial time. Defaults to None ([False, False]).
+
+        Returns:
+            list: Eclipse intervals (EclipseEvent) sorted by entry time
+        """
+        
+        initial = [False, False] if initial is None else initial
+        
+        table = []
+        
+        for shadow, entries, exits, inside in [(ShadowType.PENUMBRA, t_events[0], t_events[1], initial[0]),
+                                               (ShadowType.UMBRA, t_events[2], t_events[3], initial[1])]:
+            
+            entries = list(np.sort(entries))
+            exits   = list(np.sort(exits))
+            
+            # >>> 1. Propagation starting inside the shadow
+            
+            if inside: entries.insert(0, t_0)
+            
+            # >>> 2. Propagation ending inside the shadow
+            
+            if len(entries) > len(exits): exits.append(t_f)
+            
+            table += [EclipseEvent(shadow, float(t_entry), float(t_exit)) for t_entry, t_exit in zip(entries, exits)]
+        
+        return sorted(table, key=lambda event: event.t_entry)
+    
+    @classmethod
+    def eclipse_intervals(cls, t : np.ndarray, r_sat : np.ndarray, r_sun : np.ndarray) -> list:
+        """Precomputes the eclipse intervals along a sampled reference orbit (linear interpolation of the boundary crossings)
+
+        Args:
+            t (np.ndarray): Time samples [N]
+            r_sat (np.ndarray): Satellite position vectors [N,3]
+            r_sun (np.ndarray): Sun position vectors [N,3] (or [3] for a fixed Sun)
+
+        Returns:
+            list: Eclipse intervals (EclipseEvent) sorted by entry time
+        """
+        
+        t = np.asarray(t, dtype=float)
+        
+        t_events = []
+        initial  = []
+        
+        for g in [cls.penumbra_function(r_sat, r_sun), cls.umbra_function(r_sat, r_sun)]:
+            
+            # >>> 1. Sign changes between consecutive samples
+            
+            idx = np.flatnonzero(np.sign(g[:-1]) != np.sign(g[1:]))
+            
+            # >>> 2. Linear interpolation of the crossing time
+            
+            t_cross = t[idx] - g[idx] * (t[idx + 1] - t[idx]) / (g[idx + 1] - g[idx])
+            
+            falling = g[idx + 1] < g[idx]
+            
+            t_events += [t_cross[falling], t_cross[~falling]]
+            initial.append(bool(g[0] < 0))
+        
+        return cls.eclipse_table(t_events, t[0], t[-1], initial)
+
+if __name__ == '__main__':
+    
+    print('EXAMPLE 12.8\n')
+    r_sat = np.array([2817.899, -14110.473, -7502.672])
+    r_sun = np.array([-11_747_041, 139_486_985, 60_472_278])
+    print(Eclipse.shadow_function(r_sat, r_sun), Eclipse.penumbra_function(r_sat, r_sun), Eclipse.umbra_function(r_sat, r_sun))
+    print('-' * 40, '\n')
@@ -12,7 +12,11 @@ import numpy as np
 import matplotlib.pyplot as plt
 
 from enum import IntEnum
-from datetime import datetime
+from datetime import datetime, timedelta
+from dataclasses import dataclass, field
+from concurrent.futures import ProcessPoolExecutor
+from scipy.optimize import minimize
+from scipy.ndimage import minimum_filter
 
 sys.path.append(os.path.dirname(__file__))
 
@@ -31,6 +35,17 @@ class FlybySide(IntEnum):
     DARK_SIDE   = 0
     SUNLIT_SIDE = 1
 
+@dataclass
+class TransferCandidate:
+    """Transfer found by the launch window search"""
+    
+    departureDate   : datetime          = None                                  # * Departure date
+    arrivalDate     : datetime          = None                                  # * Arrival date
+    T_F             : float             = 0.0                                   # * Time of flight          [ days ]
+    dv              : float             = 0.0                                   # * Total delta velocity    [ km / s ]
+    maneuver_1      : ManeuverResult    = field(default_factory=ManeuverResult) # * Departure maneuver
+    maneuver_2      : ManeuverResult    = field(default_factory=ManeuverResult) # * Arrival maneuver
+
 # --- CLASS 
 
 class InterplanetaryTrajectories:
@@ -427,7 +442,7 @@ class InterplanetaryTrajectories:
             r_p_A (float): Elliptical Capture Orbit pericenter radius
             T (float): Rendezvous Orbit period
             m (float): Mass of the spacecraft
-            gravityAssist (bool, optional): True for enabling gravity assist. Defaults to False.
+            gravityAssist (bool, optional): True for an unpowered fly-by of the arrival planet instead of the capture (maneuver_2 holds the postflyby heliocentric orbit). Defaults to False.
             side (FlybySide, optional): Side w.r.t. Sun. Defaults to FlybySide.DARK_SIDE.
         
         Returns:
@@ -530,69 +545,29 @@ class InterplanetaryTrajectories:
         
         else:
             
-            # >>> a. Directions
-            
-            u_S = - R_1 / np. linalg.norm(R_1)
-            u_V = V_1 / np.linalg.norm(V_1)
-            
-            print(v_inf_A)
-            print(u_S)
-            print(u_V)
-            
-            return
+            # >>> a. Unpowered fly-by hyperbola (pericenter r_p_A)
             
-            # >>> a. Hyperbola trajectory
-            
-            e_hyp = 1 + r_p_A * linalg.norm(v_inf_A)**2 / mu_A
-            
-            h_hyp = r_p_A * np.sqrt(linalg.norm(v_inf_A)**2 + 2 * mu_A / r_p)
+            e_hyp = 1 + r_p_A * np.linalg.norm(v_inf_A)**2 / mu_A
             
             delta = 2 * np.arcsin(1 / e_hyp)
             
-            beta = np.arccos(1 / e_hyp)
+            # >>> b. Turn of v_inf about the planet orbit normal (counterclockwise for dark side approach)
             
-            theta_inf = np.arccos(- 1 / e_hyp)
+            u_h = np.cross(R_2, V_2) / np.linalg.norm(np.cross(R_2, V_2))
             
-            Delta = h_hyp**2 / mu_A * 1 / np.sqrt(e_hyp**2 - 1)
+            phi = delta if side == FlybySide.DARK_SIDE else - delta
             
-            v_p = h_hyp / r_p
-            
-            phi_1 = np.arctan(v_inf_1[1] / v_inf_1[0])
-            
-            # >>> 3. Approach
-        
-            phi_2 = phi_1 + delta if side == FlybySide.DARK_SIDE else phi_1 - delta
-        
-            v_inf_2 = np.array([v_inf_m * np.cos(phi_2), v_inf_m * np.sin(phi_2)])
+            v_inf_2 = v_inf_A * np.cos(phi) + np.cross(u_h, v_inf_A) * np.sin(phi) + u_h * np.dot(u_h, v_inf_A) * (1 - np.cos(phi))
             
-            V_2_v = V_2 + v_inf_2
-            
-            V_t_2 = V_2_v[0]
-            
-            V_r_2 = - V_2_v[1]
-            
-            # >>> 4. Postflyby ellipse (orbit 2)
-                
-            h_2 = R_2 * V_t_2
+            # >>> c. Postflyby heliocentric orbit
             
-            e_cos = h_2**2 / (mu_sun * R_2) - 1
-            e_sin = V_r_2 * h_2 / mu_sun
-            
-            theta_2 = np.arctan2(e_sin, e_cos)
-            
-            e_2 = e_sin / np.sin(theta_2)
-            
-            R_p_2 = h_2**2 / mu_sun * 1 / (1 + e_2)
-        
-            # >>> c. Maneuver
-            
-            maneuver_2.dv = np.abs(v_p - v_c)
+            maneuver_2.dv = 0.0
             
             maneuver_2.dt = 0.0
             
-            maneuver_2.dm = OrbitalManeuvers.propellant_mass(m, maneuver_2.dv) # * - maneuver_1.dm
+            maneuver_2.dm = 0.0
             
-            maneuver_2.oe = OrbitalElements(h_2, e_2, 0, 0, 0, 0, 0)
+            maneuver_2.oe = ThreeDimensionalOrbit.calculate_orbital_elements(R_2, V_2 + v_inf_2, mu=AstronomicalData.gravitational_parameter(CelestialBody.SUN))
         
         return [maneuver_1, maneuver_2, oe, theta_2]
 
@@ -699,6 +674,251 @@ class InterplanetaryTrajectories:
             
             plt.show()
         
+    @classmethod
+    def transfer_cost(cls,
+                      departurePlanet : CelestialBody,
+                      arrivalPlanet : CelestialBody,
+                      departureDate : datetime,
+                      arrivalDate : datetime,
+                      r_p_D : float,
+                      r_p_A : float,
+                      T : float,
+                      m : float) -> list:
+        """Total delta velocity of the optimal transfer (infinite when the Lambert problem has no solution)
+
+        Args:
+            departurePlanet (CelestialBody): Departure planet
+            arrivalPlanet (CelestialBody): Arrival planet
+            departureDate (datetime): Departure date
+            arrivalDate (datetime): Arrival date
+            r_p_D (float): Circular Parking Orbit radius
+            r_p_A (float): Elliptical Capture Orbit pericenter radius
+            T (float): Rendezvous Orbit period
+            m (float): Mass of the spacecraft
+
+        Returns:
+            list: [dv, maneuver_1, maneuver_2]
+        """
+        
+        if arrivalDate <= departureDate: return [np.inf, None, None]
+        
+        try:
+            
+            with np.errstate(all='ignore'):
+                
+                maneuver_1, maneuver_2, oe, theta_2 = cls.optimal_transfer(departurePlanet, arrivalPlanet, departureDate, arrivalDate, r_p_D, r_p_A, T, m)
+        
+        except Exception:
+            
+            return [np.inf, None, None]
+        
+        dv = maneuver_1.dv + maneuver_2.dv
+        
+        return [dv if np.isfinite(dv) else np.inf, maneuver_1, maneuver_2]
+    
+    @classmethod
+    def transfer_cost_grid(cls,
+                           departurePlanet : CelestialBody,
+                           arrivalPlanet : CelestialBody,
+                           launchDates : list,
+                           arrivalDates : list,
+                           r_p_D : float,
+                           r_p_A : float,
+                           T : float,
+                           m : float) -> np.ndarray:
+        """Total delta velocity on a grid of launch / arrival dates
+
+        Args:
+            departurePlanet (CelestialBody): Departure planet
+            arrivalPlanet (CelestialBody): Arrival planet
+            launchDates (list): Launch dates
+            arrivalDates (list): Arrival dates
+            r_p_D (float): Circular Parking Orbit radius
+            r_p_A (float): Elliptical Capture Orbit pericenter radius
+            T (float): Rendezvous Orbit period
+            m (float): Mass of the spacecraft
+
+        Returns:
+            np.ndarray: Total delta velocity [n_arrival, n_launch] [ km / s ]
+        """
+        
+        dv = np.empty(shape=(len(arrivalDates), len(launchDates)), dtype=float)
+        
+        for lwIndex, lwDate in enumerate(launchDates):
+            
+            for awIndex, awDate in enumerate(arrivalDates):
+                
+                dv[awIndex, lwIndex] = cls.transfer_cost(departurePlanet, arrivalPlanet, lwDate, awDate, r_p_D, r_p_A, T, m)[0]
+        
+        return dv
+    
+    @classmethod
+    def refine_transfer(cls,
+                        departurePlanet : CelestialBody,
+                        arrivalPlanet : CelestialBody,
+                        launchWindow : list,
+                        arrivalWindow : list,
+                        seed : list,
+                        scale : list,
+                        r_p_D : float,
+                        r_p_A : float,
+                        T : float,
+                        m : float) -> TransferCandidate:
+        """Local minimization (Nelder-Mead on continuous epochs) of the total delta velocity
+
+        Args:
+            departurePlanet (CelestialBody): Departure planet
+            arrivalPlanet (CelestialBody): Arrival planet
+            launchWindow (list): Launch window
+            arrivalWindow (list): Arrival window
+            seed (list): Initial guess [launch, arrival] [days from the beginning of the windows]
+            scale (list): Size of the initial simplex [launch, arrival] [days]
+            r_p_D (float): Circular Parking Orbit radius
+            r_p_A (float): Elliptical Capture Orbit pericenter radius
+            T (float): Rendezvous Orbit period
+            m (float): Mass of the spacecraft
+
+        Returns:
+            TransferCandidate: Local optimum
+        """
+        
+        # >>> 1. Cost of the continuous epochs
+        
+        dates = lambda x: [launchWindow[0] + timedelta(days=float(x[0])), arrivalWindow[0] + timedelta(days=float(x[1]))]
+        
+        cost = lambda x: min(cls.transfer_cost(departurePlanet, arrivalPlanet, *dates(x), r_p_D, r_p_A, T, m)[0], 1e6)
+        
+        # >>> 2. Nelder-Mead
+        
+        x_0 = np.array(seed, dtype=float)
+        
+        simplex = np.array([x_0, x_0 + [scale[0], 0.0], x_0 + [0.0, scale[1]]])
+        
+        bounds = [(0.0, (launchWindow[1] - launchWindow[0]).total_seconds() / 86400), (0.0, (arrivalWindow[1] - arrivalWindow[0]).total_seconds() / 86400)]
+        
+        solution = minimize(cost, x_0, method='Nelder-Mead', bounds=bounds, options=dict(initial_simplex=np.clip(simplex, *np.array(bounds).T), xatol=1e-2, fatol=1e-6))
+        
+        # >>> 3. Result
+        
+        departureDate, arrivalDate = dates(solution.x)
+        
+        dv, maneuver_1, maneuver_2 = cls.transfer_cost(departurePlanet, arrivalPlanet, departureDate, arrivalDate, r_p_D, r_p_A, T, m)
+        
+        return TransferCandidate(departureDate, arrivalDate, (arrivalDate - departureDate).total_seconds() / 86400, dv, maneuver_1 or ManeuverResult(), maneuver_2 or ManeuverResult())
+    
+    @classmethod
+    def launch_window_search(cls,
+                             departurePlanet : CelestialBody,
+                             arrivalPlanet : CelestialBody,
+                             launchWindow : list,
+                             arrivalWindow : list,
+                             r_p_D : float,
+                             r_p_A : float,
+                             T : float,
+                             m : float,
+                             k : int = 5,
+                             grid : int = 48,
+                             seeds : int = 0,
+                             workers : int = None) -> list:
+        """Searches the k transfers with the lowest total delta velocity without evaluating the full pork chop
+
+        Args:
+            departurePlanet (CelestialBody): Departure planet
+            arrivalPlanet (CelestialBody): Arrival planet
+            launchWindow (list): Launch window
+            arrivalWindow (list): Arrival window
+            r_p_D (float): Circular Parking Orbit radius
+            r_p_A (float): Elliptical Capture Orbit pericenter radius
+            T (float): Rendezvous Orbit period
+            m (float): Mass of the spacecraft
+            k (int, optional): Number of transfers. Defaults to 5.
+            grid (int, optional): Number of cells per axis of the coarse grid. Defaults to 48.
+            seeds (int, optional): Number of local minimizations. Defaults to 0 (3 * k).
+            workers (int, optional): Number of processes (1 for a serial search). Defaults to None (all cores).
+
+        Returns:
+            list: Transfers (TransferCandidate) sorted by total delta velocity
+        """
+        
+        # >>> 1. Coarse grid
+        
+        lwDays = (launchWindow[1] - launchWindow[0]).total_seconds() / 86400
+        awDays = (arrivalWindow[1] - arrivalWindow[0]).total_seconds() / 86400
+        
+        lwOffsets = np.linspace(0, lwDays, max(2, min(grid, int(lwDays) + 1)))
+        awOffsets = np.linspace(0, awDays, max(2, min(grid, int(awDays) + 1)))
+        
+        launchDates     = [launchWindow[0] + timedelta(days=float(days)) for days in lwOffsets]
+        arrivalDates    = [arrivalWindow[0] + timedelta(days=float(days)) for days in awOffsets]
+        
+        scale = [lwOffsets[1] - lwOffsets[0], awOffsets[1] - awOffsets[0]]
+        
+        executor = ProcessPoolExecutor(max_workers=workers) if workers != 1 else None
+        
+        mapper = executor.map if executor is not None else map
+        
+        try:
+            
+            columns = np.array_split(np.arange(len(launchDates)), min(len(launchDates), 4 * (workers or os.cpu_count() or 1)))
+            
+            blocks = mapper(cls.transfer_cost_grid,
+                            [departurePlanet] * len(columns),
+                            [arrivalPlanet] * len(columns),
+                            [[launchDates[j] for j in column] for column in columns],
+                            [arrivalDates] * len(columns),
+                            [r_p_D] * len(columns),
+                            [r_p_A] * len(columns),
+                            [T] * len(columns),
+                            [m] * len(columns))
+            
+            dv = np.concatenate(list(blocks), axis=1)
+            
+            # >>> 2. Seeds (local minima of the coarse grid first, then the best remaining cells)
+            
+            finite = np.isfinite(dv)
+            
+            minima = finite & (dv == minimum_filter(np.where(finite, dv, np.inf), size=3, mode='nearest'))
+            
+            order = np.lexsort((np.where(finite, dv, np.inf).ravel(), ~minima.ravel()))
+            
+            order = [index for index in order if finite.ravel()[index]][:seeds or 3 * k]
+            
+            awIndexes, lwIndexes = np.unravel_index(order, dv.shape)
+            
+            # >>> 3. Local minimization of every seed
+            
+            candidates = list(mapper(cls.refine_transfer,
+                                     [departurePlanet] * len(order),
+                                     [arrivalPlanet] * len(order),
+                                     [launchWindow] * len(order),
+                                     [arrivalWindow] * len(order),
+                                     [[lwOffsets[j], awOffsets[i]] for i, j in zip(awIndexes, lwIndexes)],
+                                     [scale] * len(order),
+                                     [r_p_D] * len(order),
+                                     [r_p_A] * len(order),
+                                     [T] * len(order),
+                                     [m] * len(order)))
+        
+        finally:
+            
+            if executor is not None: executor.shutdown()
+        
+        # >>> 4. Top-k distinct transfers (seeds converged to the same optimum are merged)
+        
+        result = []
+        
+        for candidate in sorted(candidates, key=lambda candidate: candidate.dv):
+            
+            if not np.isfinite(candidate.dv): continue
+            
+            if any(abs((candidate.departureDate - other.departureDate).total_seconds()) < scale[0] * 86400 and abs((candidate.arrivalDate - other.arrivalDate).total_seconds()) < scale[1] * 86400 for other in result): continue
+            
+            result.append(candidate)
+            
+            if len(result) == k: break
+        
+        return result
+
 if __name__ == '__main__':
     
     print('EXAMPLE 8.1\n')
@@ -751,4 +971,16 @@ if __name__ == '__main__':
                                         [datetime(2031, 1, 1, 0, 0, 0), datetime(2050, 6, 1, 0, 0, 0)],
                                         step=3,
                                         show=True)
+    print('-' * 40, '\n')
+    
+    print('Launch Window Search')
+    for transfer in InterplanetaryTrajectories.launch_window_search(CelestialBody.EARTH,
+                                                                    CelestialBody.NEPTUNE,
+                                                                    [datetime(2020, 1, 1, 0, 0, 0), datetime(2040, 1, 1, 0, 0, 0)],
+                                                                    [datetime(2031, 1, 1, 0, 0, 0), datetime(2070, 1, 1, 0, 0, 0)],
+                                                                    6378 + 180,
+                                                                    AstronomicalData.equatiorial_radius(CelestialBody.NEPTUNE) + 300,
+                                                                    48 * 3600,
+                                                                    2000):
+        print(transfer.departureDate, transfer.arrivalDate, transfer.T_F, transfer.dv, transfer.maneuver_1.dv, transfer.maneuver_2.dv)
     print('-' * 40, '\n')
\ No newline at end of file
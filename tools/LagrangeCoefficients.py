@@ -210,6 +210,283 @@ class LagrangeCoefficients():
         
         return [r, v]
     
+    @classmethod
+    def stumpff(cls, z : np.ndarray) -> list:
+        """Stumpff functions S and C for arrays (series expansion around z = 0)
+
+        Args:
+            z (np.ndarray): Variable
+
+        Returns:
+            list: [S, C]
+        """
+        
+        s = np.sqrt(np.abs(z))
+        
+        with np.errstate(all='ignore'):
+            
+            S = np.where(z > 1e-3, (s - np.sin(s)) / s**3, np.where(z < -1e-3, (np.sinh(s) - s) / s**3, 1/6 - z / 120 + z**2 / 5040))
+            C = np.where(z > 1e-3, (1 - np.cos(s)) / z, np.where(z < -1e-3, (np.cosh(s) - 1) / -z, 1/2 - z / 24 + z**2 / 720))
+        
+        return [S, C]
+    
+    @classmethod
+    def universal_variable(cls, r_0 : np.ndarray, v_0 : np.ndarray, t : np.ndarray, mu : float = None, tol : float = 1e-12, max_iter : int = 50) -> list:
+        """Vectorized Algorithm 3.3: universal variable of many states (Newton on the whole grid)
+
+        Args:
+            r_0 (np.ndarray): Initial position vectors [N,3] (or [3])
+            v_0 (np.ndarray): Initial velocity vectors [N,3] (or [3])
+            t (np.ndarray): Times from the initial state, shared [T] or per state [T,N]
+            mu (float, optional): Gravitational parameter. Defaults to None (LagrangeCoefficients.mu).
+            tol (float, optional): Tolerance on the universal variable. Defaults to 1e-12.
+            max_iter (int, optional): Maximum number of Newton iterations. Defaults to 50.
+
+        Returns:
+            list: [chi, dt, alpha] (chi solved for dt, the time reduced to one period on elliptical orbits) [T,N]
+        """
+        
+        mu = cls.mu if mu is None else mu
+        
+        r_0, v_0 = np.asarray(r_0, dtype=float), np.asarray(v_0, dtype=float)
+        
+        t = np.asarray(t, dtype=float)
+        
+        if t.ndim < r_0.ndim: t = t.reshape((-1,) + (1,) * (r_0.ndim - 1))
+        
+        # >>> 1. Magnitudes, radial velocity and parameter alpha
+        
+        r_0_m = np.linalg.norm(r_0, axis=-1)
+        
+        v_r0 = np.sum(r_0 * v_0, axis=-1) / r_0_m
+        
+        alpha = 2 / r_0_m - np.sum(v_0 * v_0, axis=-1) / mu
+        
+        # ? Elliptical orbits: the time is reduced to one period (r and v are periodic)
+        
+        with np.errstate(all='ignore'): T = np.where(alpha > 0, 2 * np.pi / np.sqrt(np.abs(alpha))**3 / np.sqrt(mu), np.inf)
+        
+        dt = np.where(np.isfinite(T), np.fmod(t, T), t)
+        
+        # >>> 2. Universal variable (Newton iterations on the whole grid)
+        
+        chi = np.sqrt(mu) * np.abs(alpha) * dt
+        
+        # ? Hyperbolic orbits: logarithmic initial guess (the linear one diverges for long times)
+        
+        with np.errstate(all='ignore'):
+            
+            a = 1 / alpha
+            
+            chi_h = np.sign(dt) * np.sqrt(-a) * np.log(-2 * mu * alpha * dt / (r_0_m * v_r0 + np.sign(dt) * np.sqrt(-mu * a) * (1 - r_0_m * alpha)))
+        
+        chi = np.where((alpha < 0) & np.isfinite(chi_h) & (dt != 0), chi_h, chi)
+        
+        for _ in range(max_iter):
+            
+            z = alpha * chi**2
+            
+            S, C = cls.stumpff(z)
+            
+            F   = r_0_m * v_r0 / np.sqrt(mu) * chi**2 * C + (1 - alpha * r_0_m) * chi**3 * S + r_0_m * chi - np.sqrt(mu) * dt
+            dF  = r_0_m * v_r0 / np.sqrt(mu) * chi * (1 - z * S) + (1 - alpha * r_0_m) * chi**2 * C + r_0_m
+            
+            step = F / dF
+            
+            chi = chi - step
+            
+            if np.all(np.abs(step) <= tol * np.maximum(1, np.abs(chi))): break
+        
+        return [chi, np.broadcast_to(dt, chi.shape), np.broadcast_to(alpha, chi.shape)]
+    
+    @classmethod
+    def universal_lagrange_coefficients(cls, r_0 : np.ndarray, v_0 : np.ndarray, t : np.ndarray, mu : float = None, tol : float = 1e-12, max_iter : int = 50) -> list:
+        """Vectorized Algorithm 3.4: Lagrange coefficients and their derivatives of many states
+
+        Args:
+            r_0 (np.ndarray): Initial position vectors [N,3] (or [3])
+            v_0 (np.ndarray): Initial velocity vectors [N,3] (or [3])
+            t (np.ndarray): Times from the initial state, shared [T] or per state [T,N]
+            mu (float, optional): Gravitational parameter. Defaults to None (LagrangeCoefficients.mu).
+            tol (float, optional): Tolerance on the universal variable. Defaults to 1e-12.
+            max_iter (int, optional): Maximum number of Newton iterations. Defaults to 50.
+
+        Returns:
+            list: [f, g, df_dt, dg_dt] [T,N] (or [T] for a single initial state)
+        """
+        
+        mu = cls.mu if mu is None else mu
+        
+        r_0, v_0 = np.asarray(r_0, dtype=float), np.asarray(v_0, dtype=float)
+        
+        chi, dt, alpha = cls.universal_variable(r_0, v_0, t, mu, tol, max_iter)
+        
+        r_0_m = np.linalg.norm(r_0, axis=-1)
+        
+        v_r0 = np.sum(r_0 * v_0, axis=-1) / r_0_m
+        
+        z = alpha * chi**2
+        
+        S, C = cls.stumpff(z)
+        
+        # >>> 3. Lagrange coefficients
+        
+        f = 1 - chi**2 / r_0_m * C
+        
+        g = dt - 1 / np.sqrt(mu) * chi**3 * S
+        
+        # ? Radius from F = 0 (r = dF / dchi)
+        
+        r_m = r_0_m * v_r0 / np.sqrt(mu) * chi * (1 - z * S) + (1 - alpha * r_0_m) * chi**2 * C + r_0_m
+        
+        # >>> 4. Derivatives
+        
+        df_dt = np.sqrt(mu) / (r_m * r_0_m) * (z * chi * S - chi)
+        
+        dg_dt = 1 - chi**2 / r_m * C
+        
+        return [f, g, df_dt, dg_dt]
+    
+    @classmethod
+    def propagate(cls, r_0 : np.ndarray, v_0 : np.ndarray, t : np.ndarray, tol : float = 1e-12, max_iter : int = 50, mu : float = None) -> list:
+        """Vectorized Algorithm 3.4: positions and velocities of many states on a shared time grid
+
+        Args:
+            r_0 (np.ndarray): Initial position vectors [N,3] (or [3])
+            v_0 (np.ndarray): Initial velocity vectors [N,3] (or [3])
+            t (np.ndarray): Times from the initial state, shared [T] or per state [T,N]
+            tol (float, optional): Tolerance on the universal variable. Defaults to 1e-12.
+            max_iter (int, optional): Maximum number of Newton iterations. Defaults to 50.
+            mu (float, optional): Gravitational parameter. Defaults to None (LagrangeCoefficients.mu).
+
+        Returns:
+            list: [r, v] [T,N,3] (or [T,3] for a single initial state)
+        """
+        
+        r_0, v_0 = np.asarray(r_0, dtype=float), np.asarray(v_0, dtype=float)
+        
+        f, g, df_dt, dg_dt = cls.universal_lagrange_coefficients(r_0, v_0, t, mu, tol, max_iter)
+        
+        r = f[..., np.newaxis] * r_0 + g[..., np.newaxis] * v_0
+        v = df_dt[..., np.newaxis] * r_0 + dg_dt[..., np.newaxis] * v_0
+        
+        return [r, v]
+
+    @classmethod
+    def state_transition_matrix(cls, r_0 : np.ndarray, v_0 : np.ndarray, t : np.ndarray, mu : float = None, tol : float = 1e-12, max_iter : int = 50) -> list:
+        """Analytic state transition matrix of the two-body problem on a time grid (partials of the Lagrange coefficients through the universal functions)
+
+        Args:
+            r_0 (np.ndarray): Initial position vectors [N,3] (or [3])
+            v_0 (np.ndarray): Initial velocity vectors [N,3] (or [3])
+            t (np.ndarray): Times from the initial state, shared [T] or per state [T,N]
+            mu (float, optional): Gravitational parameter. Defaults to None (LagrangeCoefficients.mu).
+            tol (float, optional): Tolerance on the universal variable. Defaults to 1e-12.
+            max_iter (int, optional): Maximum number of Newton iterations. Defaults to 50.
+
+        Returns:
+            list: [r, v, Phi] [T,N,3], [T,N,3], [T,N,6,6] (or [T,3], [T,3], [T,6,6] for a single initial state)
+        """
+        
+        mu = cls.mu if mu is None else mu
+        
+        r_0, v_0 = np.asarray(r_0, dtype=float), np.asarray(v_0, dtype=float)
+        
+        t = np.asarray(t, dtype=float)
+        
+        if t.ndim < r_0.ndim: t = t.reshape((-1,) + (1,) * (r_0.ndim - 1))
+        
+        chi, dt, alpha = cls.universal_variable(r_0, v_0, t, mu, tol, max_iter)
+        
+        t = np.broadcast_to(t, chi.shape)
+        
+        # ? Whole revolutions restored (the partials with respect to alpha include the secular drift of the period)
+        
+        with np.errstate(all='ignore'): chi = np.where(dt != t, chi + (t - dt) * np.sqrt(mu) * alpha, chi)
+        
+        r_0_m = np.linalg.norm(r_0, axis=-1)
+        
+        sigma_0 = np.sum(r_0 * v_0, axis=-1)
+        
+        # >>> 1. Universal functions U_n = chi^n c_n(alpha chi^2)
+        
+        z = alpha * chi**2
+        
+        S, C = cls.stumpff(z)
+        
+        with np.errstate(all='ignore'):
+            
+            c_4 = np.where(np.abs(z) > 1e-3, (1/2 - C) / z, 1/24 - z / 720 + z**2 / 40320)
+            c_5 = np.where(np.abs(z) > 1e-3, (1/6 - S) / z, 1/120 - z / 5040 + z**2 / 362880)
+        
+        U_2, U_3, U_4, U_5 = chi**2 * C, chi**3 * S, chi**4 * c_4, chi**5 * c_5
+        
+        U_0, U_1 = 1 - alpha * U_2, chi - alpha * U_3
+        
+        # >>> 2. Lagrange coefficients
+        
+        r_m = sigma_0 / np.sqrt(mu) * U_1 + r_0_m * U_0 + U_2
+        
+        f, g = 1 - U_2 / r_0_m, (r_0_m * U_1 + sigma_0 / np.sqrt(mu) * U_2) / np.sqrt(mu)
+        
+        df_dt, dg_dt = -np.sqrt(mu) * U_1 / (r_m * r_0_m), 1 - U_2 / r_m
+        
+        # >>> 3. Partials with respect to p = (|r_0|, r_0 . v_0, alpha) [3,...]
+        
+        # ? dU_n / dalpha at fixed chi = (n U_n+2 - chi U_n+1) / 2
+        
+        dU_0_da, dU_1_da, dU_2_da, dU_3_da = -chi * U_1 / 2, (U_3 - chi * U_2) / 2, (2 * U_4 - chi * U_3) / 2, (3 * U_5 - chi * U_4) / 2
+        
+        zero = np.zeros_like(chi)
+        
+        # ? Universal Kepler equation sqrt(mu) t = sigma_0 / sqrt(mu) U_2 + |r_0| U_1 + U_3 (implicit in chi, dG / dchi = r)
+        
+        dchi = -np.stack([U_1, U_2 / np.sqrt(mu), sigma_0 / np.sqrt(mu) * dU_2_da + r_0_m * dU_1_da + dU_3_da]) / r_m
+        
+        da = np.stack([zero, zero, zero + 1])
+        
+        dU_0 = -alpha * U_1 * dchi + dU_0_da * da
+        dU_1 = U_0 * dchi + dU_1_da * da
+        dU_2 = U_1 * dchi + dU_2_da * da
+        dU_3 = U_2 * dchi + dU_3_da * da
+        
+        dr_0_m, dsigma_0 = np.stack([zero + 1, zero, zero]), np.stack([zero, zero + 1, zero])
+        
+        dr_m = U_1 / np.sqrt(mu) * dsigma_0 + sigma_0 / np.sqrt(mu) * dU_1 + U_0 * dr_0_m + r_0_m * dU_0 + dU_2
+        
+        df      = -dU_2 / r_0_m + U_2 / r_0_m**2 * dr_0_m
+        dg      = -dU_3 / np.sqrt(mu)
+        ddf_dt  = -np.sqrt(mu) / (r_m * r_0_m) * dU_1 - df_dt * (dr_m / r_m + dr_0_m / r_0_m)
+        ddg_dt  = -dU_2 / r_m + U_2 / r_m**2 * dr_m
+        
+        # >>> 4. Chain rule to the initial state (gradients of p with respect to r_0 and v_0) [3,...,6]
+        
+        ones = np.ones(chi.shape + (1,))
+        
+        dp = np.stack([
+            np.concatenate([r_0 / r_0_m[..., np.newaxis] * ones, 0 * v_0 * ones], axis=-1),
+            np.concatenate([v_0 * ones, r_0 * ones], axis=-1),
+            np.concatenate([-2 * r_0 / r_0_m[..., np.newaxis]**3 * ones, -2 * v_0 / mu * ones], axis=-1)
+        ])
+        
+        grad = lambda dq: np.sum(dq[..., np.newaxis] * dp, axis=0)
+        
+        # >>> 5. Phi = d(r, v) / d(r_0, v_0) from r = f r_0 + g v_0 and v = df_dt r_0 + dg_dt v_0
+        
+        x_0 = [r_0[..., np.newaxis] * ones[..., np.newaxis], v_0[..., np.newaxis] * ones[..., np.newaxis]]
+        
+        I = np.eye(3)
+        
+        Phi = np.concatenate([
+            np.concatenate([f[..., None, None] * I, g[..., None, None] * I], axis=-1) + x_0[0] * grad(df)[..., np.newaxis, :] + x_0[1] * grad(dg)[..., np.newaxis, :],
+            np.concatenate([df_dt[..., None, None] * I, dg_dt[..., None, None] * I], axis=-1) + x_0[0] * grad(ddf_dt)[..., np.newaxis, :] + x_0[1] * grad(ddg_dt)[..., np.newaxis, :]
+        ], axis=-2)
+        
+        r = f[..., np.newaxis] * r_0 + g[..., np.newaxis] * v_0
+        v = df_dt[..., np.newaxis] * r_0 + dg_dt[..., np.newaxis] * v_0
+        
+        return [r, v, Phi]
+
 if __name__  == '__main__':
     
     print('EXAMPLE 2.13\n')
@@ -226,4 +503,11 @@ if __name__  == '__main__':
     
     print('EXAMPLE 4.2\n')
     print(LagrangeCoefficients.calculate_position_velocity_by_time(np.array([1600, 5310, 3800]), np.array([-7.350, 0.4600, 2.470]), 3200))
-    print('-' * 40, '\n')
\ No newline at end of file
+    print('-' * 40, '\n')
+    
+    print('VECTORIZED PROPAGATION\n')
+    print(LagrangeCoefficients.propagate(np.array([1600, 5310, 3800]), np.array([-7.350, 0.4600, 2.470]), np.array([0, 3200]))[0][-1])
+    print('-' * 40, '\n')
+    print('STATE TRANSITION MATRIX\n')
+    print(LagrangeCoefficients.state_transition_matrix(np.array([1600, 5310, 3800]), np.array([-7.350, 0.4600, 2.470]), np.array([3200]))[2][-1])
+    print('-' * 40, '\n')
@@ -0,0 +1,348 @@
+""" MultiGravityAssist.py: Implements the patched-conic multiple gravity assist trajectory search """
+
+__author__      = "Alessio Negri"
+__license__     = "LGPL v3"
+__maintainer__  = "Alessio Negri"
+
+import os
+import sys
+import numpy as np
+
+from datetime import datetime, timedelta
+from dataclasses import dataclass, field
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.append(os.path.dirname(__file__))
+
+from AstronomicalData import AstronomicalData, CelestialBody
+from InterplanetaryTrajectories import InterplanetaryTrajectories
+from OrbitDetermination import OrbitDetermination
+
+# --- STRUCT 
+
+@dataclass
+class GravityAssistTrajectory:
+    """Multiple gravity assist trajectory"""
+    
+    sequence        : list  = field(default_factory=list)   # * Planets (departure, fly-bys, arrival)
+    dates           : list  = field(default_factory=list)   # * Encounter dates
+    T_F             : list  = field(default_factory=list)   # * Time of flight of each leg          [ days ]
+    dv              : float = 0.0                           # * Total delta velocity                [ km / s ]
+    v_inf_D         : float = 0.0                           # * Departure hyperbolic excess speed   [ km / s ]
+    v_inf_A         : float = 0.0                           # * Arrival hyperbolic excess speed     [ km / s ]
+    dv_flyby        : list  = field(default_factory=list)   # * Powered fly-by delta velocities     [ km / s ]
+    r_p             : list  = field(default_factory=list)   # * Fly-by pericenter radii             [ km ]
+
+# --- CLASS 
+
+class MultiGravityAssist:
+    """Beam search over the encounter epochs of a planet sequence: every leg is a (vectorized) Lambert arc, every intermediate planet a powered fly-by"""
+    
+    # --- MEMBERS 
+    
+    H_MIN       = 200.0     # * Default minimum fly-by altitude     [ km ]
+    CACHE_SIZE  = 2_000_000 # * Maximum number of cached legs
+    
+    states      = dict()    # * Planet ephemeris cache { (planet, date) : [R, V] }
+    legs        = dict()    # * Lambert leg cache { (departure, arrival, date, time of flight) : [v_inf_out, v_inf_in] }
+    
+    # --- METHODS 
+    
+    @classmethod
+    def ephemeris(cls, planet : CelestialBody, reference : datetime, days : np.ndarray) -> list:
+        """Planet state at many epochs (every date is evaluated once)
+
+        Args:
+            planet (CelestialBody): Planet
+            reference (datetime): Reference date
+            days (np.ndarray): Epochs [days from the reference]
+
+        Returns:
+            list: [R, V] [N, 3]
+        """
+        
+        unique, inverse = np.unique(days, return_inverse=True)
+        
+        R = np.empty(shape=(len(unique), 3), dtype=float)
+        V = np.empty(shape=(len(unique), 3), dtype=float)
+        
+        for index, day in enumerate(unique):
+            
+            key = (planet, reference + timedelta(days=float(day)))
+            
+            if key not in cls.states: cls.states[key] = InterplanetaryTrajectories.ephemeris(*key)
+            
+            R[index], V[index] = cls.states[key]
+        
+        return [R[inverse.ravel()], V[inverse.ravel()]]
+    
+    @classmethod
+    def leg(cls, departure : CelestialBody, arrival : CelestialBody, reference : datetime, t_D : np.ndarray, T_F : np.ndarray) -> list:
+        """Hyperbolic excess velocities of many Lambert legs (the legs already solved are taken from the cache)
+
+        Args:
+            departure (CelestialBody): Departure planet
+            arrival (CelestialBody): Arrival planet
+            reference (datetime): Reference date
+            t_D (np.ndarray): Departure epochs [days from the reference]
+            T_F (np.ndarray): Times of flight [days]
+
+        Returns:
+            list: [v_inf_out at departure, v_inf_in at arrival] [N, 3] [ km / s ] (NaN where no solution exists)
+        """
+        
+        # >>> 1. Unique legs
+        
+        pairs, inverse = np.unique(np.stack([t_D, T_F], axis=1), axis=0, return_inverse=True)
+        
+        v_inf = np.empty(shape=(len(pairs), 2, 3), dtype=float)
+        
+        keys = [(departure, arrival, t, dt) for t, dt in pairs.tolist()]
+        
+        missing = [index for index, key in enumerate(keys) if key not in cls.legs]
+        
+        for index, key in enumerate(keys):
+            
+            if key in cls.legs: v_inf[index] = cls.legs[key]
+        
+        # >>> 2. Vectorized Lambert problem of the missing legs
+        
+        if missing:
+            
+            t, dt = pairs[missing, 0], pairs[missing, 1]
+            
+            R_1, V_1 = cls.ephemeris(departure, reference, t)
+            R_2, V_2 = cls.ephemeris(arrival, reference, t + dt)
+            
+            v_1, v_2 = OrbitDetermination.solve_lambert_problem_vectorized(R_1, R_2, dt * 86400, mu=AstronomicalData.gravitational_parameter(CelestialBody.SUN))
+            
+            v_inf[missing, 0] = v_1 - V_1
+            v_inf[missing, 1] = v_2 - V_2
+            
+            if len(cls.legs) + len(missing) > cls.CACHE_SIZE: cls.legs.clear()
+            
+            cls.legs.update((keys[index], v_inf[index]) for index in missing)
+        
+        return [v_inf[inverse.ravel(), 0], v_inf[inverse.ravel(), 1]]
+    
+    @classmethod
+    def powered_flyby(cls, v_inf_in : np.ndarray, v_inf_out : np.ndarray, mu : float, r_min : float) -> list:
+        """Powered fly-by joining the incoming and outgoing hyperbolas with a pericenter impulse
+
+        Args:
+            v_inf_in (np.ndarray): Incoming hyperbolic excess velocities [N, 3] [ km / s ]
+            v_inf_out (np.ndarray): Outgoing hyperbolic excess velocities [N, 3] [ km / s ]
+            mu (float): Planet gravitational parameter [ km^3 / s^2 ]
+            r_min (float): Minimum pericenter radius [ km ]
+
+        Returns:
+            list: [dv, r_p] [N] (the turn exceeding the one reachable at r_min is charged as an impulse on v_inf_out)
+        """
+        
+        v_in    = np.linalg.norm(v_inf_in, axis=1)
+        v_out   = np.linalg.norm(v_inf_out, axis=1)
+        
+        with np.errstate(all='ignore'):
+            
+            # >>> 1. Required turn angle
+            
+            delta = np.arccos(np.clip(np.sum(v_inf_in * v_inf_out, axis=1) / (v_in * v_out), -1, 1))
+            
+            turn = lambda r_p: np.arcsin(1 / (1 + r_p * v_in**2 / mu)) + np.arcsin(1 / (1 + r_p * v_out**2 / mu))
+            
+            # >>> 2. Pericenter radius (bisection in logarithmic scale, the turn decreases with r_p)
+            
+            lo = np.full(v_in.shape, np.log(r_min))
+            hi = np.full(v_in.shape, np.log(r_min * 1e4))
+            
+            for _ in range(48):
+                
+                mid = 0.5 * (lo + hi)
+                
+                above = turn(np.exp(mid)) > delta
+                
+                lo = np.where(above, mid, lo)
+                hi = np.where(above, hi, mid)
+            
+            r_p = np.exp(0.5 * (lo + hi))
+            
+            # >>> 3. Pericenter impulse and turn deficit
+            
+            dv = np.abs(np.sqrt(v_out**2 + 2 * mu / r_p) - np.sqrt(v_in**2 + 2 * mu / r_p))
+            
+            dv += 2 * v_out * np.sin(0.5 * np.maximum(delta - turn(r_min), 0))
+        
+        return [dv, r_p]
+    
+    @classmethod
+    def search_block(cls,
+                     sequence : list,
+                     reference : datetime,
+                     t_D : np.ndarray,
+                     flightTimes : list,
+                     step : float,
+                     beam : int,
+                     r_min : list,
+                     v_inf_max : float,
+                     arrival : bool) -> list:
+        """Beam search from a block of departure epochs
+
+        Args:
+            sequence (list): Planets (departure, fly-bys, arrival)
+            reference (datetime): Reference date
+            t_D (np.ndarray): Departure epochs [days from the reference]
+            flightTimes (list): [min, max] time of flight of each leg [days]
+            step (float): Epoch grid step [days]
+            beam (int): Number of partial trajectories kept after each leg
+            r_min (list): Minimum pericenter radius of each fly-by [ km ]
+            v_inf_max (float): Maximum departure hyperbolic excess speed [ km / s ]
+            arrival (bool): True to include the arrival hyperbolic excess speed in the cost
+
+        Returns:
+            list: [epochs [B, n_planets], cost [B], v_inf_D [B], v_inf_A [B], dv_flyby [B, n_flybys], r_p [B, n_flybys]]
+        """
+        
+        n = len(sequence) - 1
+        
+        # ? Partial trajectories (one row each)
+        
+        epochs  = np.asarray(t_D, dtype=float)[:, np.newaxis]
+        cost    = np.zeros(len(t_D))
+        v_inf   = np.zeros(shape=(len(t_D), 3))
+        v_inf_D = np.zeros(len(t_D))
+        dv_fb   = np.zeros(shape=(len(t_D), 0))
+        r_p     = np.zeros(shape=(len(t_D), 0))
+        
+        for k in range(n):
+            
+            # >>> 1. Expansion (every partial trajectory with every time of flight of the leg)
+            
+            T_F = np.arange(flightTimes[k][0], flightTimes[k][1] + 1e-9, step)
+            
+            parent, child = np.repeat(np.arange(len(cost)), len(T_F)), np.tile(T_F, len(cost))
+            
+            v_inf_out, v_inf_in = cls.leg(sequence[k], sequence[k + 1], reference, epochs[parent, -1], child)
+            
+            # >>> 2. Departure or powered fly-by cost
+            
+            if k == 0:
+                
+                dv = np.linalg.norm(v_inf_out, axis=1)
+                
+                dv[dv > v_inf_max] = np.nan
+                
+                v_inf_D, dv_fb, r_p = dv, dv_fb[parent], r_p[parent]
+            
+            else:
+                
+                dv, radius = cls.powered_flyby(v_inf[parent], v_inf_out, AstronomicalData.gravitational_parameter(sequence[k]), r_min[k - 1])
+                
+                v_inf_D, dv_fb, r_p = v_inf_D[parent], np.column_stack([dv_fb[parent], dv]), np.column_stack([r_p[parent], radius])
+            
+            epochs  = np.column_stack([epochs[parent], epochs[parent, -1] + child])
+            cost    = cost[parent] + dv
+            v_inf   = v_inf_in
+            
+            if k == n - 1 and arrival: cost = cost + np.linalg.norm(v_inf_in, axis=1)
+            
+            # >>> 3. Pruning (the beam best partial trajectories survive)
+            
+            cost = np.where(np.isfinite(cost), cost, np.inf)
+            
+            keep = np.argsort(cost, kind='stable')[:beam]
+            
+            keep = keep[np.isfinite(cost[keep])]
+            
+            epochs, cost, v_inf, v_inf_D, dv_fb, r_p = epochs[keep], cost[keep], v_inf[keep], v_inf_D[keep], dv_fb[keep], r_p[keep]
+        
+        return [epochs, cost, v_inf_D, np.linalg.norm(v_inf, axis=1), dv_fb, r_p]
+    
+    @classmethod
+    def search(cls,
+               sequence : list,
+               departureWindow : list,
+               flightTimes : list,
+               step : float = 5.0,
+               beam : int = 2000,
+               k : int = 10,
+               h_min : list = None,
+               v_inf_max : float = np.inf,
+               arrival : bool = True,
+               separation : float = 30.0,
+               workers : int = None) -> list:
+        """Searches the k cheapest trajectories of a planet sequence (e.g. EARTH, VENUS, EARTH, JUPITER)
+
+        Args:
+            sequence (list): Planets (departure, fly-bys, arrival)
+            departureWindow (list): [begin, end] departure dates
+            flightTimes (list): [min, max] time of flight of each leg [days]
+            step (float, optional): Epoch grid step [days]. Defaults to 5.
+            beam (int, optional): Number of partial trajectories kept after each leg (per worker). Defaults to 2000.
+            k (int, optional): Number of trajectories. Defaults to 10.
+            h_min (list, optional): Minimum altitude of each fly-by [km]. Defaults to None (H_MIN).
+            v_inf_max (float, optional): Maximum departure hyperbolic excess speed [km/s]. Defaults to no limit.
+            arrival (bool, optional): True to include the arrival hyperbolic excess speed in the cost. Defaults to True.
+            separation (float, optional): Trajectories with all the encounters closer than separation are merged [days]. Defaults to 30.
+            workers (int, optional): Number of processes (1 for a serial search). Defaults to None (all cores).
+
+        Returns:
+            list: Trajectories (GravityAssistTrajectory) sorted by total delta velocity
+        """
+        
+        if len(sequence) < 2 or len(flightTimes) != len(sequence) - 1: raise Exception('One [min, max] time of flight is needed for each leg')
+        
+        h_min = h_min if h_min is not None else [cls.H_MIN] * (len(sequence) - 2)
+        
+        r_min = [AstronomicalData.equatiorial_radius(planet) + h for planet, h in zip(sequence[1:-1], h_min)]
+        
+        # >>> 1. Departure epochs split in blocks (one independent beam each)
+        
+        t_D = np.arange(0, (departureWindow[1] - departureWindow[0]).total_seconds() / 86400 + 1e-9, step)
+        
+        blocks = [block for block in np.array_split(t_D, min(len(t_D), workers or os.cpu_count() or 1)) if len(block)]
+        
+        arguments = [sequence, departureWindow[0], None, flightTimes, step, beam, r_min, v_inf_max, arrival]
+        
+        if len(blocks) == 1:
+            
+            results = [cls.search_block(*arguments[:2], blocks[0], *arguments[3:])]
+        
+        else:
+            
+            with ProcessPoolExecutor(max_workers=len(blocks)) as executor:
+                
+                results = list(executor.map(cls.search_block, *[[argument] * len(blocks) for argument in arguments[:2]], blocks, *[[argument] * len(blocks) for argument in arguments[3:]]))
+        
+        # >>> 2. Merge
+        
+        epochs, cost, v_inf_D, v_inf_A, dv_fb, r_p = [np.concatenate(values) for values in zip(*results)]
+        
+        # >>> 3. Top-k distinct trajectories
+        
+        trajectories = []
+        
+        selected = []
+        
+        for index in np.argsort(cost, kind='stable'):
+            
+            if any(np.all(np.abs(epochs[index] - epochs[other]) <= separation) for other in selected): continue
+            
+            selected.append(index)
+            
+            dates = [departureWindow[0] + timedelta(days=float(day)) for day in epochs[index]]
+            
+            trajectories.append(GravityAssistTrajectory(list(sequence), dates, np.diff(epochs[index]).tolist(), float(cost[index]), float(v_inf_D[index]), float(v_inf_A[index]), dv_fb[index].tolist(), r_p[index].tolist()))
+            
+            if len(trajectories) == k: break
+        
+        return trajectories
+
+if __name__ == '__main__':
+    
+    print('EARTH - VENUS - EARTH - JUPITER\n')
+    for trajectory in MultiGravityAssist.search([CelestialBody.EARTH, CelestialBody.VENUS, CelestialBody.EARTH, CelestialBody.JUPITER],
+                                                [datetime(2023, 1, 1, 0, 0, 0), datetime(2025, 12, 31, 0, 0, 0)],
+                                                [[80, 250], [300, 700], [600, 1200]],
+                                                k=5):
+        print([date.strftime('%Y-%m-%d') for date in trajectory.dates], trajectory.dv, trajectory.v_inf_D, trajectory.dv_flyby, trajectory.v_inf_A)
+    print('-' * 40, '\n')
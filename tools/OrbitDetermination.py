@@ -8,12 +8,15 @@ __chapter__     = "5 - Preliminary Orbit Determination"
 
 import os
 import sys
+import tempfile
 import numpy as np
 import matplotlib.pyplot as plt
 
 from enum import IntEnum
 from datetime import datetime
 from scipy.optimize import newton
+from scipy.linalg import cho_factor, cho_solve
+from concurrent.futures import ProcessPoolExecutor
 
 sys.path.append(os.path.dirname(__file__))
 
@@ -256,6 +259,105 @@ class OrbitDetermination():
         
         return [v_1, v_2, ThreeDimensionalOrbit.calculate_orbital_elements(r_1, v_1), ThreeDimensionalOrbit.calculate_orbital_elements(r_2, v_2).theta]
     
+    @classmethod
+    def solve_lambert_problem_vectorized(cls, r_1 : np.ndarray, r_2 : np.ndarray, dt : np.ndarray, direction : OrbitDirection = OrbitDirection.PROGRADE, mu : float = None) -> list:
+        """Lambert's problem for many position pairs at once (zero revolutions, the root is bracketed by bisection)
+
+        Args:
+            r_1 (np.ndarray): Position vectors 1 [N, 3]
+            r_2 (np.ndarray): Position vectors 2 [N, 3]
+            dt (np.ndarray): Delta times [N]
+            direction (ORBIT_DIRECTION, optional): Type of orbit direction. Defaults to ORBIT_DIRECTION.PROGRADE.
+            mu (float, optional): Gravitational parameter. Defaults to None (OrbitDetermination.mu).
+
+        Returns:
+            list: [v_1, v_2] [N, 3] (NaN where no solution exists)
+        """
+        
+        mu = cls.mu if mu is None else mu
+        
+        r_1, r_2, dt = np.atleast_2d(r_1), np.atleast_2d(r_2), np.atleast_1d(dt).astype(float)
+        
+        # ? Stumpff functions (series expansion around z = 0)
+        
+        def S(z : np.ndarray) -> np.ndarray:
+            
+            s = np.sqrt(np.abs(z))
+            
+            with np.errstate(all='ignore'): return np.where(z > 1e-3, (s - np.sin(s)) / s**3, np.where(z < -1e-3, (np.sinh(s) - s) / s**3, 1/6 - z / 120 + z**2 / 5040))
+        
+        def C(z : np.ndarray) -> np.ndarray:
+            
+            s = np.sqrt(np.abs(z))
+            
+            with np.errstate(all='ignore'): return np.where(z > 1e-3, (1 - np.cos(s)) / z, np.where(z < -1e-3, (np.cosh(s) - 1) / -z, 1/2 - z / 24 + z**2 / 720))
+        
+        # >>> 1. Norm
+        
+        r_1_m = np.linalg.norm(r_1, axis=1)
+        r_2_m = np.linalg.norm(r_2, axis=1)
+        
+        # >>> 2. Delta theta
+        
+        temp = np.arccos(np.clip(np.sum(r_1 * r_2, axis=1) / (r_1_m * r_2_m), -1, 1))
+        
+        cond = np.cross(r_1, r_2)[:, 2]
+        
+        prograde = cond >= 0 if direction == OrbitDirection.PROGRADE else cond < 0
+        
+        dtheta = np.where(prograde, temp, 2 * np.pi - temp)
+        
+        # >>> 3. Parameter A
+        
+        with np.errstate(all='ignore'): A = np.sin(dtheta) * np.sqrt( (r_1_m * r_2_m) / (1 - np.cos(dtheta)) )
+        
+        # >>> 4. Root of the (monotonic) Lambert equation
+        
+        def F(z : np.ndarray) -> list:
+            
+            y = r_1_m + r_2_m + A * (z * S(z) - 1) / np.sqrt(C(z))
+            
+            with np.errstate(all='ignore'): return [y, np.where(y > 0, (np.abs(y) / C(z))**(3/2) * S(z) + A * np.sqrt(np.abs(y)) - np.sqrt(mu) * dt, -np.inf)]
+        
+        z_lo = np.full(dt.shape, -400.0)
+        z_hi = np.full(dt.shape, 4 * np.pi**2 - 1e-9)
+        
+        for _ in range(64):
+            
+            z = 0.5 * (z_lo + z_hi)
+            
+            below = F(z)[1] < 0
+            
+            z_lo = np.where(below, z, z_lo)
+            z_hi = np.where(below, z_hi, z)
+        
+        # >>> 5. Parameter y
+        
+        y, residual = F(z_hi)
+        
+        valid = (dt > 0) & (y > 0) & (residual >= 0) & (F(z_lo)[1] <= 0)
+        
+        # >>> 6. Lagrange functions
+        
+        with np.errstate(all='ignore'):
+            
+            f = 1 - y / r_1_m
+            
+            g = A * np.sqrt(y / mu)
+            
+            dg_dt = 1 - y / r_2_m
+            
+            # >>> 7. Velocities
+            
+            v_1 = (r_2 - f[:, np.newaxis] * r_1) / g[:, np.newaxis]
+            
+            v_2 = (dg_dt[:, np.newaxis] * r_2 - r_1) / g[:, np.newaxis]
+        
+        v_1[~valid] = np.nan
+        v_2[~valid] = np.nan
+        
+        return [v_1, v_2]
+    
     # ! SECTION 5.4
     
     @classmethod
@@ -442,7 +544,7 @@ class OrbitDetermination():
             H (float, optional): Elevation above sea level. Defaults to 0.
 
         Returns:
-            np.ndarray: R
+            np.ndarray: R [3] (or [3,n] for arrays of sites)
         """
         
         # >>> 1.
@@ -451,7 +553,7 @@ class OrbitDetermination():
         
         B = ( cls.R_E * (1 - cls.f)**2 / np.sqrt(1 - (2 * cls.f - cls.f**2) * np.sin(phi)**2) + H ) * np.sin(phi)
         
-        return np.array([A * np.cos(theta), A * np.sin(theta), B])
+        return np.stack(np.broadcast_arrays(A * np.cos(theta), A * np.sin(theta), B))
     
     @classmethod
     def gef_2_tef(cls, r : np.ndarray, theta : float, phi : float, H : float = 0) -> np.ndarray:
@@ -846,6 +948,497 @@ class OrbitDetermination():
         
         return [r_2, v_2]
 
+    # ! BATCH ORBIT DETERMINATION
+    
+    @classmethod
+    def read_observations(cls, path : str) -> dict:
+        """Reads an observation file (comma separated, '#' comments), one observation per row:\n
+
+        track, t [s], theta [deg], phi [deg], H [km], alpha [deg], delta [deg] (angles-only) followed by rho [km] (range/angle tracks)
+
+        Args:
+            path (str): File path
+
+        Returns:
+            dict: { track, t, rho (NaN if not ranged), R: site positions [n,3], rho_h: line of sight unit vectors [n,3] } sorted by track and time
+        """
+        
+        data = np.loadtxt(path, delimiter=',', comments='#', ndmin=2)
+        
+        if data.shape[1] not in [7, 8]: raise Exception('Observation file must have 7 (angles-only) or 8 (range/angle) columns')
+        
+        data = data[np.lexsort((data[:, 1], data[:, 0]))]
+        
+        theta, phi, alpha, delta = np.deg2rad(data[:, [2, 3, 5, 6]]).T
+        
+        # ? Site positions and lines of sight evaluated here (the solvers never read the site model)
+        
+        return dict(track=data[:, 0].astype(int),
+                    t=data[:, 1],
+                    rho=data[:, 7] if data.shape[1] == 8 else np.full(len(data), np.nan),
+                    R=cls.gef(theta, phi, data[:, 4]).T,
+                    rho_h=np.stack([np.cos(delta) * np.cos(alpha), np.cos(delta) * np.sin(alpha), np.sin(delta)], axis=-1))
+    
+    @classmethod
+    def sliding_triples(cls, track : np.ndarray, spacing : int = 1, stride : int = 1) -> np.ndarray:
+        """Forms the observation triples (i, i + spacing, i + 2 spacing) in a sliding window, never across tracks
+
+        Args:
+            track (np.ndarray): Track of every observation (sorted) [n]
+            spacing (int, optional): Observations between the members of a triple. Defaults to 1.
+            stride (int, optional): Window advance. Defaults to 1.
+
+        Returns:
+            np.ndarray: Observation indices [M,3]
+        """
+        
+        index = np.arange(0, max(0, len(track) - 2 * spacing), stride)[:, np.newaxis] + spacing * np.arange(3)
+        
+        return index[track[index[:, 0]] == track[index[:, 2]]]
+    
+    @classmethod
+    def predict_from_gibbs_method_vectorized(cls, r_1 : np.ndarray, r_2 : np.ndarray, r_3 : np.ndarray, mu : float = None, tol : float = 1e-2) -> np.ndarray:
+        """Algorithm 5.1 for many triples of position vectors
+
+        Args:
+            r_1 (np.ndarray): Position vectors 1 [N,3]
+            r_2 (np.ndarray): Position vectors 2 [N,3]
+            r_3 (np.ndarray): Position vectors 3 [N,3]
+            mu (float, optional): Gravitational parameter. Defaults to None (OrbitDetermination.mu).
+            tol (float, optional): Coplanarity tolerance (sine of the angle between r_1 and the plane of r_2 and r_3). Defaults to 1e-2.
+
+        Returns:
+            np.ndarray: Velocity vectors at r_2 [N,3] (NaN where not coplanar)
+        """
+        
+        mu = cls.mu if mu is None else mu
+        
+        # >>> 1. Norm
+        
+        r_1_m = np.linalg.norm(r_1, axis=-1, keepdims=True)
+        r_2_m = np.linalg.norm(r_2, axis=-1, keepdims=True)
+        r_3_m = np.linalg.norm(r_3, axis=-1, keepdims=True)
+        
+        # >>> 2. Cross products
+        
+        C_12 = np.cross(r_1, r_2)
+        C_23 = np.cross(r_2, r_3)
+        C_31 = np.cross(r_3, r_1)
+        
+        # >>> 3. Verify
+        
+        coplanar = np.abs(np.sum(r_1 * C_23, axis=-1)) <= tol * r_1_m[:, 0] * np.linalg.norm(C_23, axis=-1)
+        
+        # >>> 4.
+        
+        N = r_1_m * C_23 + r_2_m * C_31 + r_3_m * C_12
+        
+        D = C_12 + C_23 + C_31
+        
+        S = r_1 * (r_2_m - r_3_m) + r_2 * (r_3_m - r_1_m) + r_3 * (r_1_m - r_2_m)
+        
+        # >>> 5.
+        
+        v_2 = np.sqrt(mu / (np.linalg.norm(N, axis=-1, keepdims=True) * np.linalg.norm(D, axis=-1, keepdims=True))) * (np.cross(D, r_2) / r_2_m + S)
+        
+        v_2[~coplanar] = np.nan
+        
+        return v_2
+    
+    @classmethod
+    def predict_from_gauss_method_vectorized(cls, R : np.ndarray, rho_h : np.ndarray, t : np.ndarray, mu : float = None, extended : bool = True, tol : float = 1e-6, max_iter : int = 200) -> list:
+        """Algorithms 5.5 and 5.6 for many triples of angles-only observations\n
+
+        The eighth-degree polynomial is solved through the eigenvalues of its companion matrices (largest positive real root),
+        the refinement uses the vectorized universal variable Lagrange coefficients with a relaxation that halves when a triple oscillates
+
+        Args:
+            R (np.ndarray): Site position vectors [N,3,3] (observation, component)
+            rho_h (np.ndarray): Line of sight unit vectors [N,3,3] (observation, component)
+            t (np.ndarray): Observation times [N,3]
+            mu (float, optional): Gravitational parameter. Defaults to None (OrbitDetermination.mu).
+            extended (bool, optional): True for the iterative improvement of Algorithm 5.6. Defaults to True.
+            tol (float, optional): Tolerance on the slant ranges [km]. Defaults to 1e-6.
+            max_iter (int, optional): Maximum number of iterations. Defaults to 200.
+
+        Returns:
+            list: [r_2 [N,3], v_2 [N,3], converged [N]]
+        """
+        
+        mu = cls.mu if mu is None else mu
+        
+        # >>> 1. Time intervals
+        
+        tau_1   = t[:, 0] - t[:, 1]
+        tau_3   = t[:, 2] - t[:, 1]
+        tau     = tau_3 - tau_1
+        
+        # >>> 2. Crossproducts
+        
+        p = np.stack([np.cross(rho_h[:, 1], rho_h[:, 2]), np.cross(rho_h[:, 0], rho_h[:, 2]), np.cross(rho_h[:, 0], rho_h[:, 1])], axis=-1)
+        
+        # >>> 3. - 4.
+        
+        D_0 = np.sum(rho_h[:, 0] * p[..., 0], axis=-1)
+        
+        D = R @ p
+        
+        # >>> 5. - 7. Parameters
+        
+        A = 1 / D_0 * (-D[:, 0, 1] * tau_3 / tau + D[:, 1, 1] + D[:, 2, 1] * tau_1 / tau)
+        
+        B = 1 / (6 * D_0) * (D[:, 0, 1] * (tau_3**2 - tau**2) * tau_3 / tau + D[:, 2, 1] * (tau**2 - tau_1**2) * tau_1 / tau)
+        
+        E = np.sum(R[:, 1] * rho_h[:, 1], axis=-1)
+        
+        a = - (A**2 + 2 * A * E + np.sum(R[:, 1]**2, axis=-1))
+        
+        b = - 2 * mu * B * (A + E)
+        
+        c = - mu**2 * B**2
+        
+        # >>> 8. r_2 from x^8 + a x^6 + b x^3 + c = 0 (companion matrices)
+        
+        companion = np.zeros(shape=(len(t), 8, 8))
+        
+        companion[:, 0, 1], companion[:, 0, 4], companion[:, 0, 7] = -a, -b, -c
+        
+        companion[:, np.arange(1, 8), np.arange(7)] = 1
+        
+        roots = np.linalg.eigvals(companion)
+        
+        real = (np.abs(roots.imag) <= 1e-8 * np.abs(roots)) & (roots.real > 0)
+        
+        r_2_m = np.max(np.where(real, roots.real, -np.inf), axis=-1)
+        
+        r_2_m[~np.isfinite(r_2_m)] = np.nan
+        
+        # >>> 9. Slant ranges
+        
+        rho_1 = 1 / D_0 * ( (6 * (D[:, 2, 0] * tau_1 / tau_3 + D[:, 1, 0] * tau / tau_3) * r_2_m**3 + mu * D[:, 2, 0] * (tau**2 - tau_1**2) * tau_1 / tau_3 ) /
+                (6 * r_2_m**3 + mu * (tau**2 - tau_3**2)) - D[:, 0, 0] )
+        
+        rho_2 = A + mu * B / r_2_m**3
+        
+        rho_3 = 1 / D_0 * ( (6 * (D[:, 0, 2] * tau_3 / tau_1 - D[:, 1, 2] * tau / tau_1) * r_2_m**3 + mu * D[:, 0, 2] * (tau**2 - tau_3**2) * tau_3 / tau_1 ) /
+                (6 * r_2_m**3 + mu * (tau**2 - tau_1**2)) - D[:, 2, 2] )
+        
+        rho = np.stack([rho_1, rho_2, rho_3], axis=-1)
+        
+        # >>> 10. - 12. Positions, Lagrange coefficients (series) and velocity
+        
+        r = R + rho[..., np.newaxis] * rho_h
+        
+        f_1 = 1 - 1/2 * mu / r_2_m**3 * tau_1**2
+        f_3 = 1 - 1/2 * mu / r_2_m**3 * tau_3**2
+        g_1 = tau_1 - 1/6 * mu / r_2_m**3 * tau_1**3
+        g_3 = tau_3 - 1/6 * mu / r_2_m**3 * tau_3**3
+        
+        v_2 = (-f_3[:, np.newaxis] * r[:, 0] + f_1[:, np.newaxis] * r[:, 2]) / (f_1 * g_3 - f_3 * g_1)[:, np.newaxis]
+        
+        converged = np.isfinite(rho).all(axis=-1)
+        
+        if not extended: return [r[:, 1], v_2, converged]
+        
+        # >>> 13. Iterative improvement (Algorithm 5.6), every triple until its slant ranges settle
+        
+        active = converged.copy()
+        
+        converged[:] = False
+        
+        # ? Relaxation weight of the exact Lagrange coefficients (1/2 as in Algorithm 5.6, halved when the iteration oscillates)
+        
+        w = np.full(len(t), 0.5)
+        
+        step = np.full(len(t), np.inf)
+        
+        for _ in range(max_iter):
+            
+            if not np.any(active): break
+            
+            f, g, _, _ = LagrangeCoefficients.universal_lagrange_coefficients(r[active, 1], v_2[active], np.stack([tau_1[active], tau_3[active]]), mu)
+            
+            f_1[active] += w[active] * (f[0] - f_1[active])
+            f_3[active] += w[active] * (f[1] - f_3[active])
+            g_1[active] += w[active] * (g[0] - g_1[active])
+            g_3[active] += w[active] * (g[1] - g_3[active])
+            
+            c_1 = g_3 / (f_1 * g_3 - f_3 * g_1)
+            c_3 = -g_1 / (f_1 * g_3 - f_3 * g_1)
+            
+            rho_new = np.stack([1 / D_0 * (-D[:, 0, 0] + D[:, 1, 0] / c_1 - D[:, 2, 0] * c_3 / c_1),
+                                1 / D_0 * (-c_1 * D[:, 0, 1] + D[:, 1, 1] - c_3 * D[:, 2, 1]),
+                                1 / D_0 * (-D[:, 0, 2] * c_1 / c_3 + D[:, 1, 2] / c_3 - D[:, 2, 2])], axis=-1)
+            
+            step_new = np.max(np.abs(rho_new - rho), axis=-1)
+            
+            settled = step_new < tol
+            
+            w = np.where(active & (step_new > step), w / 2, w)
+            
+            step = np.where(active, step_new, step)
+            
+            rho[active] = rho_new[active]
+            
+            r[active] = R[active] + rho[active, :, np.newaxis] * rho_h[active]
+            
+            v_2[active] = (-f_3[active, np.newaxis] * r[active, 0] + f_1[active, np.newaxis] * r[active, 2]) / (f_1 * g_3 - f_3 * g_1)[active, np.newaxis]
+            
+            converged |= active & settled
+            
+            active &= ~settled & np.isfinite(rho).all(axis=-1)
+        
+        return [r[:, 1], v_2, converged]
+    
+    @classmethod
+    def batch_orbit_determination(cls, observations : dict, spacing : int = 1, stride : int = 1, extended : bool = True, workers : int = 1) -> dict:
+        """Batch preliminary orbit determination from observation streams: a state estimate for every triple of a sliding window\n
+
+        Triples of ranged observations are solved with Gibbs (positions), the others with Gauss (angles-only).
+        The residuals compare every estimate with all the observations of its track (two-body propagation)
+
+        Args:
+            observations (dict): Observations (see read_observations)
+            spacing (int, optional): Observations between the members of a triple. Defaults to 1.
+            stride (int, optional): Window advance. Defaults to 1.
+            extended (bool, optional): True for the iterative improvement of the Gauss method. Defaults to True.
+            workers (int, optional): Number of processes (the caller needs a __main__ guard on spawn platforms). Defaults to 1 (vectorized, serial).
+
+        Returns:
+            dict: { track, t, r [M,3], v [M,3], gibbs, converged, residual_rms [rad], residual_max [rad], range_rms [km] (NaN if not ranged) }
+        """
+        
+        triples = cls.sliding_triples(observations['track'], spacing, stride)
+        
+        # ? The arrays and mu are passed explicitly (the worker processes do not share the class state)
+        
+        data = { key : observations[key] for key in ['track', 't', 'rho', 'R', 'rho_h'] }
+        
+        blocks = [block for block in np.array_split(triples, min(len(triples), max(1, workers))) if len(block)]
+        
+        if len(blocks) <= 1:
+            
+            results = [cls.batch_orbit_determination_block(data, triples, cls.mu, extended)]
+        
+        else:
+            
+            with ProcessPoolExecutor(max_workers=len(blocks)) as executor:
+                
+                results = list(executor.map(cls.batch_orbit_determination_block, [data] * len(blocks), blocks, [cls.mu] * len(blocks), [extended] * len(blocks)))
+        
+        return { key : np.concatenate([result[key] for result in results]) for key in results[0] }
+    
+    @classmethod
+    def batch_orbit_determination_block(cls, observations : dict, triples : np.ndarray, mu : float, extended : bool = True) -> dict:
+        """Solves a block of observation triples and evaluates their residuals
+
+        Args:
+            observations (dict): Observations (see read_observations)
+            triples (np.ndarray): Observation indices [M,3]
+            mu (float): Gravitational parameter
+            extended (bool, optional): True for the iterative improvement of the Gauss method. Defaults to True.
+
+        Returns:
+            dict: See batch_orbit_determination
+        """
+        
+        track, t, rho, R, rho_h = [observations[key] for key in ['track', 't', 'rho', 'R', 'rho_h']]
+        
+        M = len(triples)
+        
+        r, v = np.full((M, 3), np.nan), np.full((M, 3), np.nan)
+        
+        # >>> 1. Ranged triples: Gibbs method
+        
+        gibbs = np.isfinite(rho[triples]).all(axis=-1)
+        
+        position = R[triples[gibbs]] + rho[triples[gibbs], np.newaxis] * rho_h[triples[gibbs]]
+        
+        r[gibbs], v[gibbs] = position[:, 1], cls.predict_from_gibbs_method_vectorized(position[:, 0], position[:, 1], position[:, 2], mu)
+        
+        converged = gibbs & np.isfinite(v).all(axis=-1)
+        
+        # >>> 2. Angles-only triples: Gauss method
+        
+        gauss = ~gibbs
+        
+        r[gauss], v[gauss], converged[gauss] = cls.predict_from_gauss_method_vectorized(R[triples[gauss]], rho_h[triples[gauss]], t[triples[gauss]], mu, extended)
+        
+        # >>> 3. Residuals against every observation of the track (pairs estimate - observation)
+        
+        start   = np.searchsorted(track, track[triples[:, 1]], side='left')
+        count   = np.searchsorted(track, track[triples[:, 1]], side='right') - start
+        
+        m = np.repeat(np.arange(M), count)
+        j = np.arange(count.sum()) - np.repeat(np.cumsum(count) - count, count) + np.repeat(start, count)
+        
+        f, g, _, _ = LagrangeCoefficients.universal_lagrange_coefficients(r[m], v[m], (t[j] - t[triples[m, 1]])[np.newaxis], mu)
+        
+        rho_p = f[0, :, np.newaxis] * r[m] + g[0, :, np.newaxis] * v[m] - R[j]
+        
+        angle = np.arctan2(np.linalg.norm(np.cross(rho_p, rho_h[j]), axis=-1), np.sum(rho_p * rho_h[j], axis=-1))
+        
+        with np.errstate(all='ignore'):
+            
+            residual_rms = np.sqrt(np.bincount(m, angle**2, M) / count)
+            residual_max = np.full(M, -np.inf)
+            
+            np.maximum.at(residual_max, m, angle)
+            
+            ranged = np.isfinite(rho[j])
+            
+            range_rms = np.sqrt(np.bincount(m[ranged], (np.linalg.norm(rho_p[ranged], axis=-1) - rho[j][ranged])**2, M) / np.bincount(m[ranged], minlength=M))
+        
+        return dict(track=track[triples[:, 1]], t=t[triples[:, 1]], r=r, v=v, gibbs=gibbs, converged=converged, residual_rms=residual_rms, residual_max=residual_max, range_rms=range_rms)
+
+    # ! BATCH LEAST SQUARES
+    
+    @classmethod
+    def batch_least_squares(cls, observations : dict, r_0 : np.ndarray = None, v_0 : np.ndarray = None, t_0 : float = None, sigma_angle : float = 1e-5, sigma_range : float = 1e-3, tol : float = 1e-4, max_iter : int = 20) -> dict:
+        """Weighted batch least squares (differential correction) of the epoch state from all the observations\n
+
+        The two-body state transition matrix gives the analytic partials at every observation time in a single vectorized pass,
+        the 6x6 normal equations are accumulated over all the measurements and solved by Cholesky (columns scaled to unit diagonal).
+        Each line of sight contributes two angular residuals (components of the computed direction normal to the observed one) and ranged observations a range residual.
+        The corrections are damped (Levenberg-Marquardt) whenever the weighted RMS would increase
+
+        Args:
+            observations (dict): Observations (see read_observations)
+            r_0 (np.ndarray, optional): Initial guess of the epoch position. Defaults to None (best short-arc preliminary orbit).
+            v_0 (np.ndarray, optional): Initial guess of the epoch velocity. Defaults to None (best short-arc preliminary orbit).
+            t_0 (float, optional): Epoch. Defaults to None (time of the initial guess).
+            sigma_angle (float, optional): Angular noise [rad]. Defaults to 1e-5.
+            sigma_range (float, optional): Range noise [km]. Defaults to 1e-3.
+            tol (float, optional): Tolerance on the relative change of the weighted RMS. Defaults to 1e-4.
+            max_iter (int, optional): Maximum number of iterations. Defaults to 20.
+
+        Returns:
+            dict: { r_0, v_0, t_0, covariance [6,6], sigma [6], converged, iterations, rms: weighted RMS history, residuals: [n,3] (two angles [rad], range [km], NaN if not ranged) }
+        """
+        
+        t, rho, R, rho_h = [observations[key] for key in ['t', 'rho', 'R', 'rho_h']]
+        
+        # >>> 1. Initial guess: preliminary orbit of the short-arc triple with the lowest residuals on its track
+        
+        if r_0 is None or v_0 is None:
+            
+            # ? Triples spanning about 1/8 of a track, at most ~500 of them
+            
+            spacing = max(1, int(np.median(np.bincount(observations['track'] - np.min(observations['track'])))) // 16)
+            
+            guess = cls.batch_orbit_determination(observations, spacing=spacing, stride=max(1, len(t) // 500))
+            
+            valid = guess['converged'] & np.isfinite(guess['residual_rms'])
+            
+            if not np.any(valid): raise Exception('Preliminary orbit determination failed, provide r_0 and v_0')
+            
+            best = np.flatnonzero(valid)[np.argmin(guess['residual_rms'][valid])]
+            
+            r_0, v_0, t_0 = guess['r'][best], guess['v'][best], guess['t'][best]
+        
+        t_0 = t[0] if t_0 is None else t_0
+        
+        x = np.concatenate([r_0, v_0]).astype(float)
+        
+        # >>> 2. Measurement frame: two directions normal to every observed line of sight
+        
+        e_1 = np.cross([0, 0, 1], rho_h)
+        e_1 = np.where(np.linalg.norm(e_1, axis=-1, keepdims=True) < 1e-8, [1, 0, 0], e_1)
+        e_1 = e_1 / np.linalg.norm(e_1, axis=-1, keepdims=True)
+        
+        E = np.stack([e_1, np.cross(rho_h, e_1)], axis=1)
+        
+        ranged = np.isfinite(rho)
+        
+        W = np.column_stack([np.full((len(t), 2), 1 / sigma_angle**2), np.where(ranged, 1 / sigma_range**2, 0)])
+        
+        def residuals(r : np.ndarray) -> list:
+            
+            rho_p = r - R
+            
+            rho_m = np.linalg.norm(rho_p, axis=-1)
+            
+            u = rho_p / rho_m[:, np.newaxis]
+            
+            y = np.column_stack([-np.einsum('nki,ni->nk', E, u), np.where(ranged, rho - rho_m, 0)])
+            
+            return [y, u, rho_m, np.sqrt(np.sum(W * y**2) / (2 * len(t) + np.sum(ranged)))]
+        
+        rms = []
+        
+        converged = False
+        
+        damping = 0.0
+        
+        for _ in range(max_iter):
+            
+            # >>> 3. Propagation and analytic partials at all the observation times
+            
+            r, _, Phi = LagrangeCoefficients.state_transition_matrix(x[:3], x[3:], t - t_0, cls.mu)
+            
+            # >>> 4. Residuals (observed - computed) and measurement partials
+            
+            y, u, rho_m, current = residuals(r)
+            
+            du_dr = (np.eye(3) - u[:, :, np.newaxis] * u[:, np.newaxis, :]) / rho_m[:, np.newaxis, np.newaxis]
+            
+            H = np.concatenate([E @ du_dr, u[:, np.newaxis, :]], axis=1) @ Phi[:, :3, :]
+            
+            rms.append(current)
+            
+            if len(rms) > 1 and abs(rms[-2] - rms[-1]) < tol * rms[-1]:
+                
+                converged = True
+                
+                break
+            
+            # >>> 5. Normal equations (columns scaled to unit diagonal)
+            
+            N = np.einsum('nki,nk,nkj->ij', H, W, H)
+            b = np.einsum('nki,nk,nk->i', H, W, y)
+            
+            D = 1 / np.sqrt(np.diag(N))
+            
+            N_s = D[:, np.newaxis] * N * D
+            
+            # >>> 6. Levenberg-Marquardt: the damping grows until the weighted RMS decreases and shrinks after every accepted step
+            
+            while True:
+            
+                dx = D * cho_solve(cho_factor(N_s + damping * np.eye(6)), D * b)
+            
+                r, _ = LagrangeCoefficients.propagate(x[:3] + dx[:3], x[3:] + dx[3:], t - t_0, mu=cls.mu)
+        
+                if np.all(np.isfinite(r)) and residuals(r)[3] <= current: break
+        
+                damping = max(1e-3, 10 * damping)
+                
+                if damping > 1e8: break
+            
+            if damping > 1e8:
+                
+                converged = True # * No step decreases the weighted RMS: stationary point
+                
+                break
+            
+            x += dx
+            
+            damping = damping / 10 if damping > 1e-3 else 0.0
+        
+        # >>> 7. Covariance (undamped normal equations) and residuals of the final state
+        
+        N = np.einsum('nki,nk,nkj->ij', H, W, H)
+        
+        D = 1 / np.sqrt(np.diag(N))
+        
+        covariance = D[:, np.newaxis] * cho_solve(cho_factor(D[:, np.newaxis] * N * D), np.eye(6)) * D
+        
+        r, _ = LagrangeCoefficients.propagate(x[:3], x[3:], t - t_0, mu=cls.mu)
+        
+        y, _, _, _ = residuals(r)
+        
+        return dict(r_0=x[:3], v_0=x[3:], t_0=t_0, covariance=covariance, sigma=np.sqrt(np.diag(covariance)), converged=converged, iterations=len(rms), rms=np.array(rms), residuals=np.column_stack([y[:, :2], np.where(ranged, y[:, 2], np.nan)]))
+
 if __name__ == '__main__':
     
     print('EXAMPLE 5.1\n')
@@ -892,4 +1485,38 @@ if __name__ == '__main__':
     print('EXAMPLE 5.12\n')
     r, v = OrbitDetermination.predict_from_gauss_method_extended(np.deg2rad(40), 1, np.deg2rad([44.506, 45.000, 45.499]), np.deg2rad([43.537, 54.420, 64.318]), np.deg2rad([-8.7833, -12.074, -15.105]), [0, 118.10, 237.58])
     print(ThreeDimensionalOrbit.calculate_orbital_elements(r, v, True))
-    print('-' * 40, '\n')
\ No newline at end of file
+    print('-' * 40, '\n')
+    print('BATCH ORBIT DETERMINATION\n')
+    # ? Synthetic observation file: 40 tracks of 12 sightings from the site of Example 5.11 (even tracks also ranged)
+    rng = np.random.default_rng(0)
+    rows = []
+    for k in range(40):
+        t = np.sort(rng.uniform(0, 600, 12))
+        r, _ = LagrangeCoefficients.propagate(np.array([6500, -2000, 3000]) + rng.normal(0, 50, 3), np.array([2, 6.5, 3]) + rng.normal(0, 0.05, 3), t)
+        theta = np.deg2rad(44.506) + OrbitDetermination.omega * t + 0.01 * k
+        rho = r - OrbitDetermination.gef(theta, np.deg2rad(40), 1).T
+        rho_m = np.linalg.norm(rho, axis=-1)
+        alpha, delta = np.arctan2(rho[:, 1], rho[:, 0]), np.arcsin(rho[:, 2] / rho_m)
+        rows.append(np.column_stack([np.full(12, k), t, np.rad2deg(theta), np.full(12, 40), np.ones(12), np.rad2deg(alpha), np.rad2deg(delta), rho_m if k % 2 == 0 else np.full(12, np.nan)]))
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'observations_example.csv')
+        np.savetxt(path, np.concatenate(rows), delimiter=',', header='track, t[s], theta[deg], phi[deg], H[km], alpha[deg], delta[deg], rho[km]')
+        result = OrbitDetermination.batch_orbit_determination(OrbitDetermination.read_observations(path), spacing=3)
+    print(f'Triples: {len(result["t"])} (Gibbs: {np.sum(result["gibbs"])}), converged: {np.mean(result["converged"]):.1%}')
+    print(f'Angular residual RMS (median): Gibbs {np.median(result["residual_rms"][result["gibbs"]]):.3e} rad, Gauss {np.median(result["residual_rms"][~result["gibbs"]]):.3e} rad')
+    print('-' * 40, '\n')
+
+    print('BATCH LEAST SQUARES\n')
+    # ? 10^4 noisy sightings over one day from the site of Example 5.11 (every third hourly track also ranged, the first one angles-only)
+    rng = np.random.default_rng(1)
+    t = np.sort(rng.uniform(0, 86400, 10000))
+    r, _ = LagrangeCoefficients.propagate(np.array([6500, -2000, 3000]), np.array([2, 6.5, 3]), t)
+    rho = r - OrbitDetermination.gef(np.deg2rad(44.506) + OrbitDetermination.omega * t, np.deg2rad(40), 1).T
+    rho_h = rho / np.linalg.norm(rho, axis=-1, keepdims=True) + rng.normal(0, 1e-5, rho.shape)
+    observations = dict(track=(t // 3600).astype(int), t=t, R=r - rho, rho_h=rho_h / np.linalg.norm(rho_h, axis=-1, keepdims=True),
+                        rho=np.where((t // 3600) % 3 == 1, np.linalg.norm(rho, axis=-1) + rng.normal(0, 1e-3, len(t)), np.nan))
+    result = OrbitDetermination.batch_least_squares(observations)
+    r, _ = LagrangeCoefficients.propagate(np.array([6500, -2000, 3000]), np.array([2, 6.5, 3]), np.array([result['t_0']]))
+    print(f'Iterations: {result["iterations"]} (converged: {result["converged"]}), weighted RMS: {np.array2string(result["rms"], precision=3)}')
+    print(f'Position error: {np.linalg.norm(result["r_0"] - r[0]):.3e} km (1-sigma {np.linalg.norm(result["sigma"][:3]):.3e} km)')
+    print('-' * 40, '\n')
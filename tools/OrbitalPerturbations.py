@@ -23,6 +23,9 @@ from AstronomicalData import AstronomicalData, CelestialBody
 from LagrangeCoefficients import LagrangeCoefficients
 from ThreeDimensionalOrbit import ThreeDimensionalOrbit, OrbitalElements
 from OrbitDetermination import OrbitDetermination
+from Eclipse import Eclipse
+from TrajectoryArchive import TrajectoryArchive
+from Propagator import Propagator
 
 class OrbitalPerturbations():
     """Implements the main methods to simulate the effect of perturbations on an orbit"""
@@ -160,7 +163,7 @@ class OrbitalPerturbations():
         return dX_dt
     
     @classmethod
-    def simulate_relative_motion_with_atmospheric_drag(cls, y_0 : np.ndarray, B : float, t_0 : float = 0.0, t_f : float = 0.0, show : bool = False) -> dict:
+    def simulate_relative_motion_with_atmospheric_drag(cls, y_0 : np.ndarray, B : float, t_0 : float = 0.0, t_f : float = 0.0, show : bool = False, archive : str = '', max_points : int = 100_000) -> dict:
         """Integrates the Ordinary Differential Equations for the relative motion with atmospheric drag perturbation (COWELL's method)
 
         Args:
@@ -169,9 +172,11 @@ class OrbitalPerturbations():
             t_0 (float, optional): Initial time. Defaults to 0.0.
             t_f (float, optional): Final time. Defaults to 0.0.
             show (bool, optional): True for plotting the trajectory. Defaults to False.
+            archive (str, optional): Trajectory archive path (the propagation is streamed to disk). Defaults to '' (in memory).
+            max_points (int, optional): Maximum number of points read back from the archive. Defaults to 100_000.
             
         Returns:
-            dict: { t: time, y: state[n_states, n_points] }
+            dict: { t: time, y: state[n_states, n_points], archive: TrajectoryArchive (archive only) }
         """
         
         # >>> 1.
@@ -180,7 +185,19 @@ class OrbitalPerturbations():
         
         cls.iteration = 0
         
-        integrationResult = solve_ivp(fun=cls.atmospheric_drag_eom, t_span=[t_0, t_f], y0=y_0, method='RK45', args=(B, t_0, t_f), rtol=1e-8, atol=1e-8)
+        if archive:
+            
+            trajectoryArchive, _ = TrajectoryArchive.integrate(archive, cls.atmospheric_drag_eom, [t_0, t_f], y_0, metadata=dict(model='atmospheric_drag', body=int(cls.body), B=B, t_0=t_0, t_f=t_f, y_0=list(map(float, y_0))), method='RK45', args=(B, t_0, t_f), rtol=1e-8, atol=1e-8)
+            
+            t, y = trajectoryArchive.decimate(max_points)
+            
+            integrationResult = dict(t=np.asarray(t), y=np.asarray(y), success=True)
+        
+        else:
+            
+            trajectoryArchive = None
+            
+            integrationResult = solve_ivp(fun=cls.atmospheric_drag_eom, t_span=[t_0, t_f], y0=y_0, method='RK45', args=(B, t_0, t_f), rtol=1e-8, atol=1e-8)
         
         if not integrationResult['success']: Exception(integrationResult['message'])
         
@@ -257,7 +274,7 @@ class OrbitalPerturbations():
             plt.legend()
             plt.show()
         
-        return dict(t=integrationResult['t'], y=integrationResult['y'], dt=np.abs(integrationResult['t'][-1] - integrationResult['t'][0]))
+        return dict(t=integrationResult['t'], y=integrationResult['y'], dt=np.abs(integrationResult['t'][-1] - integrationResult['t'][0]), archive=trajectoryArchive)
     
     # ! SECTION 12.5
     
@@ -500,11 +517,11 @@ class OrbitalPerturbations():
             
             r_, v_ = ThreeDimensionalOrbit.pf_2_gef(OrbitalElements(h, e, i, Omega, omega, theta))
             
-            r_sun, lam, eps = cls.sun_position(OrbitDetermination.julian_day_2_date(t / 86400))
+            r_sun, lam, eps = Eclipse.sun_position(t / 86400)
             
             S = AstronomicalData.S_0 * AstronomicalData.R_0**2 / np.linalg.norm(r_sun)**2
             
-            p_SR = cls.shadow(r_, r_sun) * S / AstronomicalData.c * B_SRP * 1e-3
+            p_SR = Eclipse.shadow_function(r_, r_sun) * S / AstronomicalData.c * B_SRP * 1e-3
             
             Q_Xr = np.array(
                 [
@@ -609,7 +626,9 @@ class OrbitalPerturbations():
                                            t_f : float = 0.0,
                                            JD_0 : float = 0.0,
                                            JD_f : float = 0.0,
-                                           show : bool = False) -> dict:
+                                           show : bool = False,
+                                           archive : str = '',
+                                           max_points : int = 100_000) -> dict:
         """Integrates the Ordinary Differential Equations for the Gauss variational equations
 
         Args:
@@ -626,9 +645,11 @@ class OrbitalPerturbations():
             JD_0 (float, optional): Initial Julian day. Defaults to 0.0.
             JD_f (float, optional): Final Julian day. Defaults to 0.0.
             show (bool, optional): True for plotting the trajectory. Defaults to False.
+            archive (str, optional): Trajectory archive path (the propagation is streamed to disk). Defaults to '' (in memory).
+            max_points (int, optional): Maximum number of points read back from the archive. Defaults to 100_000.
             
         Returns:
-            dict: { t: time, y: state[n_states, n_points] }
+            dict: { t: time, y: state[n_states, n_points], eclipses: eclipse intervals [days] (SRP only), archive: TrajectoryArchive (archive only) }
         """
         
         # >>> 1.
@@ -641,10 +662,45 @@ class OrbitalPerturbations():
         
         ThreeDimensionalOrbit.set_celestial_body(cls.body)
         
-        integrationResult = solve_ivp(fun=cls.gauss_variational_eom, t_span=t_span, y0=y_0, method='RK45', args=(drag, gravitational, SRP, MOON, SUN, B, B_SRP), rtol=1e-8, atol=1e-8)
+        Eclipse.set_celestial_body(cls.body)
+        
+        events = Eclipse.events(cls.gauss_variational_positions) if SRP else None
+        
+        if archive:
+            
+            metadata = dict(model='gauss_variational', body=int(cls.body), drag=drag, gravitational=gravitational, SRP=SRP, MOON=MOON, SUN=SUN, B=B, B_SRP=B_SRP, t_span=list(map(float, t_span)), y_0=list(map(float, y_0)))
+            
+            trajectoryArchive, t_events = TrajectoryArchive.integrate(archive, cls.gauss_variational_eom, t_span, y_0, metadata=metadata, method='RK45', args=(drag, gravitational, SRP, MOON, SUN, B, B_SRP), events=events, rtol=1e-8, atol=1e-8)
+            
+            t, y = trajectoryArchive.decimate(max_points)
+            
+            integrationResult = dict(t=np.asarray(t), y=np.asarray(y), t_events=t_events, success=True)
+        
+        else:
+            
+            trajectoryArchive = None
+            
+            integrationResult = solve_ivp(fun=cls.gauss_variational_eom, t_span=t_span, y0=y_0, method='RK45', args=(drag, gravitational, SRP, MOON, SUN, B, B_SRP), events=events, rtol=1e-8, atol=1e-8)
             
         if not integrationResult['success']: Exception(integrationResult['message'])
         
+        # >>> Eclipse entry / exit times
+        
+        eclipses = []
+        
+        if SRP:
+            
+            r_sat, r_sun = cls.gauss_variational_positions(t_span[0], y_0)
+            
+            initial = [Eclipse.penumbra_function(r_sat, r_sun) < 0, Eclipse.umbra_function(r_sat, r_sun) < 0]
+            
+            eclipses = Eclipse.eclipse_table(integrationResult['t_events'], t_span[0], t_span[1], initial)
+            
+            for event in eclipses:
+                
+                event.t_entry   = (event.t_entry - t_span[0]) / 86400
+                event.t_exit    = (event.t_exit - t_span[0]) / 86400
+        
         t       = (integrationResult['t'] - integrationResult['t'][0]) / 86400
         h       = integrationResult['y'][0, :]
         e       = integrationResult['y'][1, :]
@@ -692,7 +748,83 @@ class OrbitalPerturbations():
             
             plt.show()
         
-        return dict(t=t, a=a, e=e, i=i, Omega=Omega, omega=omega, h=h)
+        return dict(t=t, a=a, e=e, i=i, Omega=Omega, omega=omega, h=h, eclipses=eclipses, archive=trajectoryArchive)
+    
+    @classmethod
+    def iter_gauss_variational_equations(cls,
+                                         y_0 : np.ndarray,
+                                         drag : bool = False,
+                                         gravitational : bool = False,
+                                         SRP : bool = False,
+                                         B : float = 0.0,
+                                         B_SRP : float = 0.0,
+                                         MOON : bool = False,
+                                         SUN : bool = False,
+                                         t_0 : float = 0.0,
+                                         t_f : float = 0.0,
+                                         JD_0 : float = 0.0,
+                                         JD_f : float = 0.0,
+                                         chunk_seconds : float = 86400.0):
+        """Streaming version of simulate_gauss_variational_equations (the caller can draw every chunk and stop iterating to abort)
+
+        Args:
+            y_0 (np.ndarray): Initial state [6,1] (h, e, theta, Omega, i, omega)
+            drag (bool, optional): True to include drag perturbation. Defaults to False.
+            gravitational (bool, optional): True to include gravitational perturbation. Defaults to False.
+            SRP (bool, optional): True to include Solar Radiation Pressure perturbation. Defaults to False.
+            B (float, optional): Ballistic coefficient (C_D * A / m). Defaults to 0.0.
+            B_SRP (float, optional): Ballistic coefficient for SRP (C_R * A_S / m). Defaults to 0.0.
+            MOON (bool, optional): True to include Lunar gravity perturbation. Defaults to False.
+            SUN (bool, optional): True to include Solar gravity perturbation. Defaults to False.
+            t_0 (float, optional): Initial time. Defaults to 0.0.
+            t_f (float, optional): Final time. Defaults to 0.0.
+            JD_0 (float, optional): Initial Julian day. Defaults to 0.0.
+            JD_f (float, optional): Final Julian day. Defaults to 0.0.
+            chunk_seconds (float, optional): Simulated time covered by each chunk [s]. Defaults to 86400.0.
+
+        Yields:
+            TrajectoryChunk: Chunk with derived { t [days], a, e, i, Omega, omega, h } and the eclipse event times (SRP only)
+        """
+        
+        if t_f < t_0 and JD_0 == 0.0 and JD_f == 0.0: raise Exception('Invalid integration time')
+        
+        if JD_f < JD_0 and t_0 == 0.0 and t_f == 0.0: raise Exception('Invalid integration time')
+        
+        t_span = [t_0, t_f] if JD_0 == 0.0 and JD_f == 0.0 else [JD_0, JD_f]
+        
+        ThreeDimensionalOrbit.set_celestial_body(cls.body)
+        
+        Eclipse.set_celestial_body(cls.body)
+        
+        events = Eclipse.events(cls.gauss_variational_positions) if SRP else None
+        
+        def derived(t : np.ndarray, X : np.ndarray) -> dict:
+            
+            h, e = X[0], X[1]
+            
+            return dict(t=(t - t_span[0]) / 86400, a=h**2 / (cls.mu * (1 - e**2)), e=e, i=np.rad2deg(X[4]), Omega=np.rad2deg(X[3]), omega=np.rad2deg(X[5]), h=h)
+        
+        yield from Propagator.iter_propagate(cls.gauss_variational_eom, y_0, t_span, chunk_seconds, method='RK45', args=(drag, gravitational, SRP, MOON, SUN, B, B_SRP), events=events, derived=derived, rtol=1e-8, atol=1e-8)
+    
+    @classmethod
+    def gauss_variational_positions(cls, t : float, X : np.ndarray) -> list:
+        """Satellite and Sun position vectors for the Gauss variational state (used by the eclipse events)
+
+        Args:
+            t (float): Time (Julian day in seconds)
+            X (np.ndarray): State [6,1] (h, e, theta, Omega, i, omega)
+
+        Returns:
+            list: [r_sat GEF, r_sun GEF]
+        """
+        
+        h, e, theta, Omega, i, omega = X
+        
+        r_, v_ = ThreeDimensionalOrbit.pf_2_gef(OrbitalElements(h, e, i, Omega, omega, theta))
+        
+        r_sun, lam, eps = Eclipse.sun_position(t / 86400)
+        
+        return [r_, r_sun]
     
     # ! SECTION 12.9
     
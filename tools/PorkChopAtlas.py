@@ -0,0 +1,309 @@
+""" PorkChopAtlas.py: Implements the precomputed on-disk pork chop atlas """
+
+__author__      = "Alessio Negri"
+__license__     = "LGPL v3"
+__maintainer__  = "Alessio Negri"
+
+import os
+import sys
+import zlib
+import glob
+import struct
+import argparse
+import numpy as np
+
+from datetime import datetime, timedelta
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.append(os.path.dirname(__file__))
+
+from Common import daterange
+from AstronomicalData import CelestialBody
+from InterplanetaryTrajectories import InterplanetaryTrajectories
+from OrbitDetermination import OrbitDetermination
+
+# --- CLASS 
+
+class PorkChopAtlas:
+    """Pork chop grids (departure / arrival excess velocities) of a planet pair stored in zlib-compressed square tiles, read back through numpy.memmap"""
+    
+    # --- MEMBERS 
+    
+    MAGIC       = b'SCPCA\x00\x00\x00'                                  # * File signature
+    VERSION     = 1                                                     # * Format version
+    HEADER      = struct.Struct('<8sIiiqqiiii')                         # * magic, version, departure, arrival, launch start, arrival start [ordinal days], step [days], n_launch, n_arrival, tile
+    DV_MAX      = 50.0                                                  # * Excess velocity saturation  [ km / s ]
+    DIRECTORY   = os.path.join(os.path.dirname(__file__), '..', 'atlas') # * Default atlas directory
+    
+    # --- METHODS 
+    
+    def __init__(self, path : str) -> None:
+        """Opens an atlas file (only the header and the tile index are read)
+
+        Args:
+            path (str): File path
+        """
+        
+        with open(path, 'rb') as file:
+            
+            magic, version, departure, arrival, launch_start, arrival_start, self.step, self.n_launch, self.n_arrival, self.tile = self.HEADER.unpack(file.read(self.HEADER.size))
+            
+            if magic != self.MAGIC: raise Exception(f'Invalid pork chop atlas: {path}')
+            
+            if version != self.VERSION: raise Exception(f'Unsupported pork chop atlas version: {version}')
+        
+        self.path           = path
+        self.departure      = CelestialBody(departure)
+        self.arrival        = CelestialBody(arrival)
+        self.launch_start   = datetime.fromordinal(launch_start)
+        self.arrival_start  = datetime.fromordinal(arrival_start)
+        
+        # ? Tile index [n_tile_rows, n_tile_columns, (offset, length)]
+        
+        self.data   = np.memmap(path, dtype=np.uint8, mode='r')
+        self.index  = np.frombuffer(self.data[self.HEADER.size:self.HEADER.size + 16 * self.n_tiles[0] * self.n_tiles[1]], dtype='<u8').reshape(*self.n_tiles, 2)
+    
+    @property
+    def n_tiles(self) -> tuple: return (-(-self.n_arrival // self.tile), -(-self.n_launch // self.tile))
+    
+    @classmethod
+    def compute_tile(cls, departure : CelestialBody, arrival : CelestialBody, launch_dates : list, arrival_dates : list) -> np.ndarray:
+        """Solves the Lambert problem on a block of launch / arrival dates
+
+        Args:
+            departure (CelestialBody): Departure planet
+            arrival (CelestialBody): Arrival planet
+            launch_dates (list): Launch dates
+            arrival_dates (list): Arrival dates
+
+        Returns:
+            np.ndarray: [dv_1, dv_2] [2, n_arrival, n_launch] [ km / s ]
+        """
+        
+        OrbitDetermination.set_celestial_body(CelestialBody.SUN)
+        
+        tile = np.full(shape=(2, len(arrival_dates), len(launch_dates)), fill_value=cls.DV_MAX, dtype=np.float32)
+        
+        # >>> 1. Ephemeris (once per date)
+        
+        departure_states    = [InterplanetaryTrajectories.ephemeris(departure, date) for date in launch_dates]
+        arrival_states      = [InterplanetaryTrajectories.ephemeris(arrival, date) for date in arrival_dates]
+        
+        # >>> 2. Lambert problem
+        
+        for i, (awDate, (R_2, V_2)) in enumerate(zip(arrival_dates, arrival_states)):
+            
+            for j, (lwDate, (R_1, V_1)) in enumerate(zip(launch_dates, departure_states)):
+                
+                dt = (awDate - lwDate).total_seconds()
+                
+                if dt <= 0: continue
+                
+                V_D_v, V_A_v, oe, theta_2 = OrbitDetermination.solve_lambert_problem(R_1, R_2, dt)
+                
+                tile[0, i, j] = min(np.linalg.norm(V_D_v - V_1), cls.DV_MAX)
+                tile[1, i, j] = min(np.linalg.norm(V_A_v - V_2), cls.DV_MAX)
+        
+        return tile
+    
+    @classmethod
+    def build(cls,
+              path : str,
+              departure : CelestialBody,
+              arrival : CelestialBody,
+              launch_window : list,
+              arrival_window : list,
+              step : int = 1,
+              tile : int = 64,
+              workers : int = None,
+              progress = None) -> 'PorkChopAtlas':
+        """Computes the atlas of a planet pair (tiles in parallel on a process pool) and writes it to disk
+
+        Args:
+            path (str): File path
+            departure (CelestialBody): Departure planet
+            arrival (CelestialBody): Arrival planet
+            launch_window (list): [begin, end] launch dates
+            arrival_window (list): [begin, end] arrival dates
+            step (int, optional): Grid step [days]. Defaults to 1.
+            tile (int, optional): Tile size [cells]. Defaults to 64.
+            workers (int, optional): Number of processes. Defaults to None (all cores).
+            progress (Callable, optional): Function (done, total) called after every tile written. Defaults to None.
+
+        Returns:
+            PorkChopAtlas: Atlas opened for reading
+        """
+        
+        launch_dates    = list(daterange(*launch_window, step))
+        arrival_dates   = list(daterange(*arrival_window, step))
+        
+        blocks = [(i, j) for i in range(0, len(arrival_dates), tile) for j in range(0, len(launch_dates), tile)]
+        
+        index = np.zeros(shape=(-(-len(arrival_dates) // tile), -(-len(launch_dates) // tile), 2), dtype='<u8')
+        
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        
+        with open(path + '.tmp', 'wb') as file, ProcessPoolExecutor(max_workers=workers) as executor:
+            
+            # >>> 1. Header and (empty) tile index
+            
+            file.write(cls.HEADER.pack(cls.MAGIC, cls.VERSION, int(departure), int(arrival), launch_window[0].toordinal(), arrival_window[0].toordinal(), step, len(launch_dates), len(arrival_dates), tile))
+            file.write(index.tobytes())
+            
+            # >>> 2. Compressed tiles (padded to the full tile size)
+            
+            tiles = executor.map(cls.compute_tile,
+                                 [departure] * len(blocks),
+                                 [arrival] * len(blocks),
+                                 [launch_dates[j:j + tile] for i, j in blocks],
+                                 [arrival_dates[i:i + tile] for i, j in blocks])
+            
+            for k, ((i, j), values) in enumerate(zip(blocks, tiles)):
+                
+                padded = np.full(shape=(2, tile, tile), fill_value=cls.DV_MAX, dtype='<f4')
+                
+                padded[:, :values.shape[1], :values.shape[2]] = values
+                
+                compressed = zlib.compress(padded.tobytes(), level=6)
+                
+                index[i // tile, j // tile] = [file.tell(), len(compressed)]
+                
+                file.write(compressed)
+                
+                if progress is not None: progress(k + 1, len(blocks))
+            
+            # >>> 3. Final tile index
+            
+            file.seek(cls.HEADER.size)
+            file.write(index.tobytes())
+        
+        os.replace(path + '.tmp', path)
+        
+        return cls(path)
+    
+    def read_tile(self, i : int, j : int) -> np.ndarray:
+        """Decompresses a tile
+
+        Args:
+            i (int): Tile row (arrival)
+            j (int): Tile column (launch)
+
+        Returns:
+            np.ndarray: [dv_1, dv_2] [2, tile, tile] [ km / s ]
+        """
+        
+        offset, length = self.index[i, j]
+        
+        return np.frombuffer(zlib.decompress(self.data[offset:offset + length]), dtype='<f4').reshape(2, self.tile, self.tile)
+    
+    def window(self, launch_window : list, arrival_window : list, step : int) -> list:
+        """Extracts a sub-window with the same layout of the PorkChopPlot grid (only the tiles covering it are decompressed)
+
+        Args:
+            launch_window (list): [begin, end] launch dates
+            arrival_window (list): [begin, end] arrival dates
+            step (int): Grid step [days]
+
+        Returns:
+            list: [dv_1, dv_2, T_F, X, Y] or None when the window is not covered by the atlas
+        """
+        
+        # >>> 1. Coverage (dates on the atlas grid, step multiple of the atlas step)
+        
+        def indexes(window : list, start : datetime, n : int) -> np.ndarray:
+            
+            offset = window[0] - start
+            
+            if step % self.step != 0 or offset.seconds != 0 or offset.days < 0 or offset.days % self.step != 0: return None
+            
+            k = (offset.days + np.arange(0, (window[1] - window[0]).days + 1, step)) // self.step
+            
+            return k if len(k) and k[-1] < n else None
+        
+        cols = indexes(launch_window, self.launch_start, self.n_launch)
+        rows = indexes(arrival_window, self.arrival_start, self.n_arrival)
+        
+        if cols is None or rows is None: return None
+        
+        # >>> 2. Gather of the tiles touched by the window
+        
+        dv = np.empty(shape=(2, len(rows), len(cols)), dtype=float)
+        
+        for i in np.unique(rows // self.tile):
+            
+            for j in np.unique(cols // self.tile):
+                
+                r = np.flatnonzero(rows // self.tile == i)
+                c = np.flatnonzero(cols // self.tile == j)
+                
+                dv[:, r[:, np.newaxis], c] = self.read_tile(i, j)[:, rows[r, np.newaxis] % self.tile, cols[c] % self.tile]
+        
+        # >>> 3. Dates and time of flight
+        
+        X = np.array([np.datetime64((self.launch_start + timedelta(int(k) * self.step)).strftime('%Y-%m-%d')) for k in cols], dtype='datetime64[s]')
+        Y = np.array([np.datetime64((self.arrival_start + timedelta(int(k) * self.step)).strftime('%Y-%m-%d')) for k in rows], dtype='datetime64[s]')
+        
+        X, Y = np.meshgrid(X, Y)
+        
+        T_F = (Y - X).astype(float) / 86400
+        
+        return [dv[0], dv[1], T_F, X, Y]
+    
+    @classmethod
+    def lookup(cls, departure : CelestialBody, arrival : CelestialBody, launch_window : list, arrival_window : list, step : int, directory : str = None) -> list:
+        """Looks for an atlas covering the requested pork chop
+
+        Args:
+            departure (CelestialBody): Departure planet
+            arrival (CelestialBody): Arrival planet
+            launch_window (list): [begin, end] launch dates
+            arrival_window (list): [begin, end] arrival dates
+            step (int): Grid step [days]
+            directory (str, optional): Atlas directory. Defaults to None (DIRECTORY).
+
+        Returns:
+            list: [dv_1, dv_2, T_F, X, Y] or None (cache miss)
+        """
+        
+        for path in sorted(glob.glob(os.path.join(directory or cls.DIRECTORY, '*.pca'))):
+            
+            try:
+                
+                atlas = cls(path)
+            
+            except Exception:
+                
+                continue
+            
+            if atlas.departure != departure or atlas.arrival != arrival: continue
+            
+            grid = atlas.window(launch_window, arrival_window, step)
+            
+            if grid is not None: return grid
+        
+        return None
+
+if __name__ == '__main__':
+    
+    parser = argparse.ArgumentParser(description='Builds a pork chop atlas for a planet pair')
+    
+    parser.add_argument('departure', type=str, help='Departure planet (e.g. EARTH)')
+    parser.add_argument('arrival', type=str, help='Arrival planet (e.g. MARS)')
+    parser.add_argument('--launch', nargs=2, required=True, help='Launch window (YYYY-MM-DD YYYY-MM-DD)')
+    parser.add_argument('--arrival-window', nargs=2, required=True, help='Arrival window (YYYY-MM-DD YYYY-MM-DD)')
+    parser.add_argument('--step', type=int, default=1, help='Grid step [days]')
+    parser.add_argument('--tile', type=int, default=64, help='Tile size [cells]')
+    parser.add_argument('--workers', type=int, default=None, help='Number of processes')
+    parser.add_argument('--output', type=str, default='', help='Output file (default: atlas/<departure>_<arrival>_<launch>_<arrival>.pca)')
+    
+    args = parser.parse_args()
+    
+    launch_window   = [datetime.strptime(date, '%Y-%m-%d') for date in args.launch]
+    arrival_window  = [datetime.strptime(date, '%Y-%m-%d') for date in args.arrival_window]
+    
+    output = args.output or os.path.join(PorkChopAtlas.DIRECTORY, f'{args.departure.lower()}_{args.arrival.lower()}_{args.launch[0]}_{args.arrival_window[0]}.pca')
+    
+    atlas = PorkChopAtlas.build(output, CelestialBody[args.departure.upper()], CelestialBody[args.arrival.upper()], launch_window, arrival_window, args.step, args.tile, args.workers,
+                                progress=lambda done, total: print(f'Tile {done} / {total}', end='\r'))
+    
+    print(f'\n{output}: {atlas.n_arrival} x {atlas.n_launch} cells, {os.path.getsize(output) / 1024**2:.2f} MB')
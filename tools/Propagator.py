@@ -0,0 +1,175 @@
+""" Propagator.py: Implements the streaming (step-wise) integration of the equations of motion """
+
+__author__      = "Alessio Negri"
+__license__     = "LGPL v3"
+__maintainer__  = "Alessio Negri"
+
+import os
+import sys
+import numpy as np
+
+from dataclasses import dataclass, field
+from scipy.integrate import RK23, RK45, DOP853
+from scipy.optimize import brentq
+
+sys.path.append(os.path.dirname(__file__))
+
+# --- STRUCT 
+
+@dataclass
+class TrajectoryChunk:
+    """Block of integrated points yielded by the streaming propagation"""
+    
+    t           : np.ndarray    = field(default_factory=lambda: np.empty(0))    # * Times                   [ s ]
+    y           : np.ndarray    = field(default_factory=lambda: np.empty(0))    # * States                  [ n_states, n_points ]
+    derived     : dict          = field(default_factory=dict)                   # * Derived quantities      [ n_points ]
+    t_events    : list          = field(default_factory=list)                   # * Event times in the chunk (one array per event)
+    final       : bool          = False                                         # * True for the last chunk
+
+# --- CLASS 
+
+class Propagator:
+    """Generator based propagation: the explicit Runge-Kutta solvers are stepped manually and the integrated points are yielded in chunks"""
+    
+    # --- MEMBERS 
+    
+    METHODS = dict(RK23=RK23, RK45=RK45, DOP853=DOP853) # * Supported step-wise solvers
+    
+    # --- METHODS 
+    
+    @classmethod
+    def iter_propagate(cls,
+                       fun,
+                       y_0 : np.ndarray,
+                       t_span : list,
+                       chunk_seconds : float,
+                       method : str = 'RK45',
+                       args : tuple = (),
+                       events : list = None,
+                       derived = None,
+                       **options):
+        """Integrates the equations of motion yielding a chunk every chunk_seconds of simulated time
+
+        Args:
+            fun (Callable): Right-hand side fun(t, y, *args)
+            y_0 (np.ndarray): Initial state
+            t_span (list): Integration interval [t_0, t_f]
+            chunk_seconds (float): Simulated time covered by each chunk [s]
+            method (str, optional): Solver (RK23, RK45, DOP853). Defaults to 'RK45'.
+            args (tuple, optional): Additional arguments of fun. Defaults to ().
+            events (list, optional): Event functions event(t, y, *args) with optional terminal / direction attributes. Defaults to None.
+            derived (Callable, optional): Function (t, y) -> dict of derived quantities evaluated on each chunk. Defaults to None.
+            options: Solver options (rtol, atol, max_step, first_step)
+
+        Yields:
+            TrajectoryChunk: Integrated points (the first chunk starts with the initial state)
+        """
+        
+        if method not in cls.METHODS: raise Exception(f'Unsupported step-wise solver: {method}')
+        
+        if chunk_seconds <= 0: raise Exception('Invalid chunk length')
+        
+        events = [] if events is None else events if isinstance(events, (list, tuple)) else [events]
+        
+        solver = cls.METHODS[method](lambda t, y: fun(t, y, *args), t_span[0], np.asarray(y_0, dtype=float), t_span[1], **options)
+        
+        direction = np.sign(t_span[1] - t_span[0]) or 1.0
+        
+        g = [event(solver.t, solver.y, *args) for event in events]
+        
+        t, y, t_events = [solver.t], [solver.y.copy()], [[] for _ in events]
+        
+        t_chunk = solver.t + direction * chunk_seconds
+        
+        final = solver.status != 'running'
+        
+        while not final:
+            
+            # >>> 1. Step
+            
+            message = solver.step()
+            
+            if solver.status == 'failed': raise Exception(message)
+            
+            t_new, y_new = solver.t, solver.y.copy()
+            
+            # >>> 2. Events (root of the dense output between the last two steps)
+            
+            terminal = None
+            
+            if events:
+                
+                sol = solver.dense_output()
+                
+                g_new = [event(t_new, y_new, *args) for event in events]
+                
+                for k, event in enumerate(events):
+                    
+                    up      = g[k] < 0 <= g_new[k]
+                    down    = g[k] > 0 >= g_new[k]
+                    
+                    if not (up and getattr(event, 'direction', 0) >= 0 or down and getattr(event, 'direction', 0) <= 0): continue
+                    
+                    t_root = brentq(lambda _t: event(_t, sol(_t), *args), solver.t_old, t_new)
+                    
+                    t_events[k].append(t_root)
+                    
+                    if getattr(event, 'terminal', False) and (terminal is None or direction * (t_root - terminal) < 0): terminal = t_root
+                
+                g = g_new
+                
+                if terminal is not None: t_new, y_new = terminal, sol(terminal)
+            
+            t.append(t_new)
+            y.append(y_new)
+            
+            final = terminal is not None or solver.status == 'finished'
+            
+            # >>> 3. Chunk
+            
+            if final or direction * (t_new - t_chunk) >= 0:
+                
+                chunk = TrajectoryChunk(np.array(t), np.array(y).T, final=final)
+                
+                chunk.t_events = [np.array(times) for times in t_events]
+                
+                if derived is not None: chunk.derived = derived(chunk.t, chunk.y)
+                
+                yield chunk
+                
+                # ? The next chunk starts where this one ends
+                
+                t, y, t_events = [t_new], [y_new], [[] for _ in events]
+                
+                while direction * (t_new - t_chunk) >= 0: t_chunk += direction * chunk_seconds
+    
+    @classmethod
+    def collect(cls, chunks) -> TrajectoryChunk:
+        """Concatenates the chunks of a streaming propagation (the shared boundary points are removed)
+
+        Args:
+            chunks (Iterable): Trajectory chunks
+
+        Returns:
+            TrajectoryChunk: Whole trajectory
+        """
+        
+        chunks = list(chunks)
+        
+        if len(chunks) == 0: return TrajectoryChunk()
+        
+        result = TrajectoryChunk(np.concatenate([chunks[0].t] + [chunk.t[1:] for chunk in chunks[1:]]),
+                                 np.concatenate([chunks[0].y] + [chunk.y[:, 1:] for chunk in chunks[1:]], axis=1),
+                                 final=chunks[-1].final)
+        
+        result.derived  = { key : np.concatenate([chunks[0].derived[key]] + [chunk.derived[key][1:] for chunk in chunks[1:]]) for key in chunks[0].derived }
+        result.t_events = [np.concatenate([chunk.t_events[k] for chunk in chunks]) for k in range(len(chunks[0].t_events))]
+        
+        return result
+
+if __name__ == '__main__':
+    
+    print('HARMONIC OSCILLATOR\n')
+    for chunk in Propagator.iter_propagate(lambda t, y: np.array([y[1], -y[0]]), np.array([1.0, 0.0]), [0, 10], 2.5, rtol=1e-10, atol=1e-10):
+        print(chunk.t[0], chunk.t[-1], len(chunk.t), chunk.final, np.abs(chunk.y[0, -1] - np.cos(chunk.t[-1])))
+    print('-' * 40, '\n')
@@ -141,6 +141,79 @@ class RelativeMotion:
         
         return [r_C, v_C]
     
+    @classmethod
+    def calculate_kinematics_lvlh_batch(cls, r_T : np.ndarray, v_T : np.ndarray, r_C : np.ndarray, v_C : np.ndarray) -> list:
+        """Vectorized Algorithm 7.1 with batched rotation matrices
+
+        Args:
+            r_T (np.ndarray): Target position vectors [N,3]
+            v_T (np.ndarray): Target velocity vectors [N,3]
+            r_C (np.ndarray): Chaser position vectors [N,3]
+            v_C (np.ndarray): Chaser velocity vectors [N,3]
+
+        Returns:
+            list: [r_rel, v_rel, a_rel, Omega] [N,3]
+        """
+        
+        # >>> 1. Angular momentum and distances
+        
+        h_T = np.cross(r_T, v_T)
+        
+        r_T_m = np.linalg.norm(r_T, axis=-1, keepdims=True)
+        r_C_m = np.linalg.norm(r_C, axis=-1, keepdims=True)
+        
+        # >>> 2. Orthogonal trasformation matrices [N,3,3] (rows i, j, k)
+        
+        i = r_T / r_T_m
+        k = h_T / np.linalg.norm(h_T, axis=-1, keepdims=True)
+        
+        Q_Xx = np.stack((i, np.cross(k, i), k), axis=-2)
+        
+        # >>> 3. Angular velocity
+        
+        Omega = h_T / r_T_m**2
+        
+        dOmega_dt = - 2 * np.sum(v_T * r_T, axis=-1, keepdims=True) / r_T_m**2 * Omega
+        
+        # >>> 4. Relative kinematics
+        
+        r_rel_X = r_C - r_T
+        
+        v_rel_X = v_C - v_T - np.cross(Omega, r_rel_X)
+        
+        a_rel_X = - cls.mu / r_C_m**3 * r_C + cls.mu / r_T_m**3 * r_T - np.cross(dOmega_dt, r_rel_X) - np.cross(Omega, np.cross(Omega, r_rel_X)) - 2 * np.cross(Omega, v_rel_X)
+        
+        # >>> 5. LVLH kinematics
+        
+        return [np.einsum('...ij,...j->...i', Q_Xx, vector) for vector in (r_rel_X, v_rel_X, a_rel_X, Omega)]
+    
+    @classmethod
+    def relative_motion_lvlh(cls, r_T : np.ndarray, v_T : np.ndarray, r_C : np.ndarray, v_C : np.ndarray, t : np.ndarray) -> dict:
+        """Propagates Target and Chaser on a shared time grid and expresses the Chaser motion in the Target LVLH frame
+
+        Args:
+            r_T (np.ndarray): Target position vector
+            v_T (np.ndarray): Target velocity vector
+            r_C (np.ndarray): Chaser position vector
+            v_C (np.ndarray): Chaser velocity vector
+            t (np.ndarray): Times from the initial states [T]
+
+        Returns:
+            dict: { t, r_rel [T,3], v_rel [T,3], a_rel [T,3], Omega [T,3], distance [T] }
+        """
+        
+        LagrangeCoefficients.mu = cls.mu
+        
+        # >>> 1. Both spacecraft propagated at once
+        
+        r, v = LagrangeCoefficients.propagate(np.array([r_T, r_C]), np.array([v_T, v_C]), t)
+        
+        # >>> 2. LVLH kinematics
+        
+        r_rel, v_rel, a_rel, Omega = cls.calculate_kinematics_lvlh_batch(r[:, 0], v[:, 0], r[:, 1], v[:, 1])
+        
+        return dict(t=np.asarray(t, dtype=float), r_rel=r_rel, v_rel=v_rel, a_rel=a_rel, Omega=Omega, distance=np.linalg.norm(r_rel, axis=-1))
+    
     @classmethod
     def show_kinematics_lvlh(cls, r_T : np.ndarray, v_T : np.ndarray, r_C : np.ndarray, v_C : np.ndarray, m : float = 60, n : float = 1000) -> None:
         """Plots the trajectory of the Target w.r.t. the Chaser in the LVLH frame
@@ -180,31 +253,9 @@ class RelativeMotion:
         
         dt = (t_f - t_0) / n
         
-        # >>> 5. Cycle
-        
-        times = np.linspace(t_0, t_f, n)
+        # >>> 5. LVLH quantities on the whole grid
         
-        LagrangeCoefficients.mu = cls.mu
-        
-        x = []
-        y = []
-        z = []
-        
-        for t in times:
-            
-            # >>> a. LVLH quantities
-        
-            r_rel, v_rel, a_rel, Omega = cls.calculate_kinematics_lvlh(r_T, v_T, r_C, v_C)
-            
-            x.append(r_rel[0])
-            y.append(r_rel[1])
-            z.append(r_rel[2])
-            
-            # >>> b. Update Target-Chaser vectors
-            
-            r_T, v_T = LagrangeCoefficients.calculate_position_velocity_by_time(r_T, v_T, dt)
-            
-            r_C, v_C = LagrangeCoefficients.calculate_position_velocity_by_time(r_C, v_C, dt)
+        x, y, z = cls.relative_motion_lvlh(r_T, v_T, r_C, v_C, np.arange(n) * dt)['r_rel'].T
         
         # >>> 6. Plot
         
@@ -312,35 +363,59 @@ class RelativeMotion:
             list: [PHI_rr, PHI_rv, PHI_vr, PHI_vv]
         """
         
-        PHI_rr = np.array(
-            [
-                [ 4 - 3 * np.cos(n * t)       , 0 , 0             ],
-                [ 6 * (np.sin(n * t) - n * t) , 1 , 0             ],
-                [ 0                           , 0 , np.cos(n * t) ]
-            ])
-        
-        PHI_rv = np.array(
-            [
-                [ 1 / n * np.sin(n * t)       , 2 / n * (1 - np.cos(n * t))             , 0                     ],
-                [ 2 / n * (np.cos(n * t) - 1) , 1 / n * (4 * np.sin(n * t) - 3 * n * t) , 0                     ],
-                [ 0                           , 0                                       , 1 / n * np.sin(n * t) ]
-            ])
-        
-        PHI_vr = np.array(
-            [
-                [ 3 * n * np.sin(n * t)       , 0 , 0                   ],
-                [ 6 * n * (np.cos(n * t) - 1) , 0 , 0                   ],
-                [ 0                           , 0 , - n * np.sin(n * t) ]
-            ])
-        
-        PHI_vv = np.array(
-            [
-                [ np.cos(n * t)       , 2 * np.sin(n * t)     , 0             ],
-                [ - 2 * np.sin(n * t) , 4 * np.cos(n * t) - 3 , 0             ],
-                [ 0                   , 0                     , np.cos(n * t) ]
-            ])
-        
-        return [PHI_rr, PHI_rv, PHI_vr, PHI_vv]
+        PHI = cls.clohessy_wiltshire_stm(n, t)
+        
+        return [PHI[:3, :3], PHI[:3, 3:], PHI[3:, :3], PHI[3:, 3:]]
+        
+    @classmethod
+    def clohessy_wiltshire_stm(cls, n : float, t : np.ndarray) -> np.ndarray:
+        """Clohessy-Wiltshire state transition matrices stacked over a time vector
+        
+        Args:
+            n (float): Target orbit mean motion
+            t (np.ndarray): Times [T] (or a single time)
+        
+        Returns:
+            np.ndarray: [[PHI_rr, PHI_rv], [PHI_vr, PHI_vv]] [T,6,6] (or [6,6] for a single time)
+        """
+        
+        nt = n * np.asarray(t, dtype=float)
+        
+        s = np.sin(nt)
+        c = np.cos(nt)
+        
+        PHI = np.zeros(shape=nt.shape + (6, 6))
+        
+        # >>> PHI_rr
+        
+        PHI[..., 0, 0] = 4 - 3 * c
+        PHI[..., 1, 0] = 6 * (s - nt)
+        PHI[..., 1, 1] = 1
+        PHI[..., 2, 2] = c
+        
+        # >>> PHI_rv
+        
+        PHI[..., 0, 3] = 1 / n * s
+        PHI[..., 0, 4] = 2 / n * (1 - c)
+        PHI[..., 1, 3] = 2 / n * (c - 1)
+        PHI[..., 1, 4] = 1 / n * (4 * s - 3 * nt)
+        PHI[..., 2, 5] = 1 / n * s
+        
+        # >>> PHI_vr
+        
+        PHI[..., 3, 0] = 3 * n * s
+        PHI[..., 4, 0] = 6 * n * (c - 1)
+        PHI[..., 5, 2] = - n * s
+        
+        # >>> PHI_vv
+        
+        PHI[..., 3, 3] = c
+        PHI[..., 3, 4] = 2 * s
+        PHI[..., 4, 3] = - 2 * s
+        PHI[..., 4, 4] = 4 * c - 3
+        PHI[..., 5, 5] = c
+        
+        return PHI
     
     @classmethod
     def clohessy_wiltshire_equations(cls, dr_0 : np.ndarray, dv_0 : np.ndarray, n : float, t : float) -> list:
@@ -363,6 +438,199 @@ class RelativeMotion:
         
         return [dr, dv]
     
+    @classmethod
+    def clohessy_wiltshire_propagate(cls, dX_0 : np.ndarray, n : float, t : np.ndarray) -> np.ndarray:
+        """Propagates many relative states at once with the Clohessy-Wiltshire state transition matrices
+
+        Args:
+            dX_0 (np.ndarray): Initial relative states [N,6] (or [6]) -> (dr, dv)
+            n (float): Target orbit mean motion
+            t (np.ndarray): Times [T]
+
+        Returns:
+            np.ndarray: Relative states [T,N,6] (or [T,6] for a single initial state)
+        """
+        
+        return np.einsum('tij,...j->t...i', cls.clohessy_wiltshire_stm(n, np.atleast_1d(t)), np.asarray(dX_0, dtype=float))
+    
+    # ! YAMANAKA-ANKERSEN (eccentric target)
+    
+    @classmethod
+    def true_anomaly_by_time(cls, h : float, e : float, theta_0 : float, t : np.ndarray) -> np.ndarray:
+        """True anomalies of an elliptical orbit on a time grid (vectorized Kepler equation)
+
+        Args:
+            h (float): Specific angular momentum [km^2/s]
+            e (float): Eccentricity
+            theta_0 (float): Initial true anomaly [rad]
+            t (np.ndarray): Times from the initial true anomaly [T] [s]
+
+        Returns:
+            np.ndarray: True anomalies (unwrapped, theta_0 at t = 0) [T] [rad]
+        """
+        
+        # >>> 1. Mean motion and initial mean anomaly
+        
+        a = h**2 / cls.mu / (1 - e**2)
+        
+        n = np.sqrt(cls.mu / a**3)
+        
+        E_0 = 2 * np.arctan(np.sqrt((1 - e) / (1 + e)) * np.tan(theta_0 / 2))
+        
+        M = E_0 - e * np.sin(E_0) + n * np.asarray(t, dtype=float)
+        
+        # >>> 2. Eccentric anomaly (Newton iterations on the whole grid)
+        
+        E = M + e * np.sin(M)
+        
+        for _ in range(50):
+            
+            step = (E - e * np.sin(E) - M) / (1 - e * np.cos(E))
+            
+            E = E - step
+            
+            if np.all(np.abs(step) < 1e-14): break
+        
+        # >>> 3. True anomaly (continuous form, same number of revolutions as E)
+        
+        beta = e / (1 + np.sqrt(1 - e**2))
+        
+        theta = lambda E: E + 2 * np.arctan(beta * np.sin(E) / (1 - beta * np.cos(E)))
+        
+        return theta(E) - theta(E_0) + theta_0
+    
+    @classmethod
+    def yamanaka_ankersen_stm(cls, h : float, e : float, theta_0 : float, t : np.ndarray) -> np.ndarray:
+        """Yamanaka-Ankersen state transition matrices of the linearized relative motion about an elliptical target orbit
+
+        Args:
+            h (float): Target specific angular momentum [km^2/s]
+            e (float): Target eccentricity
+            theta_0 (float): Target initial true anomaly [rad]
+            t (np.ndarray): Times [T] (or a single time) [s]
+
+        Returns:
+            np.ndarray: State transition matrices of the LVLH state (dr, dv) [T,6,6] (or [6,6] for a single time)
+        """
+        
+        t = np.asarray(t, dtype=float)
+        
+        theta = cls.true_anomaly_by_time(h, e, theta_0, np.atleast_1d(t))
+        
+        k_2 = cls.mu**2 / h**3 # * Ratio h / p^2 [ 1 / s ]
+        
+        # ? Frame of the solution: x along-track, z towards the attractor (LVLH radial x_r = -z, along-track y_a = x)
+        
+        def transformation(theta : np.ndarray) -> list:
+            
+            # >>> Matrices mapping (x_r, y_a, z_n, v_r, v_a, v_n) to (x~, z~, x~', z~', y~, y~') and back
+            
+            rho = 1 + e * np.cos(theta)
+            
+            A = np.zeros(shape=np.shape(theta) + (6, 6))
+            B = np.zeros(shape=np.shape(theta) + (6, 6))
+            
+            for row, (position, velocity, sign) in enumerate([(1, 4, 1), (0, 3, -1)]):
+                
+                A[..., row, position]       = sign * rho
+                A[..., row + 2, position]   = - sign * e * np.sin(theta)
+                A[..., row + 2, velocity]   = sign / (k_2 * rho)
+                
+                B[..., position, row]       = sign / rho
+                B[..., velocity, row]       = sign * k_2 * e * np.sin(theta)
+                B[..., velocity, row + 2]   = sign * k_2 * rho
+            
+            A[..., 4, 2], A[..., 5, 2], A[..., 5, 5] = rho, - e * np.sin(theta), 1 / (k_2 * rho)
+            B[..., 2, 4], B[..., 5, 4], B[..., 5, 5] = 1 / rho, k_2 * e * np.sin(theta), k_2 * rho
+            
+            return [A, B]
+        
+        def fundamental(theta : np.ndarray, J : np.ndarray) -> np.ndarray:
+            
+            # >>> In-plane fundamental solution in the transformed variables
+            
+            rho = 1 + e * np.cos(theta)
+            
+            s, c = rho * np.sin(theta), rho * np.cos(theta)
+            
+            ds, dc = np.cos(theta) + e * np.cos(2 * theta), - (np.sin(theta) + e * np.sin(2 * theta))
+            
+            PHI = np.zeros(shape=np.shape(theta) + (4, 4))
+            
+            PHI[..., 0, :] = np.stack([np.ones_like(theta), - c * (1 + 1 / rho), s * (1 + 1 / rho), 3 * rho**2 * J], axis=-1)
+            PHI[..., 1, :] = np.stack([np.zeros_like(theta), s, c, 2 - 3 * e * s * J], axis=-1)
+            PHI[..., 2, :] = np.stack([np.zeros_like(theta), 2 * s, 2 * c - e, 3 * (1 - 2 * e * s * J)], axis=-1)
+            PHI[..., 3, :] = np.stack([np.zeros_like(theta), ds, dc, - 3 * e * (ds * J + s / rho**2)], axis=-1)
+            
+            return PHI
+        
+        # >>> 1. Transformed variables at the initial and final true anomalies
+        
+        A_0, B_0 = transformation(theta_0)
+        A, B = transformation(theta)
+        
+        # >>> 2. Transformed state transition (in-plane through the pseudo-initial values, out-of-plane harmonic)
+        
+        PHI_tilde = np.zeros(shape=theta.shape + (6, 6))
+        
+        PHI_tilde[:, :4, :4] = fundamental(theta, k_2 * np.atleast_1d(t)) @ np.linalg.inv(fundamental(theta_0, 0.0))
+        
+        PHI_tilde[:, 4, 4], PHI_tilde[:, 4, 5] = np.cos(theta - theta_0), np.sin(theta - theta_0)
+        PHI_tilde[:, 5, 4], PHI_tilde[:, 5, 5] = - np.sin(theta - theta_0), np.cos(theta - theta_0)
+        
+        # >>> 3. State transition matrices
+        
+        PHI = B @ PHI_tilde @ A_0
+        
+        return PHI if t.ndim else PHI[0]
+    
+    @classmethod
+    def yamanaka_ankersen_propagate(cls, dX_0 : np.ndarray, h : float, e : float, theta_0 : float, t : np.ndarray) -> np.ndarray:
+        """Propagates many relative states at once with the Yamanaka-Ankersen state transition matrices
+
+        Args:
+            dX_0 (np.ndarray): Initial relative states in the LVLH frame [N,6] (or [6]) -> (dr, dv)
+            h (float): Target specific angular momentum [km^2/s]
+            e (float): Target eccentricity
+            theta_0 (float): Target initial true anomaly [rad]
+            t (np.ndarray): Times [T] [s]
+
+        Returns:
+            np.ndarray: Relative states [T,N,6] (or [T,6] for a single initial state)
+        """
+        
+        return np.einsum('tij,...j->t...i', cls.yamanaka_ankersen_stm(h, e, theta_0, np.atleast_1d(t)), np.asarray(dX_0, dtype=float))
+    
+    @classmethod
+    def propagate_linearized_relative_motion(cls, y_0 : np.ndarray, t : np.ndarray) -> np.ndarray:
+        """Analytical counterpart of simulate_linearized_relative_motion (no numerical integration)
+
+        Args:
+            y_0 (np.ndarray): Initial state [12] -> (dr, dv, r, v) with the Target state (r, v) in the geocentric frame
+            t (np.ndarray): Times [T] [s]
+
+        Returns:
+            np.ndarray: Relative states in the LVLH frame [T,6]
+        """
+        
+        r, v = y_0[6:9], y_0[9:12]
+        
+        # >>> 1. Target angular momentum and eccentricity vectors
+        
+        h = np.cross(r, v)
+        
+        e = np.cross(v, h) / cls.mu - r / np.linalg.norm(r)
+        
+        # >>> 2. Circular target: Clohessy-Wiltshire (the true anomaly is undefined)
+        
+        if np.linalg.norm(e) < 1e-10: return cls.clohessy_wiltshire_propagate(y_0[:6], np.linalg.norm(h) / np.linalg.norm(r)**2, t)
+        
+        # >>> 3. True anomaly (quadrant from the angular momentum, no arccos of a rounded cosine)
+        
+        theta = np.arctan2(np.dot(np.cross(e, r), h) / np.linalg.norm(h), np.dot(e, r))
+        
+        return cls.yamanaka_ankersen_propagate(y_0[:6], np.linalg.norm(h), np.linalg.norm(e), theta, t)
+    
     # ! SECTION 7.5
     
     @classmethod
@@ -407,17 +675,7 @@ class RelativeMotion:
         
         if show:
             
-            dx = []
-            dy = []
-            dz = []
-            
-            for t in np.linspace(0, t_f, 1000):
-                
-                dr, dv = cls.clohessy_wiltshire_equations(dr_0, dv_0_plus, np.linalg.norm(Omega), t)
-                
-                dx.append(dr[0])
-                dy.append(dr[1])
-                dz.append(dr[2])
+            dx, dy, dz = cls.clohessy_wiltshire_propagate(np.hstack((dr_0, dv_0_plus)), np.linalg.norm(Omega), np.linspace(0, t_f, 1000))[:, :3].T
             
             plt.figure(figsize=(10, 8))
             
@@ -450,6 +708,53 @@ class RelativeMotion:
             plt.show()
         
         return dv_tot
+    
+    @classmethod
+    def two_impulsive_rendezvous_batch(cls, dr_0 : np.ndarray, dv_0_minus : np.ndarray, n : float, t_f : np.ndarray) -> list:
+        """Two-Impulse Rendezvous maneuvers for batches of initial relative states and transfer times
+
+        Args:
+            dr_0 (np.ndarray): Initial relative positions in the LVLH frame [N,3] (or [3])
+            dv_0_minus (np.ndarray): Initial relative velocities in the LVLH frame [N,3] (or [3])
+            n (float): Target orbit mean motion
+            t_f (np.ndarray): Maneuver times [T]
+
+        Returns:
+            list: [dv_tot [T,N], dv_0_plus [T,N,3], dv_f_minus [T,N,3]] (N axis dropped for a single state, NaN where PHI_rv is singular)
+        """
+        
+        PHI = cls.clohessy_wiltshire_stm(n, np.atleast_1d(t_f))
+        
+        PHI_rr, PHI_rv, PHI_vr, PHI_vv = PHI[:, :3, :3], PHI[:, :3, 3:], PHI[:, 3:, :3], PHI[:, 3:, 3:]
+        
+        dr_0        = np.asarray(dr_0, dtype=float)
+        dv_0_minus  = np.asarray(dv_0_minus, dtype=float)
+        
+        # ? PHI_rv is singular when the transfer lasts a multiple of half a period or zero time (identity solved instead, results set to NaN)
+        
+        scale = np.abs(PHI_rv).max(axis=(1, 2))
+        
+        singular = (np.abs(np.linalg.det(PHI_rv)) < 1e-12 * scale**3) | (scale == 0)
+        
+        PHI_rv[singular] = np.eye(3)
+        
+        # >>> 1. Departure velocity [T,3,N]
+        
+        dv_0_plus = - np.linalg.solve(PHI_rv, np.einsum('tij,...j->ti...', PHI_rr, dr_0).reshape(len(PHI), 3, -1))
+        
+        dv_0_plus = np.moveaxis(dv_0_plus, 1, -1).reshape(dv_0_plus.shape[:1] + dr_0.shape)
+        
+        # >>> 2. Arrival velocity
+        
+        dv_f_minus = np.einsum('tij,...j->t...i', PHI_vr, dr_0) + np.einsum('tij,t...j->t...i', PHI_vv, dv_0_plus)
+        
+        # >>> 3. Total delta velocity (the final relative velocity is cancelled)
+        
+        dv_tot = np.linalg.norm(dv_0_plus - dv_0_minus, axis=-1) + np.linalg.norm(dv_f_minus, axis=-1)
+        
+        dv_tot[singular], dv_0_plus[singular], dv_f_minus[singular] = np.nan, np.nan, np.nan
+        
+        return [dv_tot, dv_0_plus, dv_f_minus]
 
 if __name__ == '__main__':
     
@@ -463,6 +768,7 @@ if __name__ == '__main__':
     
     print('EXAMPLE 7.2\n')
     RelativeMotion.show_kinematics_lvlh(r_T, v_T, r_C, v_C, m=10)
+    print(RelativeMotion.relative_motion_lvlh(r_T, v_T, r_C, v_C, np.linspace(0, 86400, 100000))['distance'].max())
     print('-' * 40)
     
     print('EXAMPLE 7.3\n')
@@ -471,6 +777,11 @@ if __name__ == '__main__':
     RelativeMotion.simulate_linearized_relative_motion(np.hstack((np.array([-1, 0, 0]), np.array([0, 2 * 2 * np.pi / parameters.T, 0]), r, v)), t_f=5 * parameters.T, show=True)
     print('-' * 40)
     
+    print('YAMANAKA-ANKERSEN\n')
+    dX = RelativeMotion.propagate_linearized_relative_motion(np.hstack((np.array([-1, 0, 0]), np.array([0, 2 * 2 * np.pi / parameters.T, 0]), r, v)), np.linspace(0, 5 * parameters.T, 5))
+    print(dX)
+    print('-' * 40)
+    
     print('EXAMPLE 7.4\n')
     r_T = np.array([1622.39, 5305.10, 3717.44])
     v_T = np.array([-7.29936, 0.492329, 2.48304])
@@ -483,4 +794,11 @@ if __name__ == '__main__':
     r_T, v_T = ThreeDimensionalOrbit.pf_2_gef(OrbitalElements(0, 0, np.deg2rad(0), np.deg2rad(0), np.deg2rad(0), np.deg2rad(0), 300 + 6378))
     r_C, v_C = RelativeMotion.calculate_kinematics_gef(r_T, v_T, np.array([0, -2, 0]), np.array([0, 0, 0]))
     print(RelativeMotion.two_impulsive_rendezvous_maneuver(r_T, v_T, r_C, v_C, 1.49 * 3600, True))
+    print('-' * 40)
+    
+    print('RENDEZVOUS TIME SCAN\n')
+    dr_0, dv_0, a_rel, Omega = RelativeMotion.calculate_kinematics_lvlh(r_T, v_T, r_C, v_C)
+    t_f = np.linspace(60, 6 * 3600, 10000)
+    dv_tot, dv_0_plus, dv_f_minus = RelativeMotion.two_impulsive_rendezvous_batch(dr_0, dv_0, np.linalg.norm(Omega), t_f)
+    print(f'Optimal time: {t_f[np.nanargmin(dv_tot)] / 3600:.4f} h   dv: {np.nanmin(dv_tot) * 1e3:.4f} m/s')
     print('-' * 40)
\ No newline at end of file
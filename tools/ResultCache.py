@@ -0,0 +1,370 @@
+""" ResultCache.py: Implements the content-addressed cache of the simulation results """
+
+__author__      = "Alessio Negri"
+__license__     = "LGPL v3"
+__maintainer__  = "Alessio Negri"
+
+import os
+import sys
+import enum
+import pickle
+import hashlib
+import inspect
+import functools
+import threading
+import dataclasses
+import numpy as np
+
+from datetime import datetime, timedelta
+from collections import OrderedDict
+
+sys.path.append(os.path.dirname(__file__))
+
+# --- CLASS 
+
+class ResultCache:
+    """Two-tier (in-memory LRU + optional on-disk) cache of pickled results, addressed by a stable hash of the inputs"""
+    
+    # --- MEMBERS 
+    
+    VERSION = 1 # * Key format version (bump to invalidate every stored result)
+    
+    # --- METHODS 
+    
+    def __init__(self, max_memory : int = 256 * 1024**2, directory : str = '', max_disk : int = 2 * 1024**3) -> None:
+        """Constructor
+
+        Args:
+            max_memory (int, optional): Size of the in-memory tier [bytes]. Defaults to 256 MB.
+            directory (str, optional): Directory of the on-disk tier. Defaults to '' (disabled).
+            max_disk (int, optional): Size of the on-disk tier [bytes]. Defaults to 2 GB.
+        """
+        
+        self.max_memory = max_memory    # * Size of the in-memory tier  [ bytes ]
+        self.directory  = directory     # * Directory of the on-disk tier
+        self.max_disk   = max_disk      # * Size of the on-disk tier    [ bytes ]
+        self.memory     = OrderedDict() # * In-memory tier { key : pickled result } (least recently used first)
+        self.size       = 0             # * Size of the in-memory tier  [ bytes ]
+        self.hits       = 0             # * Number of hits
+        self.misses     = 0             # * Number of misses
+        self.lock       = threading.Lock()
+        
+        if directory: os.makedirs(directory, exist_ok=True)
+    
+    def enable_disk(self, directory : str, max_disk : int = 2 * 1024**3) -> None:
+        """Enables the on-disk tier
+
+        Args:
+            directory (str): Cache directory
+            max_disk (int, optional): Size of the on-disk tier [bytes]. Defaults to 2 GB.
+        """
+        
+        os.makedirs(directory, exist_ok=True)
+        
+        self.directory  = directory
+        self.max_disk   = max_disk
+    
+    @classmethod
+    def key(cls, *parts) -> str:
+        """Calculates the stable hash of the given parts (arrays, dataclasses, enums, dates, containers and plain objects)
+
+        Returns:
+            str: Hexadecimal SHA-256 digest
+        """
+        
+        h = hashlib.sha256(f'v{cls.VERSION}'.encode())
+        
+        cls._update(h, parts)
+        
+        return h.hexdigest()
+    
+    @classmethod
+    def _update(cls, h, obj, depth : int = 0) -> None:
+        """Feeds the canonical representation of an object into the hash
+
+        Args:
+            h (hashlib._Hash): Hash
+            obj (object): Object
+            depth (int, optional): Recursion depth. Defaults to 0.
+        """
+        
+        if depth > 16: raise Exception('Object too deep to be hashed')
+        
+        # ? Type tag, then the content
+        
+        h.update(type(obj).__qualname__.encode() + b'|')
+        
+        if obj is None or isinstance(obj, (bool, int, str, enum.Enum)):
+            
+            h.update(repr(obj).encode())
+        
+        elif isinstance(obj, (float, np.floating)):
+            
+            h.update(float(obj).hex().encode())
+        
+        elif isinstance(obj, np.generic):
+            
+            h.update(np.asarray(obj).tobytes())
+        
+        elif isinstance(obj, bytes):
+            
+            h.update(obj)
+        
+        elif isinstance(obj, np.ndarray):
+            
+            h.update(f'{obj.dtype.str}{obj.shape}'.encode())
+            h.update(np.ascontiguousarray(obj).tobytes())
+        
+        elif isinstance(obj, (datetime, timedelta)):
+            
+            h.update(str(obj).encode())
+        
+        elif isinstance(obj, (list, tuple)):
+            
+            for item in obj: cls._update(h, item, depth + 1)
+        
+        elif isinstance(obj, dict):
+            
+            for k in sorted(obj, key=repr):
+                
+                cls._update(h, k, depth + 1)
+                cls._update(h, obj[k], depth + 1)
+        
+        elif dataclasses.is_dataclass(obj):
+            
+            cls._update(h, { f.name : getattr(obj, f.name) for f in dataclasses.fields(obj) }, depth + 1)
+        
+        elif callable(obj):
+            
+            h.update(f'{getattr(obj, "__module__", "")}.{getattr(obj, "__qualname__", repr(obj))}'.encode())
+        
+        elif hasattr(obj, '__dict__'):
+            
+            cls._update(h, { k : v for k, v in vars(obj).items() if not k.startswith('_') }, depth + 1)
+        
+        else:
+            
+            h.update(repr(obj).encode())
+    
+    def get(self, key : str) -> list:
+        """Looks up a result (in memory first, then on disk)
+
+        Args:
+            key (str): Key
+
+        Returns:
+            list: [hit, result (a new copy for every hit)]
+        """
+        
+        with self.lock:
+            
+            data = self.memory.get(key)
+            
+            if data is not None: self.memory.move_to_end(key)
+        
+        # ? On-disk tier (promoted to memory)
+        
+        if data is None and self.directory:
+            
+            path = os.path.join(self.directory, key + '.pkl')
+            
+            if os.path.exists(path):
+                
+                with open(path, 'rb') as file: data = file.read()
+                
+                os.utime(path)
+                
+                self._store_memory(key, data)
+        
+        with self.lock:
+            
+            if data is None: self.misses += 1
+            else:            self.hits += 1
+        
+        if data is None: return [False, None]
+        
+        return [True, pickle.loads(data)]
+    
+    def put(self, key : str, value : object) -> bool:
+        """Stores a result in both tiers (results that cannot be pickled are not cached)
+
+        Args:
+            key (str): Key
+            value (object): Result
+
+        Returns:
+            bool: True if stored
+        """
+        
+        try:
+            
+            data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        
+        except Exception:
+            
+            return False
+        
+        self._store_memory(key, data)
+        
+        if self.directory: self._store_disk(key, data)
+        
+        return True
+    
+    def clear(self) -> None:
+        """Empties both tiers
+        """
+        
+        with self.lock:
+            
+            self.memory.clear()
+            
+            self.size = 0
+        
+        if self.directory:
+            
+            for name in os.listdir(self.directory):
+                
+                if name.endswith('.pkl'): os.remove(os.path.join(self.directory, name))
+    
+    def _store_memory(self, key : str, data : bytes) -> None:
+        """Stores a pickled result in memory evicting the least recently used ones
+
+        Args:
+            key (str): Key
+            data (bytes): Pickled result
+        """
+        
+        if len(data) > self.max_memory: return
+        
+        with self.lock:
+            
+            if key in self.memory: self.size -= len(self.memory.pop(key))
+            
+            self.memory[key] = data
+            
+            self.size += len(data)
+            
+            while self.size > self.max_memory: self.size -= len(self.memory.popitem(last=False)[1])
+    
+    def _store_disk(self, key : str, data : bytes) -> None:
+        """Stores a pickled result on disk evicting the least recently used files
+
+        Args:
+            key (str): Key
+            data (bytes): Pickled result
+        """
+        
+        if len(data) > self.max_disk: return
+        
+        path = os.path.join(self.directory, key + '.pkl')
+        
+        # ? Atomic write (the file appears only when complete)
+        
+        with open(path + '.tmp', 'wb') as file: file.write(data)
+        
+        os.replace(path + '.tmp', path)
+        
+        # ? Size-based eviction by last access time
+        
+        files = [os.path.join(self.directory, name) for name in os.listdir(self.directory) if name.endswith('.pkl')]
+        
+        files = sorted(files, key=os.path.getmtime)
+        
+        size = sum(os.path.getsize(file) for file in files)
+        
+        while size > self.max_disk and files:
+            
+            file = files.pop(0)
+            
+            size -= os.path.getsize(file)
+            
+            os.remove(file)
+    
+    @classmethod
+    def cached(cls, members : list = None, settings : dict = None, depends : list = None, bypass : str = 'show', cache : 'ResultCache' = None):
+        """Decorator caching the result of a simulation classmethod (to be placed below @classmethod)
+
+        Args:
+            members (list, optional): Class members entering the key. Defaults to None (every public class member: body constants, vehicle data, ...).
+            settings (dict, optional): Integrator settings entering the key. Defaults to None.
+            depends (list, optional): Other classes whose public members enter the key. Defaults to None.
+            bypass (str, optional): Boolean argument disabling the cache when True (e.g. plotting). Defaults to 'show'.
+            cache (ResultCache, optional): Cache instance. Defaults to None (ResultCache.default).
+
+        Returns:
+            Callable: Decorator
+        """
+        
+        def decorator(fun):
+            
+            signature = inspect.signature(fun)
+            
+            @functools.wraps(fun)
+            def wrapper(owner, *args, **kwargs):
+                
+                arguments = signature.bind(owner, *args, **kwargs)
+                
+                arguments.apply_defaults()
+                
+                if bypass and arguments.arguments.get(bypass, False): return fun(owner, *args, **kwargs)
+                
+                # >>> 1. Key (calculated before the call, the inputs may be modified in place)
+                
+                state = { name : getattr(owner, name) for name in (members if members is not None else cls.class_members(owner)) }
+                
+                for other in depends or []: state[other.__qualname__] = { name : getattr(other, name) for name in cls.class_members(other) }
+                
+                key = cls.key(fun.__module__, fun.__qualname__, settings, state, list(arguments.arguments.items())[1:])
+                
+                # >>> 2. Lookup
+                
+                store = cache if cache is not None else cls.default
+                
+                hit, result = store.get(key)
+                
+                if hit: return result
+                
+                # >>> 3. Evaluation
+                
+                result = fun(owner, *args, **kwargs)
+                
+                store.put(key, result)
+                
+                return result
+            
+            return wrapper
+        
+        return decorator
+    
+    @classmethod
+    def class_members(cls, owner : type) -> list:
+        """Public data members of a class (constants and parameters, methods excluded)
+
+        Args:
+            owner (type): Class
+
+        Returns:
+            list: Member names
+        """
+        
+        names = set()
+        
+        for base in inspect.getmro(owner):
+            
+            for name, value in vars(base).items():
+                
+                if not name.startswith('_') and not callable(value) and not isinstance(value, (classmethod, staticmethod, property)): names.add(name)
+        
+        return sorted(names)
+
+ResultCache.default = ResultCache() # * Cache shared by the simulations
+
+if __name__ == '__main__':
+    
+    print('RESULT CACHE\n')
+    cache = ResultCache(max_memory=1024)
+    key = ResultCache.key(np.arange(3.0), dict(a=1, b=[2, 3]), datetime(2024, 1, 1))
+    print(key, key == ResultCache.key(np.arange(3.0), dict(b=[2, 3], a=1), datetime(2024, 1, 1)))
+    cache.put(key, np.arange(3.0))
+    print(cache.get(key), cache.get('missing'), cache.hits, cache.misses)
+    print('-' * 40, '\n')
@@ -9,6 +9,8 @@ __chapter__     = "9 - Rigid Body Dynamics"
 
 import os
 import sys
+import math
+import time
 import numpy as np
 import matplotlib.pyplot as plt
 
@@ -17,11 +19,24 @@ from scipy.integrate import solve_ivp
 sys.path.append(os.path.dirname(__file__))
 
 from Common import wrap_to_2pi
-from AstronomicalData import CelestialBody
+from AstronomicalData import AstronomicalData, CelestialBody
 
 class RigidBodyDynamics:
     """Contains the kinematics and dynamics models for rigid body dynamics"""
     
+    # --- ASTRONOMICAL CONSTANTS 
+    
+    mu = AstronomicalData.gravitational_parameter(CelestialBody.EARTH)
+    
+    # --- MEMBERS 
+    
+    J = np.array([[12e-4, 0, 0], [0, 12e-4, 0], [0, 0, 4.5e-4]]) # * Default inertia tensor [ kg * m^2 ]
+    
+    # --- INTERNAL MEMBERS 
+    
+    _cyclic_1 = np.array([1, 2, 0]) # * First cyclic permutation of the vector components (cross product)
+    _cyclic_2 = np.array([2, 0, 1]) # * Second cyclic permutation of the vector components (cross product)
+    
     # --- METHODS 
     
     @classmethod
@@ -32,7 +47,7 @@ class RigidBodyDynamics:
             celestialBody (CelestialBody): Celestial body
         """
         
-        pass
+        cls.mu = AstronomicalData.gravitational_parameter(celestialBody)
     
     # ! SECTION 9.6
     
@@ -58,7 +73,7 @@ class RigidBodyDynamics:
         
         # >>> Dynamics
         
-        dX_dt[0] = (J[2,2] - J[1,1]) / J[0,0] * omega_y * omega_z + u[0] / J[0,0]
+        dX_dt[0] = (J[1,1] - J[2,2]) / J[0,0] * omega_y * omega_z + u[0] / J[0,0]
         dX_dt[1] = (J[2,2] - J[0,0]) / J[1,1] * omega_z * omega_x + u[1] / J[1,1]
         dX_dt[2] = (J[0,0] - J[1,1]) / J[2,2] * omega_x * omega_y + u[2] / J[2,2]
         
@@ -92,7 +107,7 @@ class RigidBodyDynamics:
         
         # >>> Dynamics
         
-        dX_dt[0] = (J[2,2] - J[1,1]) / J[0,0] * omega_y * omega_z + u[0] / J[0,0]
+        dX_dt[0] = (J[1,1] - J[2,2]) / J[0,0] * omega_y * omega_z + u[0] / J[0,0]
         dX_dt[1] = (J[2,2] - J[0,0]) / J[1,1] * omega_z * omega_x + u[1] / J[1,1]
         dX_dt[2] = (J[0,0] - J[1,1]) / J[2,2] * omega_x * omega_y + u[2] / J[2,2]
         
@@ -110,7 +125,7 @@ class RigidBodyDynamics:
 
         Args:
             t (float): Time
-            X (np.ndarray): State [6,1]
+            X (np.ndarray): State [7,1] -> (omega, q)
             J (np.ndarray): Inertia Tensor (principal)
             u (np.ndarray): Control torque
 
@@ -118,7 +133,9 @@ class RigidBodyDynamics:
             np.ndarray: Derivative of state
         """
         
-        omega_x, omega_y, omega_z, q = X
+        omega_x, omega_y, omega_z = X[:3]
+        
+        q = X[3:]
         
         Omega = np.array([[0, omega_z, -omega_y, omega_x],
                           [-omega_z, 0, omega_x, omega_y],
@@ -129,7 +146,7 @@ class RigidBodyDynamics:
         
         # >>> Dynamics
         
-        dX_dt[0] = (J[2,2] - J[1,1]) / J[0,0] * omega_y * omega_z + u[0] / J[0,0]
+        dX_dt[0] = (J[1,1] - J[2,2]) / J[0,0] * omega_y * omega_z + u[0] / J[0,0]
         dX_dt[1] = (J[2,2] - J[0,0]) / J[1,1] * omega_z * omega_x + u[1] / J[1,1]
         dX_dt[2] = (J[0,0] - J[1,1]) / J[2,2] * omega_x * omega_y + u[2] / J[2,2]
         
@@ -143,13 +160,14 @@ class RigidBodyDynamics:
         return dX_dt
     
     @classmethod
-    def simulate_attitude_dynamics(cls, y_0 : np.ndarray, t_0 : float = 0.0, t_f : float = 0.0, show : bool = False) -> dict:
+    def simulate_attitude_dynamics(cls, y_0 : np.ndarray, t_0 : float = 0.0, t_f : float = 0.0, J : np.ndarray = None, show : bool = False) -> dict:
         """Integrates the Ordinary Differential Equations for the attitude dynamics
 
         Args:
             y_0 (np.ndarray): Initial state [6,1]
             t_0 (float, optional): Initial time. Defaults to 0.0.
             t_f (float, optional): Final time. Defaults to 0.0.
+            J (np.ndarray, optional): Inertia Tensor (principal). Defaults to None (RigidBodyDynamics.J).
             show (bool, optional): True for plotting the kinematics. Defaults to False.
             
         Returns:
@@ -160,7 +178,7 @@ class RigidBodyDynamics:
         
         if t_f < t_0: raise Exception('Invalid integration time')
         
-        J = np.array([[12e-4, 0, 0], [0, 12e-4, 0], [0, 0, 4.5e-4]])
+        J = cls.J if J is None else np.asarray(J, dtype=float)
         
         u = np.array([0, 0, 0])
         
@@ -198,6 +216,457 @@ class RigidBodyDynamics:
         
         return dict(t=integrationResult['t'], y=integrationResult['y'], dt=np.abs(integrationResult['t'][-1] - integrationResult['t'][0]))
     
+    @classmethod
+    def quaternion_omega_product(cls, omega : np.ndarray, q : np.ndarray) -> np.ndarray:
+        """Product of the kinematics matrix Omega (dq/dt = 1/2 Omega q) with the quaternions (stacked on the last axis)
+
+        Args:
+            omega (np.ndarray): Angular velocities [...,3]
+            q (np.ndarray): Quaternions [...,4]
+
+        Returns:
+            np.ndarray: Omega q [...,4]
+        """
+        
+        # ? Vector part q_4 omega + q_v x omega, scalar part - omega . q_v
+        
+        q_v, q_4 = q[..., :3], q[..., 3:]
+        
+        return np.concatenate((q_4 * omega + cls.cross(q_v, omega), - np.sum(omega * q_v, axis=-1, keepdims=True)), axis=-1)
+    
+    @classmethod
+    def cross(cls, a : np.ndarray, b : np.ndarray) -> np.ndarray:
+        """Cross product on the last axis (cheaper than np.cross for small arrays)
+
+        Args:
+            a (np.ndarray): Vectors [...,3]
+            b (np.ndarray): Vectors [...,3]
+
+        Returns:
+            np.ndarray: a x b [...,3]
+        """
+        
+        return a[..., cls._cyclic_1] * b[..., cls._cyclic_2] - a[..., cls._cyclic_2] * b[..., cls._cyclic_1]
+    
+    @classmethod
+    def quaternion_exponential(cls, phi : np.ndarray, q : np.ndarray) -> np.ndarray:
+        """Rotates the quaternions by the exact flow of a constant angular velocity (exp(1/2 Omega(phi)) q, unit norm preserved)
+
+        Args:
+            phi (np.ndarray): Rotation vectors (angular velocity times time) [...,3]
+            q (np.ndarray): Quaternions [...,4]
+
+        Returns:
+            np.ndarray: Rotated quaternions [...,4]
+        """
+        
+        # ? Omega(phi)^2 = - |phi|^2 I, so exp(1/2 Omega) = cos(|phi| / 2) I + sin(|phi| / 2) / |phi| Omega
+        
+        a = 0.5 * np.linalg.norm(phi, axis=-1, keepdims=True)
+        
+        return np.cos(a) * q + 0.5 * np.sinc(a / np.pi) * cls.quaternion_omega_product(phi, q)
+    
+    @classmethod
+    def lie_group_step(cls, t : float, omega : np.ndarray, q : np.ndarray, h : float, domega_dt : callable) -> list:
+        """Advances the attitude by one step of the commutator-free Lie group method of order 4 (Celledoni, Marthinsen and Owren, 2003)\n
+
+        The angular acceleration must not depend on the attitude (the attitude-dependent case is orbit_attitude_substeps)
+
+        Args:
+            t (float): Time
+            omega (np.ndarray): Angular velocities [...,3]
+            q (np.ndarray): Quaternions [...,4]
+            h (float): Time step
+            domega_dt (callable): Angular acceleration (t, omega, q) -> [...,3]
+
+        Returns:
+            list: [omega, q] at t + h
+        """
+        
+        # ? The angular velocity stages are the ones of Runge-Kutta 4, the quaternions are only moved by exact rotations
+        
+        W_1 = omega
+        K_1 = domega_dt(t, W_1, q)
+        
+        W_2 = omega + h / 2 * K_1
+        K_2 = domega_dt(t + h / 2, W_2, q)
+        
+        W_3 = omega + h / 2 * K_2
+        K_3 = domega_dt(t + h / 2, W_3, q)
+        
+        W_4 = omega + h * K_3
+        K_4 = domega_dt(t + h, W_4, q)
+        
+        q = cls.quaternion_exponential(h / 12 * (3 * W_1 + 2 * W_2 + 2 * W_3 - W_4), q)
+        q = cls.quaternion_exponential(h / 12 * (- W_1 + 2 * W_2 + 2 * W_3 + 3 * W_4), q)
+        
+        omega = omega + h / 6 * (K_1 + 2 * K_2 + 2 * K_3 + K_4)
+        
+        return [omega, q]
+    
+    @classmethod
+    def simulate_attitude_quaternions(cls, y_0 : np.ndarray, t_0 : float = 0.0, t_f : float = 0.0, dt : float = 0.1, J : np.ndarray = None, u : np.ndarray = None, show : bool = False) -> dict:
+        """Integrates the attitude dynamics with quaternions using a fixed step commutator-free Lie group method of order 4 (Crouch-Grossman type)\n
+
+        The angular velocity follows the classic Runge-Kutta 4 scheme, the quaternions are only updated by exact rotations (no normalization, no singularity)
+
+        Args:
+            y_0 (np.ndarray): Initial state [7] (or an ensemble [N,7]) -> (omega, q)
+            t_0 (float, optional): Initial time. Defaults to 0.0.
+            t_f (float, optional): Final time. Defaults to 0.0.
+            dt (float, optional): Time step. Defaults to 0.1.
+            J (np.ndarray, optional): Inertia Tensor. Defaults to None (RigidBodyDynamics.J).
+            u (np.ndarray, optional): Control torque. Defaults to None (torque-free).
+            show (bool, optional): True for plotting the Euler angles. Defaults to False.
+
+        Returns:
+            dict: { t: time [n_points], y: state [n_points,(N,)7], euler: Euler angles [n_points,(N,)3], yaw_pitch_roll: Yaw-Pitch-Roll angles [n_points,(N,)3], dt: t_f - t_0 }
+        """
+        
+        if t_f < t_0: raise Exception('Invalid integration time')
+        
+        J = cls.J if J is None else np.asarray(J, dtype=float)
+        u = np.zeros(shape=(3)) if u is None else np.asarray(u, dtype=float)
+        
+        J_inv = np.linalg.inv(J)
+        
+        # ? Euler's equations for a general inertia tensor
+        
+        domega_dt = lambda t, omega, q: (u - cls.cross(omega, omega @ J.T)) @ J_inv.T
+        
+        # >>> 1. Fixed time grid (constant cost per step)
+        
+        n = max(1, int(np.ceil((t_f - t_0) / dt - 1e-9)))
+        
+        t = np.linspace(t_0, t_f, n + 1)
+        
+        h = (t_f - t_0) / n
+        
+        y = np.empty(shape=(n + 1,) + np.shape(y_0))
+        
+        y[0] = y_0
+        
+        omega, q = np.array(y_0[..., :3], dtype=float), np.array(y_0[..., 3:], dtype=float)
+        
+        # >>> 2. Commutator-free Lie group integrator
+        
+        for k in range(n):
+            
+            omega, q = cls.lie_group_step(t[k], omega, q, h, domega_dt)
+            
+            y[k + 1, ..., :3], y[k + 1, ..., 3:] = omega, q
+        
+        # >>> 3. Angles from the attitude history
+        
+        Q = cls.dcm_from_quaternions(y[..., 3:])
+        
+        euler           = cls.euler_angles_from_dcm(Q)
+        yaw_pitch_roll  = cls.yaw_pitch_roll_angles_from_dcm(Q)
+        
+        # >>> 4. Plot
+        
+        if show:
+            
+            plt.figure(figsize=(10, 8))
+            
+            plt.plot(t, np.rad2deg(euler[..., 0]), label='$\phi$')
+            plt.plot(t, np.rad2deg(euler[..., 1]), label='$\\theta$')
+            plt.plot(t, np.rad2deg(euler[..., 2]), label='$\psi$')
+            
+            plt.title('Attitude Dynamics (Quaternions)')
+            plt.xlabel('$t$ [s]')
+            plt.ylabel('Euler Angle [deg]')
+            
+            plt.grid()
+            plt.legend()
+            plt.show()
+        
+        return dict(t=t, y=y, euler=euler, yaw_pitch_roll=yaw_pitch_roll, dt=np.abs(t_f - t_0))
+    
+    # ! COUPLED ORBIT-ATTITUDE MOTION (gravity gradient)
+    
+    @classmethod
+    def body_frame_vectors(cls, q : np.ndarray, r : np.ndarray) -> np.ndarray:
+        """Projects inertial vectors on the body frame (same as the Direction Cosine Matrix of Algorithm 9.1, without building it)
+
+        Args:
+            q (np.ndarray): Quaternions [...,4]
+            r (np.ndarray): Inertial vectors [...,3]
+
+        Returns:
+            np.ndarray: Body frame vectors [...,3]
+        """
+        
+        q_v, q_4 = q[..., :3], q[..., 3:]
+        
+        return (q_4**2 - np.sum(q_v**2, axis=-1, keepdims=True)) * r + 2 * np.sum(q_v * r, axis=-1, keepdims=True) * q_v - 2 * q_4 * cls.cross(q_v, r)
+    
+    @classmethod
+    def gravity_gradient_torque(cls, r_b : np.ndarray, J : np.ndarray) -> np.ndarray:
+        """Gravity gradient torque M = 3 mu / r^5 r_b x (J r_b)
+
+        Args:
+            r_b (np.ndarray): Position vectors in the body frame [...,3] [km]
+            J (np.ndarray): Inertia Tensor [kg * m^2]
+
+        Returns:
+            np.ndarray: Torque [...,3] [N * m]
+        """
+        
+        r = np.linalg.norm(r_b, axis=-1, keepdims=True)
+        
+        return 3 * cls.mu / r**5 * cls.cross(r_b, r_b @ J.T)
+    
+    @classmethod
+    def orbit_attitude_eom(cls, t : float, X : np.ndarray, J : np.ndarray, u : np.ndarray) -> np.ndarray:
+        """Coupled equations of the orbital (two-body) and attitude (Euler's equations with quaternions) motion with gravity gradient torque
+
+        Args:
+            t (float): Time
+            X (np.ndarray): State [13] -> (r, v, omega, q)
+            J (np.ndarray): Inertia Tensor
+            u (np.ndarray): Control torque
+
+        Returns:
+            np.ndarray: Derivative of state
+        """
+        
+        r, v, omega, q = X[:3], X[3:6], X[6:9], X[9:]
+        
+        M = u + cls.gravity_gradient_torque(cls.body_frame_vectors(q, r), J)
+        
+        dX_dt = np.zeros(shape=(13))
+        
+        # >>> Orbit
+        
+        dX_dt[:3]   = v
+        dX_dt[3:6]  = - cls.mu / np.linalg.norm(r)**3 * r
+        
+        # >>> Attitude
+        
+        dX_dt[6:9]  = np.linalg.solve(J, M - cls.cross(omega, J @ omega))
+        dX_dt[9:]   = 0.5 * cls.quaternion_omega_product(omega, q)
+        
+        return dX_dt
+    
+    @classmethod
+    def orbit_attitude_substeps(cls, omega : tuple, q : tuple, h : float, m : int, r_s : list, c_s : list, J : np.ndarray, J_inv : np.ndarray, u : np.ndarray) -> list:
+        """Advances the attitude by m steps of the Lie group method of lie_group_step with gravity gradient torque, written on the vector components\n
+
+        This is the only stepper for an attitude-dependent angular acceleration: the stage quaternions are moved by exact rotations
+        (stages of Celledoni, Marthinsen and Owren, 2003) and the torque is evaluated on them. Every component is a float for a single body
+        (the loop runs on Python floats without the numpy call overhead) or an array [N] for an ensemble
+
+        Args:
+            omega (tuple): Angular velocity components (w_1, w_2, w_3)
+            q (tuple): Quaternion components (q_1, q_2, q_3, q_4)
+            h (float): Time step
+            m (int): Number of steps
+            r_s (list): Inertial positions at every half step [2m+1][3] [km]
+            c_s (list): Gravity gradient factors 3 mu / r^5 at every half step [2m+1]
+            J (np.ndarray): Inertia Tensor
+            J_inv (np.ndarray): Inverse of the Inertia Tensor
+            u (np.ndarray): Control torque
+
+        Returns:
+            list: [omega, q] components after m steps
+        """
+        
+        (J_11, J_12, J_13), (J_21, J_22, J_23), (J_31, J_32, J_33) = J.tolist()
+        (I_11, I_12, I_13), (I_21, I_22, I_23), (I_31, I_32, I_33) = J_inv.tolist()
+        
+        u_1, u_2, u_3 = u.tolist()
+        
+        if isinstance(omega[0], float):     cos, sqrt, sinc = math.cos, math.sqrt, lambda a: math.sin(a) / a if a else 1.0
+        else:                               cos, sqrt, sinc = np.cos, np.sqrt, lambda a: np.sinc(a / np.pi)
+        
+        def domega_dt(i : int, w_1, w_2, w_3, q_1, q_2, q_3, q_4) -> tuple:
+            
+            # >>> Position in the body frame (body_frame_vectors)
+            
+            x, y, z = r_s[i]
+            
+            a = q_4 * q_4 - q_1 * q_1 - q_2 * q_2 - q_3 * q_3
+            b = 2 * (q_1 * x + q_2 * y + q_3 * z)
+            
+            x, y, z = (a * x + b * q_1 - 2 * q_4 * (q_2 * z - q_3 * y),
+                       a * y + b * q_2 - 2 * q_4 * (q_3 * x - q_1 * z),
+                       a * z + b * q_3 - 2 * q_4 * (q_1 * y - q_2 * x))
+            
+            # >>> Gravity gradient and gyroscopic torques
+            
+            Jx, Jy, Jz = J_11 * x + J_12 * y + J_13 * z, J_21 * x + J_22 * y + J_23 * z, J_31 * x + J_32 * y + J_33 * z
+            Jw_1, Jw_2, Jw_3 = J_11 * w_1 + J_12 * w_2 + J_13 * w_3, J_21 * w_1 + J_22 * w_2 + J_23 * w_3, J_31 * w_1 + J_32 * w_2 + J_33 * w_3
+            
+            c = c_s[i]
+            
+            M_1 = u_1 + c * (y * Jz - z * Jy) - (w_2 * Jw_3 - w_3 * Jw_2)
+            M_2 = u_2 + c * (z * Jx - x * Jz) - (w_3 * Jw_1 - w_1 * Jw_3)
+            M_3 = u_3 + c * (x * Jy - y * Jx) - (w_1 * Jw_2 - w_2 * Jw_1)
+            
+            return (I_11 * M_1 + I_12 * M_2 + I_13 * M_3, I_21 * M_1 + I_22 * M_2 + I_23 * M_3, I_31 * M_1 + I_32 * M_2 + I_33 * M_3)
+        
+        def exponential(p_1, p_2, p_3, q_1, q_2, q_3, q_4) -> tuple:
+            
+            # ? Same as quaternion_exponential
+            
+            a = 0.5 * sqrt(p_1 * p_1 + p_2 * p_2 + p_3 * p_3)
+            
+            C, S = cos(a), 0.5 * sinc(a)
+            
+            return (C * q_1 + S * (q_4 * p_1 + q_2 * p_3 - q_3 * p_2),
+                    C * q_2 + S * (q_4 * p_2 + q_3 * p_1 - q_1 * p_3),
+                    C * q_3 + S * (q_4 * p_3 + q_1 * p_2 - q_2 * p_1),
+                    C * q_4 - S * (p_1 * q_1 + p_2 * q_2 + p_3 * q_3))
+        
+        w_1, w_2, w_3 = omega
+        
+        for j in range(m):
+            
+            # >>> Stages (as in lie_group_step)
+            
+            A_1, A_2, A_3 = w_1, w_2, w_3
+            K_1 = domega_dt(2 * j, A_1, A_2, A_3, *q)
+            
+            Q_2 = exponential(h / 2 * A_1, h / 2 * A_2, h / 2 * A_3, *q)
+            B_1, B_2, B_3 = w_1 + h / 2 * K_1[0], w_2 + h / 2 * K_1[1], w_3 + h / 2 * K_1[2]
+            K_2 = domega_dt(2 * j + 1, B_1, B_2, B_3, *Q_2)
+            
+            Q_3 = exponential(h / 2 * B_1, h / 2 * B_2, h / 2 * B_3, *q)
+            C_1, C_2, C_3 = w_1 + h / 2 * K_2[0], w_2 + h / 2 * K_2[1], w_3 + h / 2 * K_2[2]
+            K_3 = domega_dt(2 * j + 1, C_1, C_2, C_3, *Q_3)
+            
+            Q_4 = exponential(h * C_1 - h / 2 * A_1, h * C_2 - h / 2 * A_2, h * C_3 - h / 2 * A_3, *Q_2)
+            D_1, D_2, D_3 = w_1 + h * K_3[0], w_2 + h * K_3[1], w_3 + h * K_3[2]
+            K_4 = domega_dt(2 * j + 2, D_1, D_2, D_3, *Q_4)
+            
+            # >>> Update
+            
+            q = exponential(h / 12 * (3 * A_1 + 2 * B_1 + 2 * C_1 - D_1), h / 12 * (3 * A_2 + 2 * B_2 + 2 * C_2 - D_2), h / 12 * (3 * A_3 + 2 * B_3 + 2 * C_3 - D_3), *q)
+            q = exponential(h / 12 * (- A_1 + 2 * B_1 + 2 * C_1 + 3 * D_1), h / 12 * (- A_2 + 2 * B_2 + 2 * C_2 + 3 * D_2), h / 12 * (- A_3 + 2 * B_3 + 2 * C_3 + 3 * D_3), *q)
+            
+            w_1 = w_1 + h / 6 * (K_1[0] + 2 * K_2[0] + 2 * K_3[0] + K_4[0])
+            w_2 = w_2 + h / 6 * (K_1[1] + 2 * K_2[1] + 2 * K_3[1] + K_4[1])
+            w_3 = w_3 + h / 6 * (K_1[2] + 2 * K_2[2] + 2 * K_3[2] + K_4[2])
+        
+        return [(w_1, w_2, w_3), q]
+    
+    @classmethod
+    def simulate_orbit_attitude(cls, y_0 : np.ndarray, t_0 : float = 0.0, t_f : float = 0.0, dt : float = 10.0, dt_attitude : float = 0.1, J : np.ndarray = None, u : np.ndarray = None, show : bool = False) -> dict:
+        """Integrates the coupled orbit-attitude (6-DOF) motion with gravity gradient torque using multi-rate fixed steps
+
+
+        The orbit follows Runge-Kutta 4 with the (slow) orbit step, the attitude is advanced by the Lie group method with the (fast) attitude steps
+        nested in every orbit step, reading the position from the cubic Hermite interpolant of the orbit step (order 4 consistent)
+
+        Args:
+            y_0 (np.ndarray): Initial state [13] (or an ensemble [N,13]) -> (r, v, omega, q)
+            t_0 (float, optional): Initial time. Defaults to 0.0.
+            t_f (float, optional): Final time. Defaults to 0.0.
+            dt (float, optional): Orbit time step. Defaults to 10.0.
+            dt_attitude (float, optional): Attitude time step. Defaults to 0.1.
+            J (np.ndarray, optional): Inertia Tensor. Defaults to None (RigidBodyDynamics.J).
+            u (np.ndarray, optional): Control torque. Defaults to None (gravity gradient only).
+            show (bool, optional): True for plotting the Euler angles. Defaults to False.
+
+        Returns:
+            dict: { t: time [n_points], y: state [n_points,(N,)13], euler: Euler angles [n_points,(N,)3], dt: t_f - t_0 }
+        """
+        
+        if t_f < t_0: raise Exception('Invalid integration time')
+        
+        J = cls.J if J is None else np.asarray(J, dtype=float)
+        u = np.zeros(shape=(3)) if u is None else np.asarray(u, dtype=float)
+        
+        J_inv = np.linalg.inv(J)
+        
+        a_dt = lambda r: - cls.mu / np.linalg.norm(r, axis=-1, keepdims=True)**3 * r
+        
+        # >>> 1. Fixed time grids (orbit steps, attitude sub-steps)
+        
+        n = max(1, int(np.ceil((t_f - t_0) / dt - 1e-9)))
+        
+        t = np.linspace(t_0, t_f, n + 1)
+        
+        H = (t_f - t_0) / n
+        
+        m = max(1, int(np.ceil(H / dt_attitude - 1e-9)))
+        
+        h = H / m
+        
+        y = np.empty(shape=(n + 1,) + np.shape(y_0))
+        
+        y[0] = y_0
+        
+        y_0 = np.array(y_0, dtype=float)
+        
+        r, v = y_0[..., :3], y_0[..., 3:6]
+        
+        # ? The attitude is carried by components (floats for a single body, arrays [N] for an ensemble)
+        
+        single = y_0.ndim == 1
+        
+        omega, q = y_0[..., 6:9].T, y_0[..., 9:].T
+        
+        if single: omega, q = omega.tolist(), q.tolist()
+        
+        for k in range(n):
+            
+            # >>> 2. Orbit step (Runge-Kutta 4)
+            
+            k_r1, k_v1 = v, a_dt(r)
+            k_r2, k_v2 = v + H / 2 * k_v1, a_dt(r + H / 2 * k_r1)
+            k_r3, k_v3 = v + H / 2 * k_v2, a_dt(r + H / 2 * k_r2)
+            k_r4, k_v4 = v + H * k_v3, a_dt(r + H * k_r3)
+            
+            r_1 = r + H / 6 * (k_r1 + 2 * k_r2 + 2 * k_r3 + k_r4)
+            v_1 = v + H / 6 * (k_v1 + 2 * k_v2 + 2 * k_v3 + k_v4)
+            
+            # >>> 3. Attitude sub-steps (position from the cubic Hermite interpolant of the orbit step)
+            
+            # ? The positions and the factors 3 mu / r^5 of all the stages (every half sub-step) are evaluated at once
+                
+            s = (np.arange(2 * m + 1) / (2 * m)).reshape((-1,) + (1,) * np.ndim(r))
+                
+            r_s = (2 * s**3 - 3 * s**2 + 1) * r + (s**3 - 2 * s**2 + s) * H * v + (- 2 * s**3 + 3 * s**2) * r_1 + (s**3 - s**2) * H * v_1
+            c_s = 3 * cls.mu / np.sum(r_s**2, axis=-1)**2.5
+                
+            if single:  r_s, c_s = r_s.tolist(), c_s.tolist()
+            else:       r_s = list(np.moveaxis(r_s, -1, 1))
+                
+            # ? A diverging single body attitude reaches math.cos(inf)
+            
+            try:                omega, q = cls.orbit_attitude_substeps(omega, q, h, m, r_s, c_s, J, J_inv, u)
+            except ValueError:  raise Exception('The attitude integration diverged (reduce dt_attitude)')
+            
+            r, v = r_1, v_1
+            
+            y[k + 1, ..., :3], y[k + 1, ..., 3:6], y[k + 1, ..., 6:9], y[k + 1, ..., 9:] = r, v, np.stack(omega, axis=-1), np.stack(q, axis=-1)
+        
+        # >>> 4. Angles from the attitude history
+        
+        euler = cls.euler_angles_from_dcm(cls.dcm_from_quaternions(y[..., 9:]))
+        
+        # >>> 5. Plot
+        
+        if show:
+            
+            plt.figure(figsize=(10, 8))
+            
+            plt.plot(t, np.rad2deg(euler[..., 0]), label='$\phi$')
+            plt.plot(t, np.rad2deg(euler[..., 1]), label='$\\theta$')
+            plt.plot(t, np.rad2deg(euler[..., 2]), label='$\psi$')
+            
+            plt.title('Coupled Orbit-Attitude Dynamics (Gravity Gradient)')
+            plt.xlabel('$t$ [s]')
+            plt.ylabel('Euler Angle [deg]')
+            
+            plt.grid()
+            plt.legend()
+            plt.show()
+        
+        return dict(t=t, y=y, euler=euler, dt=np.abs(t_f - t_0))
+    
     # ! SECTION 9.9
     
     # ! ALGORITHM 4.3
@@ -206,35 +675,35 @@ class RigidBodyDynamics:
         """Direction Cosine Matrix --> Euler Angles
 
         Args:
-            Q (np.ndarray): Direction Cosine Matrix
+            Q (np.ndarray): Direction Cosine Matrix [3,3] (or stacked [...,3,3])
 
         Returns:
-            np.ndarray: Euler Angles
+            np.ndarray: Euler Angles [3] (or [...,3])
         """
         
         # >>> 1. Precession angle
         
-        phi = np.arctan2(Q[2,0], -Q[2,1])
+        phi = np.arctan2(Q[...,2,0], -Q[...,2,1])
         
-        if phi < 0: phi += 2 * np.pi
+        phi = np.where(phi < 0, phi + 2 * np.pi, phi)
         
         # >>> 2. Nutation angle
         
-        theta = np.arccos(Q[2,2])
+        theta = np.arccos(np.clip(Q[...,2,2], -1, 1))
         
         # >>> 3. Spin angle
         
-        psi = np.arctan2(Q[0,2], Q[1,2])
+        psi = np.arctan2(Q[...,0,2], Q[...,1,2])
         
-        if psi < 0: psi += 2 * np.pi
+        psi = np.where(psi < 0, psi + 2 * np.pi, psi)
         
         # >>> 4. Euler angles
         
-        return np.array([phi, theta, psi])
+        return np.stack([phi, theta, psi], axis=-1)
     
     @classmethod
     def dcm_from_euler_angles(cls, phi : float, theta : float, psi : float) -> np.ndarray:
-        """Euler Angles --> Direction Cosine Matrix
+        """Euler Angles --> Direction Cosine Matrix (arrays of angles are broadcast, e.g. *angles.T for [N,3] angles)
 
         Args:
             phi (float): Precession angle
@@ -242,7 +711,7 @@ class RigidBodyDynamics:
             psi (float): Spin angle
 
         Returns:
-            np.ndarray: Direction Cosine Matrix
+            np.ndarray: Direction Cosine Matrix [3,3] (or [...,3,3])
         """
         
         Q_11 = -np.sin(phi) * np.cos(theta) * np.sin(psi) + np.cos(phi) * np.cos(psi)
@@ -257,7 +726,7 @@ class RigidBodyDynamics:
         Q_32 = -np.cos(phi) * np.sin(theta)
         Q_33 = +np.cos(theta)
         
-        Q = np.array([[Q_11, Q_12, Q_13], [Q_21, Q_22, Q_23], [Q_31, Q_32, Q_33]])
+        Q = np.stack([np.stack([Q_11, Q_12, Q_13], axis=-1), np.stack([Q_21, Q_22, Q_23], axis=-1), np.stack([Q_31, Q_32, Q_33], axis=-1)], axis=-2)
         
         return Q
 
@@ -269,35 +738,35 @@ class RigidBodyDynamics:
         """Direction Cosine Matrix --> Yaw-Pitch-Roll Angles
 
         Args:
-            Q (np.ndarray): Direction Cosine Matrix
+            Q (np.ndarray): Direction Cosine Matrix [3,3] (or stacked [...,3,3])
 
         Returns:
-            np.ndarray: Yaw-Pitch-Roll Angles
+            np.ndarray: Yaw-Pitch-Roll Angles [3] (or [...,3])
         """
         
         # >>> 1. Precession angle
         
-        phi = np.arctan2(Q[0,1], Q[0,0])
+        phi = np.arctan2(Q[...,0,1], Q[...,0,0])
         
-        if phi < 0: phi += 2 * np.pi
+        phi = np.where(phi < 0, phi + 2 * np.pi, phi)
         
         # >>> 2. Nutation angle
         
-        theta = np.arcsin(-Q[0,2])
+        theta = np.arcsin(np.clip(-Q[...,0,2], -1, 1))
         
         # >>> 3. Spin angle
         
-        psi = np.arctan2(Q[1,2], Q[2,2])
+        psi = np.arctan2(Q[...,1,2], Q[...,2,2])
         
-        if psi < 0: psi += 2 * np.pi
+        psi = np.where(psi < 0, psi + 2 * np.pi, psi)
         
         # >>> 4. Euler angles
         
-        return np.array([phi, theta, psi])
+        return np.stack([phi, theta, psi], axis=-1)
     
     @classmethod
     def dcm_from_yaw_pitch_roll_angles(cls, phi : float, theta : float, psi : float) -> np.ndarray:
-        """Yaw-Pitch-Roll Angles --> Direction Cosine Matrix
+        """Yaw-Pitch-Roll Angles --> Direction Cosine Matrix (arrays of angles are broadcast, e.g. *angles.T for [N,3] angles)
 
         Args:
             phi (float): Yaw angle
@@ -305,7 +774,7 @@ class RigidBodyDynamics:
             psi (float): Roll angle
 
         Returns:
-            np.ndarray: Direction Cosine Matrix
+            np.ndarray: Direction Cosine Matrix [3,3] (or [...,3,3])
         """
         
         Q_11 = +np.cos(phi) * np.cos(theta)
@@ -320,7 +789,7 @@ class RigidBodyDynamics:
         Q_32 = +np.sin(phi) * np.sin(theta) * np.cos(psi) - np.cos(phi) * np.sin(psi)
         Q_33 = +np.cos(theta) * np.cos(psi)
         
-        Q = np.array([[Q_11, Q_12, Q_13], [Q_21, Q_22, Q_23], [Q_31, Q_32, Q_33]])
+        Q = np.stack([np.stack([Q_11, Q_12, Q_13], axis=-1), np.stack([Q_21, Q_22, Q_23], axis=-1), np.stack([Q_31, Q_32, Q_33], axis=-1)], axis=-2)
         
         return Q
 
@@ -332,13 +801,13 @@ class RigidBodyDynamics:
         """Quaternions --> Direction Cosine Matrix
 
         Args:
-            q (np.ndarray): Quaternions
+            q (np.ndarray): Quaternions [4] (or stacked [...,4])
 
         Returns:
-            np.ndarray: Direction Cosine Matrix
+            np.ndarray: Direction Cosine Matrix [3,3] (or [...,3,3])
         """
         
-        q_1, q_2, q_3, q_4 = q
+        q_1, q_2, q_3, q_4 = np.moveaxis(np.asarray(q), -1, 0)
         
         Q_11 = q_1**2 - q_2**2 - q_3**2 + q_4**2
         Q_12 = 2 * (q_1 * q_2 + q_3 * q_4)
@@ -352,7 +821,7 @@ class RigidBodyDynamics:
         Q_32 = 2 * (q_2 * q_3 - q_1 * q_4)
         Q_33 = -q_1**2 - q_2**2 + q_3**2 + q_4**2
         
-        Q = np.array([[Q_11, Q_12, Q_13], [Q_21, Q_22, Q_23], [Q_31, Q_32, Q_33]])
+        Q = np.stack([np.stack([Q_11, Q_12, Q_13], axis=-1), np.stack([Q_21, Q_22, Q_23], axis=-1), np.stack([Q_31, Q_32, Q_33], axis=-1)], axis=-2)
         
         return Q
     
@@ -362,45 +831,80 @@ class RigidBodyDynamics:
         """Direction Cosine Matrix --> Quaternions
 
         Args:
-            Q (np.ndarray): Direction Cosine Matrix
+            Q (np.ndarray): Direction Cosine Matrix [3,3] (or stacked [...,3,3])
 
         Returns:
-            np.ndarray: Quaternions
+            np.ndarray: Quaternions (scalar part positive) [4] (or [...,4])
         """
         
         # >>> 1. Symmetric Matrix
         
-        K_11 = Q[0,0] - Q[1,1] - Q[2,2]
-        K_12 = Q[1,0] + Q[0,1]
-        K_13 = Q[2,0] + Q[0,2]
-        K_14 = Q[1,2] - Q[2,1]
+        K = 1/3 * cls.symmetric_dcm_matrix(Q)
+        
+        # >>> 2. Eigenvalue Problem (eigenvector of the largest eigenvalue, scalar part made positive)
+        
+        l, v = np.linalg.eigh(K)
+        
+        q = v[..., :, -1]
+        
+        return np.where(q[..., 3:] < 0, -q, q)
+        
+    @classmethod
+    def symmetric_dcm_matrix(cls, Q : np.ndarray) -> np.ndarray:
+        """Symmetric matrix K of Algorithm 9.2 (3 K + I = 4 q q^T for an exact rotation)
+        
+        Args:
+            Q (np.ndarray): Direction Cosine Matrix [3,3] (or stacked [...,3,3])
+        
+        Returns:
+            np.ndarray: 3 K [4,4] (or [...,4,4])
+        """
+        
+        Q = np.asarray(Q, dtype=float)
+        
+        K_11 = Q[...,0,0] - Q[...,1,1] - Q[...,2,2]
+        K_12 = Q[...,1,0] + Q[...,0,1]
+        K_13 = Q[...,2,0] + Q[...,0,2]
+        K_14 = Q[...,1,2] - Q[...,2,1]
+        
+        K_22 = -Q[...,0,0] + Q[...,1,1] - Q[...,2,2]
+        K_23 = Q[...,2,1] + Q[...,1,2]
+        K_24 = Q[...,2,0] - Q[...,0,2]
         
-        K_21 = Q[1,0] + Q[0,1]
-        K_22 = -Q[0,0] + Q[1,1] - Q[2,2]
-        K_23 = Q[2,1] + Q[1,2]
-        K_24 = Q[2,0] - Q[0,2]
+        K_33 = -Q[...,0,0] - Q[...,1,1] + Q[...,2,2]
+        K_34 = Q[...,0,1] - Q[...,1,0]
         
-        K_31 = Q[2,0] + Q[0,2]
-        K_32 = Q[2,1] + Q[1,2]
-        K_33 = -Q[0,0] - Q[1,1] + Q[2,2]
-        K_34 = Q[0,1] - Q[1,0]
+        K_44 = Q[...,0,0] + Q[...,1,1] + Q[...,2,2]
         
-        K_41 = Q[1,2] - Q[2,1]
-        K_42 = Q[2,0] - Q[0,2]
-        K_43 = Q[0,1] - Q[1,0]
-        K_44 = Q[0,0] + Q[1,1] + Q[2,2]
+        return np.stack([np.stack([K_11, K_12, K_13, K_14], axis=-1),
+                         np.stack([K_12, K_22, K_23, K_24], axis=-1),
+                         np.stack([K_13, K_23, K_33, K_34], axis=-1),
+                         np.stack([K_14, K_24, K_34, K_44], axis=-1)], axis=-2)
+    
+    @classmethod
+    def quaternions_from_dcm_branch_free(cls, Q : np.ndarray) -> np.ndarray:
+        """Direction Cosine Matrix --> Quaternions without eigenvalue problem nor branches (Shepperd's column selection)
+
+        Args:
+            Q (np.ndarray): Direction Cosine Matrix [3,3] (or stacked [...,3,3])
+
+        Returns:
+            np.ndarray: Quaternions (scalar part positive) [4] (or [...,4])
+        """
+        
+        # >>> 1. Columns of 4 q q^T (column i is 4 q_i q)
         
-        K = 1/3 * np.array([[K_11, K_12, K_13, K_14], [K_21, K_22, K_23, K_24], [K_31, K_32, K_33, K_34], [K_41, K_42, K_43, K_44]])
+        M = cls.symmetric_dcm_matrix(Q) + np.eye(4)
         
-        # >>> 2. Eigenvalue Problem
+        # >>> 2. Column with the largest diagonal element (the best conditioned one)
         
-        l, v = np.linalg.eig(K)
+        i = np.argmax(np.diagonal(M, axis1=-2, axis2=-1), axis=-1)[..., np.newaxis, np.newaxis]
         
-        index = np.argmax(l)
+        q = np.take_along_axis(M, np.broadcast_to(i, M.shape[:-1] + (1,)), axis=-1)[..., 0]
         
-        q = v[:, index]
+        q = q / np.linalg.norm(q, axis=-1, keepdims=True)
         
-        return q
+        return np.where(q[..., 3:] < 0, -q, q)
     
 if __name__ == '__main__':
     
@@ -426,4 +930,49 @@ if __name__ == '__main__':
     print('PROVA\n')
     y_0 = np.array([0.1, 0, 0, np.deg2rad(99), np.deg2rad(60), np.deg2rad(10)])
     RigidBodyDynamics.simulate_attitude_dynamics(y_0, 0, 100, show=True)
-    print('-' * 40, '\n')
\ No newline at end of file
+    print('-' * 40, '\n')
+    
+    print('BATCHED CONVERSIONS\n')
+    angles = np.random.default_rng(0).uniform([0, 0.1, 0], [2 * np.pi, np.pi - 0.1, 2 * np.pi], size=(10000, 3))
+    Q = RigidBodyDynamics.dcm_from_euler_angles(*angles.T)
+    benchmark = [['dcm_from_euler_angles', lambda: [RigidBodyDynamics.dcm_from_euler_angles(*x) for x in angles], lambda: RigidBodyDynamics.dcm_from_euler_angles(*angles.T)],
+                 ['euler_angles_from_dcm', lambda: [RigidBodyDynamics.euler_angles_from_dcm(x) for x in Q], lambda: RigidBodyDynamics.euler_angles_from_dcm(Q)],
+                 ['quaternions_from_dcm', lambda: [RigidBodyDynamics.quaternions_from_dcm(x) for x in Q], lambda: RigidBodyDynamics.quaternions_from_dcm(Q)],
+                 ['quaternions_from_dcm_branch_free', lambda: [RigidBodyDynamics.quaternions_from_dcm_branch_free(x) for x in Q], lambda: RigidBodyDynamics.quaternions_from_dcm_branch_free(Q)]]
+    for name, scalar, batched in benchmark:
+        t_0 = time.perf_counter(); scalar()
+        t_1 = time.perf_counter(); batched()
+        t_2 = time.perf_counter()
+        print(f'{name:34s} loop: {(t_1 - t_0) * 1e3:9.2f} ms   batched: {(t_2 - t_1) * 1e3:7.2f} ms   speed-up: {(t_1 - t_0) / (t_2 - t_1):7.1f}')
+    print('-' * 40, '\n')
+    
+    print('QUATERNIONS\n')
+    q_0 = RigidBodyDynamics.quaternions_from_dcm(RigidBodyDynamics.dcm_from_euler_angles(*y_0[3:]))
+    result = RigidBodyDynamics.simulate_attitude_quaternions(np.hstack((y_0[:3], q_0)), 0, 100, show=True)
+    print(np.rad2deg(result['euler'][-1]), np.linalg.norm(result['y'][-1, 3:]))
+    print('-' * 40, '\n')
+    print('ORBIT-ATTITUDE (6-DOF)\n')
+    J = np.array([[10, 0, 0], [0, 8, 0], [0, 0, 3]])
+    r_0, v_0 = np.array([7000, 0, 0]), np.array([0, np.sqrt(RigidBodyDynamics.mu / 7000), 0])
+    y_0 = np.hstack((r_0, v_0, [0.001, -0.002, 0.0015], [0.1, 0.2, 0.3, np.sqrt(0.86)]))
+    reference = solve_ivp(fun=RigidBodyDynamics.orbit_attitude_eom, t_span=[0, 6000], y0=y_0, method='DOP853', args=(J, np.zeros(3)), rtol=1e-13, atol=1e-13)
+    t_0 = time.perf_counter()
+    result = RigidBodyDynamics.simulate_orbit_attitude(y_0, 0, 6000, dt=30, dt_attitude=10, J=J, show=True)
+    t_1 = time.perf_counter()
+    single = solve_ivp(fun=RigidBodyDynamics.orbit_attitude_eom, t_span=[0, 6000], y0=y_0, method='DOP853', args=(J, np.zeros(3)), rtol=1e-8, atol=1e-8)
+    t_2 = time.perf_counter()
+    print(f'multi-rate: {t_1 - t_0:.2f} s, attitude error: {np.abs(result["y"][-1, 6:] - reference["y"][6:, -1]).max():.2e}')
+    print(f'DOP853:     {t_2 - t_1:.2f} s, attitude error: {np.abs(single["y"][6:, -1] - reference["y"][6:, -1]).max():.2e}')
+    print('-' * 40, '\n')
+
+    print('ORBIT-ATTITUDE (6-DOF) FAST SPIN\n')
+    y_0 = np.hstack((r_0, v_0, [0.01, -0.02, 1.0], [0.1, 0.2, 0.3, np.sqrt(0.86)]))
+    reference = solve_ivp(fun=RigidBodyDynamics.orbit_attitude_eom, t_span=[0, 1000], y0=y_0, method='DOP853', args=(J, np.zeros(3)), rtol=1e-13, atol=1e-13)
+    t_0 = time.perf_counter()
+    result = RigidBodyDynamics.simulate_orbit_attitude(y_0, 0, 1000, dt=30, dt_attitude=0.1, J=J)
+    t_1 = time.perf_counter()
+    single = solve_ivp(fun=RigidBodyDynamics.orbit_attitude_eom, t_span=[0, 1000], y0=y_0, method='DOP853', args=(J, np.zeros(3)), rtol=1e-8, atol=1e-8)
+    t_2 = time.perf_counter()
+    print(f'multi-rate: {t_1 - t_0:.2f} s, attitude error: {np.abs(result["y"][-1, 6:] - reference["y"][6:, -1]).max():.2e}')
+    print(f'DOP853:     {t_2 - t_1:.2f} s, attitude error: {np.abs(single["y"][6:, -1] - reference["y"][6:, -1]).max():.2e}')
+    print('-' * 40, '\n')
@@ -100,18 +100,21 @@ class ThreeDimensionalOrbit():
     
     # ! ALGORITHM 4.2
     @classmethod
-    def calculate_orbital_elements(cls, r : np.ndarray, v : np.ndarray, deg : bool = False) -> OrbitalElements:
+    def calculate_orbital_elements(cls, r : np.ndarray, v : np.ndarray, deg : bool = False, mu : float = None) -> OrbitalElements:
         """Calculates the Orbital Elements from position and velocity vectors in Geocentric Equatorial Frame
 
         Args:
             r (np.ndarray): Position vector
             v (np.ndarray): Velocity vector
             deg (bool, optional): Enable angles in degrees. Defaults to False.
+            mu (float, optional): Gravitational parameter. Defaults to None (ThreeDimensionalOrbit.mu).
 
         Returns:
             ORBITAL_ELEMENTS: Orbital Elements
         """
         
+        mu = cls.mu if mu is None else mu
+        
         oe = OrbitalElements()
         
         # >>> 1. Magnitudes
@@ -134,7 +137,7 @@ class ThreeDimensionalOrbit():
         
         oe.h = np.linalg.norm(h)
         
-        oe.a = - 0.5 * cls.mu / (0.5 * v_m**2 - cls.mu / r_m)
+        oe.a = - 0.5 * mu / (0.5 * v_m**2 - mu / r_m)
         
         # >>> 6. Inclination
         
@@ -174,8 +177,8 @@ class ThreeDimensionalOrbit():
         
         # >>> 10. Eccentricity
         
-        e = 1 / cls.mu * (np.cross(v, h) - cls.mu * r / r_m)
-        e = 1 / cls.mu * ((v_m**2 - cls.mu / r_m) * r - r_m * v_r * v)
+        e = 1 / mu * (np.cross(v, h) - mu * r / r_m)
+        e = 1 / mu * ((v_m**2 - mu / r_m) * r - r_m * v_r * v)
         
         # >>> 11.
         
@@ -0,0 +1,229 @@
+""" Trajectory.py: Implements the dense-output trajectory result """
+
+__author__      = "Alessio Negri"
+__license__     = "LGPL v3"
+__maintainer__  = "Alessio Negri"
+
+import os
+import sys
+import copy
+import numpy as np
+
+from functools import cached_property
+from scipy.interpolate import CubicSpline
+
+sys.path.append(os.path.dirname(__file__))
+
+# --- CLASS 
+
+class Trajectory:
+    """Integrated trajectory stored as a continuous (dense output or spline) interpolant, evaluable at arbitrary times"""
+    
+    # --- METHODS 
+    
+    def __init__(self, t : np.ndarray, y : np.ndarray, sol = None) -> None:
+        """Constructor
+
+        Args:
+            t (np.ndarray): Integration nodes [n_points]
+            y (np.ndarray): State at the integration nodes [n_states, n_points]
+            sol (OdeSolution, optional): Dense output of solve_ivp. Defaults to None (a cubic spline through the nodes is used).
+        """
+        
+        t = np.asarray(t, dtype=float)
+        
+        # >>> Fallback to a cubic spline through the nodes (constant state for a single node)
+        
+        if sol is None and len(t) > 1:
+            
+            sol = CubicSpline(t, y, axis=1)
+        
+        elif sol is None:
+            
+            y_0 = np.asarray(y)[:, :1]
+            
+            sol = lambda _t: np.repeat(y_0, np.size(_t), axis=1)
+        
+        self.segments   = [(t[0], t[-1], sol)]  # * List of (t_start, t_end, interpolant)
+        self.grid       = t                     # * Default evaluation times [ s ]
+    
+    @classmethod
+    def from_solve_ivp(cls, integrationResult : dict, *args, **kwargs):
+        """Builds the trajectory from the solve_ivp result (dense_output=True recommended)
+
+        Args:
+            integrationResult (dict): solve_ivp result
+
+        Returns:
+            Trajectory: Trajectory
+        """
+        
+        return cls(integrationResult['t'], integrationResult['y'], integrationResult.get('sol'), *args, **kwargs)
+    
+    @property
+    def t_0(self) -> float: return self.segments[0][0]
+    
+    @property
+    def t_f(self) -> float: return self.segments[-1][1]
+    
+    @property
+    def t(self) -> np.ndarray: return self.grid
+    
+    @cached_property
+    def y(self) -> np.ndarray: return self(self.grid)
+    
+    @cached_property
+    def dy_dt(self) -> np.ndarray: return self.derivative(self.grid)
+    
+    def append(self, other : 'Trajectory') -> 'Trajectory':
+        """Concatenates a trajectory starting where this one ends (e.g. a new launcher stage)
+
+        Args:
+            other (Trajectory): Following trajectory
+
+        Returns:
+            Trajectory: Concatenated trajectory (new object, caches are not shared)
+        """
+        
+        result = self.resample(t=np.concatenate([self.grid, other.grid[other.grid > self.t_f]]))
+        
+        result.segments = self.segments + other.segments
+        
+        return result
+    
+    def resample(self, n : int = None, t : np.ndarray = None) -> 'Trajectory':
+        """Returns the same trajectory evaluated on a different time grid
+
+        Args:
+            n (int, optional): Number of uniformly spaced points. Defaults to None.
+            t (np.ndarray, optional): Explicit evaluation times. Defaults to None.
+
+        Returns:
+            Trajectory: Resampled trajectory (derived quantities are recomputed lazily)
+        """
+        
+        result = copy.copy(self)
+        
+        for name in list(result.__dict__):
+            
+            if isinstance(getattr(type(result), name, None), cached_property): del result.__dict__[name]
+        
+        result.grid = np.asarray(t, dtype=float) if t is not None else np.linspace(self.t_0, self.t_f, n) if n is not None else self.grid
+        
+        return result
+    
+    def segment_index(self, t : np.ndarray) -> np.ndarray:
+        """Index of the segment containing each time
+
+        Args:
+            t (np.ndarray): Times
+
+        Returns:
+            np.ndarray: Segment indexes
+        """
+        
+        ends = np.array([segment[1] for segment in self.segments])
+        
+        return np.minimum(np.searchsorted(ends, t, side='left'), len(self.segments) - 1)
+    
+    def __call__(self, t : np.ndarray) -> np.ndarray:
+        """Evaluates the state at arbitrary times
+
+        Args:
+            t (np.ndarray): Times [N] (or scalar)
+
+        Returns:
+            np.ndarray: State [n_states, N] (or [n_states])
+        """
+        
+        scalar = np.ndim(t) == 0
+        
+        t = np.clip(np.atleast_1d(np.asarray(t, dtype=float)), self.t_0, self.t_f)
+        
+        y = None
+        
+        idx = self.segment_index(t)
+        
+        for k in np.unique(idx):
+            
+            mask = idx == k
+            
+            y_k = np.asarray(self.segments[k][2](t[mask])).reshape(-1, np.count_nonzero(mask))
+            
+            if y is None: y = np.empty(shape=(y_k.shape[0], len(t)))
+            
+            y[:, mask] = y_k
+        
+        return y[:, 0] if scalar else y
+    
+    def derivative(self, t : np.ndarray, h : float = 1e-3) -> np.ndarray:
+        """Evaluates the time derivative of the state (central differences of the interpolant, one-sided at the segment ends)
+
+        Args:
+            t (np.ndarray): Times [N] (or scalar)
+            h (float, optional): Differentiation step [s]. Defaults to 1e-3.
+
+        Returns:
+            np.ndarray: State derivative [n_states, N] (or [n_states])
+        """
+        
+        scalar = np.ndim(t) == 0
+        
+        t = np.clip(np.atleast_1d(np.asarray(t, dtype=float)), self.t_0, self.t_f)
+        
+        dy_dt = None
+        
+        idx = self.segment_index(t)
+        
+        for k in np.unique(idx):
+            
+            mask = idx == k
+            
+            t_start, t_end, sol = self.segments[k]
+            
+            t_lo = np.maximum(t[mask] - h, t_start)
+            t_hi = np.minimum(t[mask] + h, t_end)
+            
+            n = np.count_nonzero(mask)
+            
+            dy_k = (np.asarray(sol(t_hi)).reshape(-1, n) - np.asarray(sol(t_lo)).reshape(-1, n)) / np.maximum(t_hi - t_lo, np.finfo(float).eps)
+            
+            if dy_dt is None: dy_dt = np.empty(shape=(dy_k.shape[0], len(t)))
+            
+            dy_dt[:, mask] = dy_k
+        
+        return dy_dt[:, 0] if scalar else dy_dt
+
+class FlightTrajectory(Trajectory):
+    """Trajectory of the (V, gamma, r, x, m, ...) flight state used by the launch and the atmospheric entry equations"""
+    
+    # --- METHODS 
+    
+    def __init__(self, t : np.ndarray, y : np.ndarray, sol = None, R_E : float = 0.0) -> None:
+        """Constructor
+
+        Args:
+            t (np.ndarray): Integration nodes [n_points]
+            y (np.ndarray): State at the integration nodes [n_states, n_points]
+            sol (OdeSolution, optional): Dense output of solve_ivp. Defaults to None.
+            R_E (float, optional): Planet equatorial radius [km]. Defaults to 0.0.
+        """
+        
+        super().__init__(t, y, sol)
+        
+        self.R_E = R_E # * Planet Equatiorial Radius [ km ]
+    
+    @cached_property
+    def velocity(self) -> np.ndarray: return self.y[0]
+    
+    @cached_property
+    def flight_path_angle(self) -> np.ndarray: return self.y[1]
+    
+    @cached_property
+    def altitude(self) -> np.ndarray: return self.y[2] - self.R_E
+    
+    @cached_property
+    def downrange(self) -> np.ndarray: return self.y[3]
+    
+    @cached_property
+    def acceleration(self) -> np.ndarray: return self.dy_dt[0]
@@ -0,0 +1,252 @@
+""" TrajectoryArchive.py: Implements the memory-mapped on-disk trajectory archive """
+
+__author__      = "Alessio Negri"
+__license__     = "LGPL v3"
+__maintainer__  = "Alessio Negri"
+
+import os
+import sys
+import json
+import struct
+import numpy as np
+
+from scipy.integrate import solve_ivp
+
+sys.path.append(os.path.dirname(__file__))
+
+# --- CLASS 
+
+class TrajectoryArchive:
+    """Binary trajectory archive: fixed header + JSON metadata + row-major float64 records [t, y_1, ..., y_n], read back through numpy.memmap"""
+    
+    # --- CONSTANTS 
+    
+    MAGIC       = b'SCTRAJ\x00\x00'         # * File signature
+    VERSION     = 1                         # * Format version
+    HEADER      = struct.Struct('<8sIIQQ')  # * magic, version, n_states, n_points, metadata length
+    ALIGNMENT   = 64                        # * Data block alignment [ bytes ]
+    
+    # --- METHODS 
+    
+    def __init__(self, path : str, n_states : int, n_points : int, offset : int, metadata : dict, writable : bool) -> None:
+        """Constructor (use create / open)
+
+        Args:
+            path (str): File path
+            n_states (int): Number of states
+            n_points (int): Number of stored points
+            offset (int): Data block offset [bytes]
+            metadata (dict): Metadata
+            writable (bool): True when the archive is open for writing
+        """
+        
+        self.path       = path
+        self.n_states   = n_states
+        self.n_points   = n_points
+        self.offset     = offset
+        self.metadata   = metadata
+        self.writable   = writable
+        
+        self._file      = open(path, 'r+b') if writable else None
+        self._memmap    = None
+        
+        if writable: self._file.seek(0, os.SEEK_END)
+    
+    @classmethod
+    def create(cls, path : str, n_states : int, metadata : dict = None) -> 'TrajectoryArchive':
+        """Creates a new (empty) archive open for writing
+
+        Args:
+            path (str): File path
+            n_states (int): Number of states
+            metadata (dict, optional): JSON serializable metadata (e.g. simulation inputs). Defaults to None.
+
+        Returns:
+            TrajectoryArchive: Archive
+        """
+        
+        meta = json.dumps(metadata or dict()).encode('utf-8')
+        
+        offset = cls.HEADER.size + len(meta)
+        offset = offset + (-offset) % cls.ALIGNMENT
+        
+        with open(path, 'wb') as file:
+            
+            file.write(cls.HEADER.pack(cls.MAGIC, cls.VERSION, n_states, 0, len(meta)))
+            file.write(meta)
+            file.write(b'\x00' * (offset - cls.HEADER.size - len(meta)))
+        
+        return cls(path, n_states, 0, offset, metadata or dict(), True)
+    
+    @classmethod
+    def open(cls, path : str) -> 'TrajectoryArchive':
+        """Opens an existing archive for reading
+
+        Args:
+            path (str): File path
+
+        Returns:
+            TrajectoryArchive: Archive
+        """
+        
+        with open(path, 'rb') as file:
+            
+            magic, version, n_states, n_points, meta_length = cls.HEADER.unpack(file.read(cls.HEADER.size))
+            
+            if magic != cls.MAGIC: raise Exception(f'Invalid trajectory archive: {path}')
+            
+            if version != cls.VERSION: raise Exception(f'Unsupported trajectory archive version: {version}')
+            
+            metadata = json.loads(file.read(meta_length).decode('utf-8'))
+        
+        offset = cls.HEADER.size + meta_length
+        offset = offset + (-offset) % cls.ALIGNMENT
+        
+        return cls(path, n_states, n_points, offset, metadata, False)
+    
+    def append(self, t : np.ndarray, y : np.ndarray) -> None:
+        """Appends a block of points at the end of the archive
+
+        Args:
+            t (np.ndarray): Times [N]
+            y (np.ndarray): States [n_states, N]
+        """
+        
+        if not self.writable: raise Exception('Trajectory archive opened in read-only mode')
+        
+        block = np.empty(shape=(np.size(t), self.n_states + 1), dtype='<f8')
+        
+        block[:, 0]  = t
+        block[:, 1:] = np.reshape(y, (self.n_states, -1)).T
+        
+        self._file.write(block.tobytes())
+        
+        self.n_points += block.shape[0]
+    
+    def close(self) -> None:
+        """Finalizes the header (number of points) and closes the file
+        """
+        
+        if self._file is not None:
+            
+            self._file.seek(16)
+            self._file.write(struct.pack('<Q', self.n_points))
+            self._file.close()
+            
+            self._file      = None
+            self.writable   = False
+    
+    def __enter__(self) -> 'TrajectoryArchive': return self
+    
+    def __exit__(self, *args) -> None: self.close()
+    
+    def __len__(self) -> int: return self.n_points
+    
+    @property
+    def records(self) -> np.memmap:
+        """Memory-mapped records [n_points, n_states + 1] (read-only)
+
+        Returns:
+            np.memmap: Records
+        """
+        
+        if self.writable: raise Exception('Close the trajectory archive before reading it')
+        
+        if self._memmap is None and self.n_points > 0:
+            
+            self._memmap = np.memmap(self.path, dtype='<f8', mode='r', offset=self.offset, shape=(self.n_points, self.n_states + 1))
+        
+        return self._memmap if self._memmap is not None else np.empty(shape=(0, self.n_states + 1))
+    
+    @property
+    def t(self) -> np.ndarray: return self.records[:, 0]
+    
+    @property
+    def y(self) -> np.ndarray: return self.records[:, 1:].T
+    
+    def __getitem__(self, key) -> list:
+        """Slices the archive without loading it in memory
+
+        Args:
+            key (slice | np.ndarray): Points selection
+
+        Returns:
+            list: [t, y[n_states, n_selected]]
+        """
+        
+        records = self.records[key]
+        
+        return [records[..., 0], records[..., 1:].T]
+    
+    def decimate(self, max_points : int) -> list:
+        """Strided view with at most max_points points (first and last points always included)
+
+        Args:
+            max_points (int): Maximum number of points
+
+        Returns:
+            list: [t, y[n_states, n_selected]]
+        """
+        
+        if self.n_points <= max_points: return self[:]
+        
+        return self[np.unique(np.append(np.linspace(0, self.n_points - 1, max_points).astype(int), self.n_points - 1))]
+    
+    def chunks(self, size : int = 65_536):
+        """Iterates the archive in contiguous blocks
+
+        Args:
+            size (int, optional): Block size [points]. Defaults to 65_536.
+
+        Yields:
+            list: [t, y[n_states, size]]
+        """
+        
+        for start in range(0, self.n_points, size): yield self[start:start + size]
+    
+    @classmethod
+    def integrate(cls, path : str, fun, t_span : list, y_0 : np.ndarray, windows : int = 100, metadata : dict = None, **options) -> list:
+        """Integrates an ODE window by window, appending every window to a new archive (only one window is kept in memory)
+
+        Args:
+            path (str): File path
+            fun (Callable): Right-hand side fun(t, y, *args)
+            t_span (list): Integration interval [t_0, t_f]
+            y_0 (np.ndarray): Initial state
+            windows (int, optional): Number of integration windows. Defaults to 100.
+            metadata (dict, optional): JSON serializable metadata. Defaults to None.
+            options: solve_ivp options (method, args, events, rtol, atol, ...)
+
+        Returns:
+            list: [TrajectoryArchive opened for reading, t_events (None without events)]
+        """
+        
+        edges = np.linspace(t_span[0], t_span[1], windows + 1)
+        
+        t_events = None
+        
+        with cls.create(path, len(y_0), metadata) as archive:
+            
+            archive.append(np.array([edges[0]]), np.asarray(y_0, dtype=float))
+            
+            for t_start, t_end in zip(edges[:-1], edges[1:]):
+                
+                integrationResult = solve_ivp(fun=fun, t_span=[t_start, t_end], y0=y_0, **options)
+                
+                if not integrationResult['success']: raise Exception(integrationResult['message'])
+                
+                # >>> The first point of each window is the last point of the previous one
+                
+                archive.append(integrationResult['t'][1:], integrationResult['y'][:, 1:])
+                
+                if integrationResult['t_events'] is not None:
+                    
+                    t_events = integrationResult['t_events'] if t_events is None else [np.append(old, new) for old, new in zip(t_events, integrationResult['t_events'])]
+                
+                y_0 = integrationResult['y'][:, -1]
+                
+                # >>> Terminal event
+                
+                if integrationResult['status'] == 1: break
+        
+        return [cls.open(path), t_events]
@@ -22,6 +22,7 @@ sys.path.append(os.path.dirname(__file__))
 
 from AstronomicalData import AstronomicalData, CelestialBody
 from Time import Time, DirectionType
+from ResultCache import ResultCache
 
 # --- STRUCT 
 
@@ -99,6 +100,7 @@ class TwoBodyProblem:
     
     # ! ALGORITHM 2.2
     @classmethod
+    @ResultCache.cached(settings=dict(method='RK45', rtol=1e-8, atol=1e-8), depends=[Time])
     def simulate_relative_motion(cls, y_0 : np.ndarray, t_0 : float = 0.0, t_f : float = 0.0, show : bool = False) -> dict:
         """Integrates the Ordinary Differential Equations for the relative motion
 
@@ -8,21 +8,25 @@ __chapter__     = "7 - Launch Mechanics"
 
 import os
 import sys
+import math
+import functools
 import numpy as np
 import matplotlib.pyplot as plt
 import scipy.integrate as ode
 
 sys.path.append(os.path.dirname(__file__))
 
-from scipy.optimize import newton
-
 from AstronomicalData import AstronomicalData, CelestialBody
+from Trajectory import FlightTrajectory
+from ResultCache import ResultCache
 
 # --- STAGE CLASS 
 
 class Stage:
     """Implements the generic launcher stage"""
     
+    z_table = np.linspace(-5.0, 250.0, 5101) # * Altitude grid of the thrust table (uniform) [ km ] (vacuum values above)
+    
     def __init__(self):
         """Constructor
         """
@@ -56,6 +60,10 @@ class Stage:
         self.S          = 0.0   # * Reference Surface           [ m^2 ]
         self.C_D        = 0.0   # * Drag Coefficient            [ ]
         self.C_L        = 0.0   # * Lift Coefficient            [ ]
+        
+        self._table     = None  # * Thrust and specific impulse vs altitude (rebuilt when the motor or nozzle parameters change)
+        self._table_key = None  # * Motor and nozzle parameters of the table
+        self._scalar    = None  # * [F_vac, Gamma * epsilon / p_c] of the table (scalar evaluation)
     
     def mass(self, m_s : float, m_p : float, m_payload : float) -> None:
         """Sets the masses
@@ -147,8 +155,46 @@ class Stage:
         #print(f'm_p_dot = {self.m_p_dot}')
         #print(f't_burn = {self.t_burn}')
     
+    def snapshot(self) -> 'Stage':
+        """Plain copy of the stage parameters (safe to read from a worker thread while the original is edited)
+
+        Returns:
+            Stage: Copy of the stage
+        """
+        
+        stage = Stage()
+        
+        for key in vars(stage):
+            
+            setattr(stage, key, getattr(self, key))
+        
+        return stage
+    
+    def thrust_table(self) -> list:
+        """Thrust and specific impulse tabulated on z_table (built again only when the motor or nozzle parameters have changed)
+
+        Returns:
+            list: [z [km], F [kg * m / s^2], I_sp [s]]
+        """
+        
+        key = (self.F_vac, self.I_sp_vac, self.Gamma, self.epsilon, self.p_c)
+        
+        if self._table is None or self._table_key != key:
+            
+            # * I_sp_bar(z) = I_sp(z) / I_sp_vac
+            
+            I_sp_bar = 1 - self.Gamma * (self.epsilon * np.exp(- self.z_table / 7.16) / self.p_c) if self.p_c != 0 else np.ones(self.z_table.shape)
+            
+            # * F(z) = F_vac * I_sp_bar(z)
+            
+            self._table     = [self.z_table, self.F_vac * I_sp_bar, self.I_sp_vac * I_sp_bar]
+            self._table_key = key
+            self._scalar    = [float(self.F_vac), float(self.Gamma * self.epsilon / self.p_c) if self.p_c != 0 else 0.0]
+        
+        return self._table
+    
     def thrust(self, z : float) -> float:
-        """Calculates the thrust in function of the altitude
+        """Calculates the thrust in function of the altitude (arrays are interpolated on the thrust table)
 
         Args:
             z (float): Altitude [km]
@@ -157,15 +203,29 @@ class Stage:
             float: Thrust [kg * m / s^2]
         """
         
-        # * I_sp_bar(z) = I_sp(z) / I_sp_vac
+        z_table, F, I_sp = self.thrust_table()
         
-        I_sp_bar = 1 - self.Gamma * (self.epsilon * np.exp(- z / 7.16) / self.p_c) if self.p_c != 0 else 1
+        if np.ndim(z) != 0: return np.interp(z, z_table, F)
         
-        # * F(z) = F_vac * I_sp_bar(z)
+        # ? Single altitude (equations of motion): closed form with the cached coefficients, cheaper than a lookup
         
-        F = self.F_vac * I_sp_bar
+        F_vac, c = self._scalar
         
-        return F
+        return F_vac * (1 - c * math.exp(- float(z) / 7.16))
+    
+    def specific_impulse(self, z : float) -> float:
+        """Calculates the specific impulse in function of the altitude (arrays are interpolated on the thrust table)
+
+        Args:
+            z (float): Altitude [km]
+
+        Returns:
+            float: Specific impulse [s]
+        """
+        
+        z_table, F, I_sp = self.thrust_table()
+        
+        return np.interp(z, z_table, I_sp)
 
 # --- LAUNCH CLASS 
 
@@ -292,6 +352,7 @@ class Launcher:
     # ! SECTION 7.2 - 7.4
     
     @classmethod
+    @ResultCache.cached(settings=dict(method='RK45', rtol=1e-8, atol=1e-8, dense_output=True))
     def simulate_launch(cls, y_0 : np.ndarray, h_t : float = 0.0, t_0 : float = 0.0, t_f : float = 0.0) -> dict:
         """Integrates the Ordinary Differential Equations for the Launch Mechanics
 
@@ -302,8 +363,10 @@ class Launcher:
             t_f (float, optional): Final time. Defaults to 0.0.
             
         Returns:
-            dict: { t: time, y: state, dt: t - t_0 }
+            dict: { t: time, y: state, dt: t - t_0, trajectory: FlightTrajectory }
         """
+        
+        y_0 = np.array(y_0, dtype=float) # * Copy (the caller's state is left unchanged on cache hits and misses alike)
             
         # >>> 1. Integrate ODE 
         
@@ -316,7 +379,7 @@ class Launcher:
         
         terminal_condition.terminal = True
         
-        integrationResult = ode.solve_ivp(fun=cls.launch_eom, t_span=[t_0, t_f], y0=y_0, method='RK45', rtol=1e-8, atol=1e-8, args=(t_0, cls.stage, h_t), events=terminal_condition)
+        integrationResult = ode.solve_ivp(fun=cls.launch_eom, t_span=[t_0, t_f], y0=y_0, method='RK45', rtol=1e-8, atol=1e-8, args=(t_0, cls.stage, h_t), events=terminal_condition, dense_output=True)
         
         if not integrationResult['success']: raise Exception(integrationResult['message'])
         
@@ -324,7 +387,7 @@ class Launcher:
         
         t = integrationResult['t']
         
-        return dict(t=t, y=integrationResult['y'], dt=np.abs(t[-1] - t[0]))
+        return dict(t=t, y=integrationResult['y'], dt=np.abs(t[-1] - t[0]), trajectory=FlightTrajectory.from_solve_ivp(integrationResult, cls.R_E))
         
     @classmethod
     def plot_launch(cls, y : np.ndarray, t : np.ndarray) -> None:
@@ -377,6 +440,145 @@ class Launcher:
     
     # ! SECTION 7.5
     
+    @classmethod
+    def burnout_velocity(cls, dt : np.ndarray, I_sp : np.ndarray, k_p : np.ndarray, gamma_avg : np.ndarray) -> np.ndarray:
+        """Velocity gained by a stage burning for dt (array inputs are broadcast)
+
+        Args:
+            dt (np.ndarray): Burn time [s]
+            I_sp (np.ndarray): Specific impulse [s]
+            k_p (np.ndarray): Propellant fraction
+            gamma_avg (np.ndarray): Average value of flight path angle [deg]
+
+        Returns:
+            np.ndarray: Velocity gain [km/s]
+        """
+        
+        with np.errstate(all='ignore'): return - cls.g_E * I_sp * np.log(1 - k_p * dt) - cls.g_E * dt * np.sin(np.deg2rad(gamma_avg))
+    
+    @classmethod
+    def burnout_time(cls, dV : np.ndarray, I_sp : np.ndarray, k_p : np.ndarray, gamma_avg : np.ndarray, tol : float = 1.48e-8, maxiter : int = 50) -> np.ndarray:
+        """Burn time giving the velocity gain dV (Newton method on all the configurations at once, same initial guess of the scalar solution)
+
+        Args:
+            dV (np.ndarray): Velocity gain [km/s]
+            I_sp (np.ndarray): Specific impulse [s]
+            k_p (np.ndarray): Propellant fraction
+            gamma_avg (np.ndarray): Average value of flight path angle [deg]
+            tol (float, optional): Tolerance on the Newton step [s]. Defaults to 1.48e-8.
+            maxiter (int, optional): Maximum number of iterations. Defaults to 50.
+
+        Returns:
+            np.ndarray: Burn time [s] (NaN where the method has not converged)
+        """
+        
+        dV, I_sp, k_p, sin_gamma = np.broadcast_arrays(*[np.asarray(x, dtype=float) for x in (dV, I_sp, k_p, np.sin(np.deg2rad(gamma_avg)))])
+        
+        dt = 1 / k_p - 1
+        
+        active = np.ones(dt.shape, dtype=bool)
+        
+        with np.errstate(all='ignore'):
+            
+            for _ in range(maxiter):
+                
+                f = dV + cls.g_E * I_sp * np.log(1 - k_p * dt) + cls.g_E * dt * sin_gamma
+                
+                f_dot = - cls.g_E * I_sp * k_p * 1 / (1 - k_p * dt) + cls.g_E * sin_gamma
+                
+                step = np.where(active, f / f_dot, 0.0)
+                
+                dt = dt - step
+                
+                active &= ~(np.abs(step) <= tol)
+                
+                if not np.any(active): break
+        
+        return np.where(active, np.nan, dt)
+    
+    @classmethod
+    def vehicle_to_orbit(cls, V_bo : np.ndarray, m_payload : np.ndarray, t_bo : list, F_W : list, I_sp : list, gamma_avg : list, k_s : list) -> dict:
+        """Staging of a multi-stage vehicle to orbit for many configurations at once (every parameter may be an array, arrays are broadcast)
+
+        Args:
+            V_bo (np.ndarray): Final burnout velocity for orbit insertion [km/s]
+            m_payload (np.ndarray): Payload mass [kg]
+            t_bo (list): Burnout times of all the stages but the last one [s]
+            F_W (list): Thrust to weight ratio of each stage
+            I_sp (list): Specific impulse of each stage [s]
+            gamma_avg (list): Average value of flight path angle of each stage [deg]
+            k_s (list): Structural fraction of each stage
+
+        Returns:
+            dict: { t_bo, m_0, m_p, m_s, m_payload, F } lists with one value per stage (NaN where the last burnout time has not converged)
+        """
+        
+        n = len(F_W)
+        
+        if len(t_bo) != n - 1 or len(I_sp) != n or len(gamma_avg) != n or len(k_s) != n: raise Exception('Inconsistent number of stages')
+        
+        # >>> Propellant fraction
+        
+        k_p = [F_W[i] / I_sp[i] for i in range(n)]
+        
+        # >>> Burnout velocity of the lower stages
+        
+        V_prev, t_prev = 0.0, 0.0
+        
+        for i in range(n - 1):
+            
+            V_prev = V_prev + cls.burnout_velocity(t_bo[i] - t_prev, I_sp[i], k_p[i], gamma_avg[i])
+            
+            t_prev = t_bo[i]
+        
+        # >>> Burnout time of the last stage
+        
+        t_bo = list(t_bo) + [t_prev + cls.burnout_time(V_bo - V_prev, I_sp[-1], k_p[-1], gamma_avg[-1])]
+        
+        dt = [t_bo[i] - (t_bo[i - 1] if i > 0 else 0) for i in range(n)]
+        
+        # >>> Stack mass (the payload of each stage is the stack above it)
+        
+        ratio = [1 - (1 + k_s[i]) * k_p[i] * dt[i] for i in range(n)]
+        
+        m_0 = [m_payload / functools.reduce(np.multiply, ratio[i:]) for i in range(n)]
+        
+        # >>> Thrust, propellant mass and structural mass
+        
+        F = [F_W[i] * m_0[i] * cls.g_E * 1e3 for i in range(n)]
+        
+        m_p = [k_p[i] * dt[i] * m_0[i] for i in range(n)]
+        
+        m_s = [k_s[i] * m_p[i] for i in range(n)]
+        
+        return dict(t_bo=t_bo, m_0=m_0, m_p=m_p, m_s=m_s, m_payload=m_0[1:] + [m_payload], F=F)
+    
+    @classmethod
+    @functools.lru_cache(maxsize=256)
+    def staging(cls, V_bo : float, m_payload : float, t_bo : tuple, F_W : tuple, I_sp : tuple, gamma_avg : tuple, k_s : tuple) -> tuple:
+        """Staging of a single configuration (the most recent configurations are cached, e.g. while moving a slider)
+
+        Args:
+            V_bo (float): Final burnout velocity for orbit insertion [km/s]
+            m_payload (float): Payload mass [kg]
+            t_bo (tuple): Burnout times of all the stages but the last one [s]
+            F_W (tuple): Thrust to weight ratio of each stage
+            I_sp (tuple): Specific impulse of each stage [s]
+            gamma_avg (tuple): Average value of flight path angle of each stage [deg]
+            k_s (tuple): Structural fraction of each stage
+
+        Returns:
+            tuple: (m_s, m_p, m_payload, F) of each stage
+        """
+        
+        result = cls.vehicle_to_orbit(V_bo, m_payload, t_bo, F_W, I_sp, gamma_avg, k_s)
+        
+        # ? Raised as the scalar Newton method did (exceptions are never cached, NaN results would be)
+        
+        if not np.isfinite(result['t_bo'][-1]): raise Exception('Burnout time of the last stage has not converged')
+        
+        return tuple((float(result['m_s'][i]), float(result['m_p'][i]), float(result['m_payload'][i]), float(result['F'][i])) for i in range(len(F_W)))
+    
     @classmethod
     def single_stage_vehicle_to_orbit(cls,
                                       stage : Stage,
@@ -401,40 +603,13 @@ class Launcher:
             Stage: Updated stage parameters
         """
         
+        # >>> Staging (cached)
         
-        # >>> Propellant fraction
-        
-        k_p_1 = F_W_1 / I_sp_1
-        
-        # >>> Burnout time
-        
-        f = lambda t: V_bo + cls.g_E * I_sp_1 * np.log(1 - k_p_1 * t) + cls.g_E * t * np.sin(np.deg2rad(gamma_avg_1))
-        
-        f_dot = lambda t: - cls.g_E * I_sp_1 * k_p_1 * 1 / (1 - k_p_1 * t) + cls.g_E * np.sin(np.deg2rad(gamma_avg_1))
-        
-        t_bo_1 = newton(f, 1 / k_p_1 - 1, f_dot)
-        
-        # >>> Stack mass
-        
-        dt_1 = t_bo_1 - 0
-        
-        m_0_I = m_payload / (1 - (1 + k_s_1) * k_p_1 * dt_1)
-        
-        # >>> Thrust
-        
-        F_1 = F_W_1 * m_0_I * cls.g_E * 1e3
-        
-        # >>> Propellant mass
-        
-        m_p_1 = k_p_1 * dt_1 * m_0_I
-        
-        # >>> Structural mass
-        
-        m_s_1 = k_s_1 * m_p_1
+        (m_s_1, m_p_1, m_payload_1, F_1), = cls.staging(V_bo, m_payload, (), (F_W_1,), (I_sp_1,), (gamma_avg_1,), (k_s_1,))
         
         # >>> Update stage
         
-        stage.mass(m_s_1, m_p_1, m_payload)
+        stage.mass(m_s_1, m_p_1, m_payload_1)
         stage.motor(F_1, I_sp_1, stage.csi)
         stage.calc()
         
@@ -472,68 +647,18 @@ class Launcher:
         
         if len(F_W) != 2 or len(I_sp) != 2 or len(gamma_avg) != 2 or len(k_s) != 2: return stage_1, stage_2
         
-        F_W_1, F_W_2 = F_W
-        
-        I_sp_1, I_sp_2 = I_sp
-        
-        gamma_avg_1, gamma_avg_2 = gamma_avg
-        
-        k_s_1, k_s_2 = k_s
-        
-        # >>> Propellant fraction
-        
-        k_p_1 = F_W_1 / I_sp_1
-        
-        k_p_2 = F_W_2 / I_sp_2
-        
-        # >>> Burnout velocity
-        
-        V_bo_1 = - cls.g_E * I_sp_1 * np.log(1 - k_p_1 * t_bo_1) - cls.g_E * t_bo_1 * np.sin(np.deg2rad(gamma_avg_1))
-        
-        # >>> Burnout time
-        
-        f = lambda t: V_bo + cls.g_E * I_sp_2 * np.log(1 - k_p_2 * (t - t_bo_1)) + cls.g_E * (t - t_bo_1) * np.sin(np.deg2rad(gamma_avg_2)) - V_bo_1
-        
-        f_dot = lambda t: - cls.g_E * I_sp_2 * k_p_2 * 1 / (1 - k_p_2 * (t - t_bo_1)) + cls.g_E * np.sin(np.deg2rad(gamma_avg_2))
-        
-        t_bo_2 = newton(f, 1 / k_p_2 + t_bo_1 - 1, f_dot)
-        
-        # >>> Stack mass
-        
-        dt_1 = t_bo_1 - 0
-        
-        dt_2 = t_bo_2 - t_bo_1
-        
-        m_0_I = m_payload / ( (1 - (1 + k_s_1) * k_p_1 * dt_1) * (1 - (1 + k_s_2) * k_p_2 * dt_2) )
-        
-        m_0_II = m_payload / (1 - (1 + k_s_2) * k_p_2 * dt_2)
-        
-        # >>> Thrust
-        
-        F_1 = F_W_1 * m_0_I * cls.g_E * 1e3
-        
-        F_2 = F_W_2 * m_0_II * cls.g_E * 1e3
+        # >>> Staging (cached)
         
-        # >>> Propellant mass
-        
-        m_p_1 = k_p_1 * dt_1 * m_0_I
-        
-        m_p_2 = k_p_2 * dt_2 * m_0_II
-        
-        # >>> Structural mass
-        
-        m_s_1 = k_s_1 * m_p_1
-        
-        m_s_2 = k_s_2 * m_p_2
+        (m_s_1, m_p_1, m_payload_1, F_1), (m_s_2, m_p_2, m_payload_2, F_2) = cls.staging(V_bo, m_payload, (t_bo_1,), tuple(F_W), tuple(I_sp), tuple(gamma_avg), tuple(k_s))
         
         # >>> Update stage
         
-        stage_1.mass(m_s_1, m_p_1, m_0_II)
-        stage_1.motor(F_1, I_sp_1, stage_1.csi)
+        stage_1.mass(m_s_1, m_p_1, m_payload_1)
+        stage_1.motor(F_1, I_sp[0], stage_1.csi)
         stage_1.calc()
         
-        stage_2.mass(m_s_2, m_p_2, m_payload)
-        stage_2.motor(F_2, I_sp_2, stage_2.csi)
+        stage_2.mass(m_s_2, m_p_2, m_payload_2)
+        stage_2.motor(F_2, I_sp[1], stage_2.csi)
         stage_2.calc()
         
         return stage_1, stage_2
@@ -574,86 +699,22 @@ class Launcher:
         
         if len(F_W) != 3 or len(I_sp) != 3 or len(gamma_avg) != 3 or len(k_s) != 3: return stage_1, stage_2, stage_3
         
-        F_W_1, F_W_2, F_W_3 = F_W
-        
-        I_sp_1, I_sp_2, I_sp_3 = I_sp
-        
-        gamma_avg_1, gamma_avg_2, gamma_avg_3 = gamma_avg
-        
-        k_s_1, k_s_2, k_s_3 = k_s
-        
-        # >>> Propellant fraction
-        
-        k_p_1 = F_W_1 / I_sp_1
-        
-        k_p_2 = F_W_2 / I_sp_2
-        
-        k_p_3 = F_W_3 / I_sp_3
-        
-        # >>> Burnout velocity
-        
-        V_bo_1 = - cls.g_E * I_sp_1 * np.log(1 - k_p_1 * t_bo_1) - cls.g_E * t_bo_1 * np.sin(np.deg2rad(gamma_avg_1))
-        
-        V_bo_2 = - cls.g_E * I_sp_2 * np.log(1 - k_p_2 * (t_bo_2 - t_bo_1)) - cls.g_E * (t_bo_2 - t_bo_1) * np.sin(np.deg2rad(gamma_avg_2)) + V_bo_1
-        
-        # >>> Burnout time
-        
-        f = lambda t: V_bo + cls.g_E * I_sp_3 * np.log(1 - k_p_3 * (t - t_bo_2)) + cls.g_E * (t - t_bo_2) * np.sin(np.deg2rad(gamma_avg_3)) - V_bo_2
-        
-        f_dot = lambda t: - cls.g_E * I_sp_3 * k_p_3 * 1 / (1 - k_p_3 * (t - t_bo_2)) + cls.g_E * np.sin(np.deg2rad(gamma_avg_3))
-        
-        t_bo_3 = newton(f, 1 / k_p_3 + t_bo_2 - 1, f_dot)
-        
-        # >>> Stack mass
-        
-        dt_1 = t_bo_1 - 0
+        # >>> Staging (cached)
         
-        dt_2 = t_bo_2 - t_bo_1
-        
-        dt_3 = t_bo_3 - t_bo_2
-        
-        m_0_I = m_payload / ( (1 - (1 + k_s_1) * k_p_1 * dt_1) * (1 - (1 + k_s_2) * k_p_2 * dt_2) * (1 - (1 + k_s_3) * k_p_3 * dt_3) )
-        
-        m_0_II = m_payload / ( (1 - (1 + k_s_2) * k_p_2 * dt_2) * (1 - (1 + k_s_3) * k_p_3 * dt_3) )
-        
-        m_0_III = m_payload / (1 - (1 + k_s_3) * k_p_3 * dt_3)
-        
-        # >>> Thrust
-        
-        F_1 = F_W_1 * m_0_I * cls.g_E * 1e3
-        
-        F_2 = F_W_2 * m_0_II * cls.g_E * 1e3
-        
-        F_3 = F_W_3 * m_0_III * cls.g_E * 1e3
-        
-        # >>> Propellant mass
-        
-        m_p_1 = k_p_1 * dt_1 * m_0_I
-        
-        m_p_2 = k_p_2 * dt_2 * m_0_II
-        
-        m_p_3 = k_p_3 * dt_3 * m_0_III
-        
-        # >>> Structural mass
-        
-        m_s_1 = k_s_1 * m_p_1
-        
-        m_s_2 = k_s_2 * m_p_2
-        
-        m_s_3 = k_s_3 * m_p_3
+        (m_s_1, m_p_1, m_payload_1, F_1), (m_s_2, m_p_2, m_payload_2, F_2), (m_s_3, m_p_3, m_payload_3, F_3) = cls.staging(V_bo, m_payload, (t_bo_1, t_bo_2), tuple(F_W), tuple(I_sp), tuple(gamma_avg), tuple(k_s))
         
         # >>> Update stage
         
-        stage_1.mass(m_s_1, m_p_1, m_0_II)
-        stage_1.motor(F_1, I_sp_1, stage_1.csi)
+        stage_1.mass(m_s_1, m_p_1, m_payload_1)
+        stage_1.motor(F_1, I_sp[0], stage_1.csi)
         stage_1.calc()
         
-        stage_2.mass(m_s_2, m_p_2, m_0_III)
-        stage_2.motor(F_2, I_sp_2, stage_2.csi)
+        stage_2.mass(m_s_2, m_p_2, m_payload_2)
+        stage_2.motor(F_2, I_sp[1], stage_2.csi)
         stage_2.calc()
         
-        stage_3.mass(m_s_3, m_p_3, m_payload)
-        stage_3.motor(F_3, I_sp_3, stage_3.csi)
+        stage_3.mass(m_s_3, m_p_3, m_payload_3)
+        stage_3.motor(F_3, I_sp[2], stage_3.csi)
         stage_3.calc()
         
         return stage_1, stage_2, stage_3
@@ -911,4 +972,12 @@ if __name__ == '__main__':
     
     print('-' * 40, '\n')
     
+    print('STAGING SWEEP\n')
+    
+    k_s_2 = np.linspace(0.05, 0.20, 7)
+    
+    print(k_s_2, Launcher.vehicle_to_orbit(7.909, 10_680, [200, 345], [1.3, 1.3, 1.3], [450, 450, 450], [30, 30, 30], [0.062, k_s_2, 0.12])['m_0'][0])
+    
+    print('-' * 40, '\n')
+    
     plt.show()
\ No newline at end of file
@@ -79,6 +79,16 @@ Page
 
                             function f_Click() { __MissionAtmosphericEntry.simulate() }
                         }
+
+                        MaterialIcon
+                        {
+                            source: "/svg/cancel.svg"
+                            baseColor: "#FF0000"
+                            tooltip: "Stop"
+                            tooltipLocation: Qt.AlignTop
+
+                            function f_Click() { __MissionAtmosphericEntry.stop_simulation() }
+                        }
                     }
 
                     Rectangle